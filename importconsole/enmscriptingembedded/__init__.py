@@ -1,4 +1,4 @@
 from .common.element import *
-from .enmscripting import (open, close)
+from .enmscripting import (open, close, retry_stats)
 from .exceptions import *
 from .security.authenticator import (UsernameAndPassword, SsoToken)
@@ -22,17 +22,45 @@ class EnmCommand():
     def __init__(self, session):
         self._handler = ExecutionHandler(session, CommandOutputFactory(), self._MEDIA_TYPE)
 
-    def execute(self, command_str, file=None, timeout_seconds=600):
+    def execute(self, command_str, file=None, timeout_seconds=600, cancel_event=None):
         """
         :param command_str:      command to be executed. For more information about a command's syntax, please
                                     check the web-cli online help
         :param file:             file object to be imported  - optional parameter
                                     - needed if the command requires a file for upload
         :param timeout_seconds: number of seconds before a timeout will occur on a command. Default value = 600 seconds
+        :param cancel_event:     threading.Event which stops waiting for the command output when set, raising
+                                    IllegalStateException - optional parameter
         :return:                 CommandOutput instance
         """
         logger.debug('Executing EnmCommand command...')
-        return self._handler.execute(command_str, file, timeout_seconds)
+        return self._handler.execute(command_str, file, timeout_seconds, cancel_event)
+
+    def execute_many(self, commands, max_in_flight=4, timeout_seconds=600):
+        """
+        Executes several commands concurrently, without waiting for them to complete.
+
+        Sample usage:
+            futures = command.execute_many(['cmedit get %s -t' % fdn for fdn in fdns])
+            for future in as_completed(futures):
+                output = future.result()
+
+        :param commands:         iterable of command strings, commands requiring a file upload are not supported
+        :param max_in_flight:    maximum number of commands executed at the same time
+        :param timeout_seconds:  number of seconds each command has to complete. Default value = 600 seconds
+        :return:                 list of CommandFuture, in the same order as the commands. Each future gives the
+                                 CommandOutput of its command
+        """
+        logger.debug('Executing EnmCommand commands...')
+        return self._handler.execute_many(commands, max_in_flight, timeout_seconds)
+
+    def poll_stats(self):
+        """
+        :return:                 dictionary of command verb (e.g. 'cmedit get') to the number of commands completed,
+                                 the number of polls made for them, the average polls per command and the average and
+                                 expected completion times in seconds
+        """
+        return self._handler.poll_stats()
 
 
 class CommandOutput(Output):
@@ -74,7 +102,8 @@ class CommandOutput(Output):
         :return ElementGroup: file elements
         """
         if self._files_cache is None:
-            self._files_cache = self.get_output()._find_by_type(FileElement)
+            files = [view.element() for view in self.get_output_view() if view.type() == FileElement.TYPE]
+            self._files_cache = ElementGroup(ElementGroup._get_attributes(items=files, labels=[FileElement]))
         return self._files_cache
 
     def get_output(self):
@@ -96,6 +125,38 @@ class CommandOutput(Output):
 
         return self._output
 
+    def get_output_view(self):
+        """
+        Gets a view of the output of the command, creating the elements only when they are accessed.
+        Prefer it to get_output() to read big outputs, e.g. tables with many rows.
+
+        Sample usage:
+            table = output.get_output_view().groups()[0]
+            for row in table:
+                values = row.values()
+
+        :return ElementView: view of the output of the command
+        """
+        logger.debug('get_output_view()')
+
+        if not self._success:
+            logger.warn('There is no output to parse, because command execution failed: raising IllegalStateException')
+            raise IllegalStateException('There is no output to parse, because command execution failed')
+
+        self._error_if_not_completed()
+
+        return self._create_element_view(self._parsed_json[self._OUTPUT])
+
+    def get_tables(self):
+        """
+        Gets a columnar view of each table of the output of the command, e.g. 'cmedit get ... -t'.
+        A table is a group whose elements are all groups, the table rows.
+
+        :return list: list of TableView
+        """
+        logger.debug('get_tables()')
+        return [element.table() for element in self.get_output_view() if element.is_table()]
+
 
 class CommandOutputFactory(OutputFactory):
     """
@@ -109,6 +109,10 @@ class ElementGroup(Element, tuple):
         self._attributes.pop(self.KEY_ITEMS)
 
         self._groups_cache = None
+        self._label_index = None
+        self._type_index = None
+        self._type_value_index = None
+        self._found_cache = None
 
     def _has_group_key(self):
         if self._attributes.get(self.GROUP_KEY):
@@ -144,8 +148,14 @@ class ElementGroup(Element, tuple):
         :param label: label to find
         :return ElementGroup: group of elements with a matching label
         """
-        res = filter(lambda e: label in e.labels(), self)
-        return ElementGroup(ElementGroup._get_attributes(items=res, labels=[label]))
+        if self._label_index is None:
+            index = {}
+            for e in self:
+                labels = e.labels()
+                for l in labels if len(labels) < 2 else set(labels):
+                    index.setdefault(l, []).append(e)
+            self._label_index = index
+        return self._found('label', self._label_index, label)
 
     def _find_by_type(self, cls):
         """
@@ -154,8 +164,12 @@ class ElementGroup(Element, tuple):
         :param cls: Class
         :return ElementGroup: group of elements of the specified class
         """
-        res = filter(lambda e: type(e) is cls, self)
-        return ElementGroup(ElementGroup._get_attributes(items=res, labels=[cls]))
+        if self._type_index is None:
+            index = {}
+            for e in self:
+                index.setdefault(type(e), []).append(e)
+            self._type_index = index
+        return self._found('type', self._type_index, cls)
 
     def _find_by_type_value(self, type_value):
         """
@@ -164,8 +178,26 @@ class ElementGroup(Element, tuple):
         :param type_value: type
         :return ElementGroup: group of elements of the specified type
         """
-        res = filter(lambda e: e.attributes()[Element.KEY_TYPE] == type_value, self)
-        return ElementGroup(ElementGroup._get_attributes(items=res, labels=[type_value]))
+        if self._type_value_index is None:
+            index = {}
+            for e in self:
+                index.setdefault(e._attributes.get(Element.KEY_TYPE), []).append(e)
+            self._type_value_index = index
+        return self._found('type_value', self._type_value_index, type_value)
+
+    def _found(self, index_name, index, key):
+        """
+        Returns the group of the elements indexed with the given key. The indexes are built on the first query and,
+        as groups are immutable, both the indexes and the groups returned are kept for the next queries.
+        """
+        if self._found_cache is None:
+            self._found_cache = {}
+        cache_key = (index_name, key)
+        found = self._found_cache.get(cache_key)
+        if found is None:
+            found = ElementGroup(ElementGroup._get_attributes(items=index.get(key, ()), labels=[key]))
+            self._found_cache[cache_key] = found
+        return found
 
     @classmethod
     def _get_attributes(cls, items=[], type=TYPE, labels=[]):
@@ -216,3 +248,237 @@ class FileElement(Element, FileResult):
         :return string: the name of the file
         """
         return self._attributes[self.KEY_NAME]
+
+
+class ElementView(object):
+    """
+    ElementView is a read-only view of an element returned from an ENM command, reading the command output as it is
+    accessed.
+
+    Unlike ElementGroup, a view does not convert the elements it contains: the view of a child element is only created
+    when the child is accessed, so going through the rows of a big table does not allocate an object per cell.
+    Use element() to get the Element, TextElement, FileElement or ElementGroup represented by the view.
+    """
+    __slots__ = ('_json', '_handler')
+
+    def __init__(self, json, handler=None):
+        self._json = json
+        self._handler = handler
+
+    def type(self):
+        """
+        :return string: type of the element, e.g. 'text' or 'group'
+        """
+        return self._json[Element.KEY_TYPE]
+
+    def is_group(self):
+        """
+        :return boolean: True if the element is a group
+        """
+        return self._json[Element.KEY_TYPE] == ElementGroup.TYPE
+
+    def labels(self):
+        """
+        :return tuple: Labels in a tuple
+        """
+        return tuple(self._json.get(Element.KEY_LABELS, ()))
+
+    def value(self):
+        """
+        :return string: value of the element, None if the element has no value (e.g. groups)
+        """
+        return self._json.get(TextElement.KEY_VALUE)
+
+    def values(self):
+        """
+        :return list: values of the elements within this group, e.g. the cells of a table row
+        """
+        return [item.get(TextElement.KEY_VALUE) for item in self._items()]
+
+    def groups(self):
+        """
+        :return list: views of the group elements within this group
+        """
+        return [ElementView(item, self._handler) for item in self._items()
+                if item[Element.KEY_TYPE] == ElementGroup.TYPE]
+
+    def is_table(self):
+        """
+        :return boolean: True if this is a group whose elements are all groups, i.e. the table rows
+        """
+        items = self._items()
+        return len(items) > 0 and all(item[Element.KEY_TYPE] == ElementGroup.TYPE for item in items)
+
+    def table(self):
+        """
+        :return TableView: columnar view of this group, the group elements within it being the table rows
+        """
+        return TableView(self._json)
+
+    def element(self):
+        """
+        Converts the element, and all the elements within it, to the Element classes.
+
+        :return Element: the element represented by this view
+        """
+        return _create_element(self._json, self._handler)
+
+    def _items(self):
+        return self._json.get(ElementGroup.KEY_ITEMS, ())
+
+    def __len__(self):
+        return len(self._items())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [ElementView(item, self._handler) for item in self._items()[index]]
+        return ElementView(self._items()[index], self._handler)
+
+    def __iter__(self):
+        handler = self._handler
+        for item in self._items():
+            yield ElementView(item, handler)
+
+    def __repr__(self):
+        if self.is_group():
+            return '<ElementView group of %d elements>' % len(self)
+        return str(self.value())
+
+
+class TableView(object):
+    """
+    TableView is a columnar view of a table returned from an ENM command (e.g. 'cmedit get ... -t'): the column
+    headers are read once and the values of each column are kept in a list, built in a single pass over the output.
+
+    The header of a column is the first label of its cells. A cell missing from a row has the value None.
+
+    Sample usage:
+        table = output.get_tables()[0]
+        for fdn, status in zip(table.column('FDN'), table.column('status')):
+            ...
+    """
+
+    def __init__(self, json):
+        self._labels = tuple(json.get(Element.KEY_LABELS, ()))
+        headers = []
+        positions = {}
+        layout = None
+        value_rows = []
+        for row in json.get(ElementGroup.KEY_ITEMS, ()):
+            if row[Element.KEY_TYPE] != ElementGroup.TYPE:
+                continue
+            cells = row[ElementGroup.KEY_ITEMS]
+            # rows normally have the same cells as the previous row, so the position of each cell is only worked out
+            # when the labels of the cells change
+            labels = [cell.get(Element.KEY_LABELS) for cell in cells]
+            if labels != layout:
+                layout = labels
+                layout_positions = []
+                for cell_labels in labels:
+                    header = cell_labels[0] if cell_labels else None
+                    if header not in positions:
+                        positions[header] = len(headers)
+                        headers.append(header)
+                    layout_positions.append(positions[header])
+                in_order = layout_positions == range(len(layout_positions))
+            values = [cell.get(TextElement.KEY_VALUE) for cell in cells]
+            if not in_order:
+                ordered = [None] * len(headers)
+                for position, value in reversed(zip(layout_positions, values)):
+                    ordered[position] = value
+                values = ordered
+            value_rows.append(values)
+
+        nr_columns = len(headers)
+        for values in value_rows:
+            if len(values) < nr_columns:
+                values.extend([None] * (nr_columns - len(values)))
+        self._headers = tuple(headers)
+        self._columns = [list(column) for column in zip(*value_rows)] if value_rows else [[] for _ in headers]
+        self._nr_rows = len(value_rows)
+
+    def labels(self):
+        """
+        :return tuple: Labels of the table in a tuple
+        """
+        return self._labels
+
+    def headers(self):
+        """
+        :return tuple: column headers, in the order of the columns
+        """
+        return self._headers
+
+    def column(self, header):
+        """
+        :param header: column header
+        :raise KeyError: if the table has no column with the given header
+        :return list: values of the column, one per row
+        """
+        try:
+            return self._columns[self._headers.index(header)]
+        except ValueError:
+            raise KeyError(header)
+
+    def columns(self):
+        """
+        :return list: list of the values of each column, in the order of the headers
+        """
+        return self._columns
+
+    def row(self, index):
+        """
+        :return tuple: values of the row at the given index, in the order of the headers
+        """
+        return tuple(column[index] for column in self._columns)
+
+    def rows(self):
+        """
+        :return iterator: tuple of values of each row, in the order of the headers
+        """
+        return iter(zip(*self._columns)) if self._columns else iter([()] * self._nr_rows)
+
+    def index_by(self, header):
+        """
+        Builds a dictionary of the rows keyed by the value of a column, e.g. the FDN. If several rows have the same
+        value the last one is kept.
+
+        :param header: header of the key column
+        :raise KeyError: if the table has no column with the given header
+        :return dict: value of the key column to a dictionary of header to value
+        """
+        keys = self.column(header)
+        headers = self._headers
+        return dict(zip(keys, (dict(zip(headers, row)) for row in self.rows())))
+
+    def __len__(self):
+        return self._nr_rows
+
+    def __repr__(self):
+        return '<TableView %s of %d rows>' % (list(self._headers), self._nr_rows)
+
+
+def _create_element(json, handler=None):
+    """
+    Recursive function creating the elements from the JSON.
+
+    JSON contains elements. Each element can be an Element or GroupElement.
+    Each GroupElement can contain Elements and GroupElements, therefore recursive parsing is required.
+    The JSON of the groups is left unchanged, so it can still be read through ElementView.
+    """
+    type = json[Element.KEY_TYPE]
+
+    if type == TextElement.TYPE:
+        # Leaf element
+        return TextElement(json)
+    elif type == FileElement.TYPE:
+        # Leaf element
+        return FileElement(json, handler)
+    elif type == ElementGroup.TYPE:
+        # Recursive call with each item
+        attributes = dict(json)
+        attributes[ElementGroup.KEY_ITEMS] = [_create_element(item, handler) for item in json[ElementGroup.KEY_ITEMS]]
+        return ElementGroup(attributes)
+    else:
+        # New DTO
+        return Element(json)
@@ -13,7 +13,7 @@ class FileResult(object):
         self._file_id = file_id
         self._execution_handler = execution_handler
 
-    def download(self, path=None):
+    def download(self, path=None, checksum=None):
         """
         This downloads the file to the specified directory, or the current working directory
         if no path is provided
@@ -21,18 +21,44 @@ class FileResult(object):
         If a directory, say '/my/directory' is provided, the file will be stored
         as '/my/directory/<remote-file-name>'
 
+        The file is streamed to disk and the download is resumed if the connection is dropped.
+
         :param path:            optional parameter  - path for location to store the downloaded file
                                                     - default is the current directory
+        :param checksum:        optional parameter  - expected checksum as '<algorithm>:<hex digest>',
+                                                      e.g. 'sha256:2c26b4...', ChecksumError is raised and the file
+                                                      removed if the content does not match
+        """
+        self._execution_handler.download(self._application_id, self._file_id, path, checksum=checksum)
+
+    def download_to(self, file_obj, checksum=None):
+        """
+        This streams the file into a writable file object, e.g. an open file or an io.BytesIO
+
+        :param file_obj:        file object to write the file to
+        :param checksum:        optional parameter  - expected checksum as '<algorithm>:<hex digest>'
+        :return:                the number of bytes written
         """
-        self._execution_handler.download(self._application_id, self._file_id, path)
+        return self._execution_handler.download_to(self._application_id, self._file_id, file_obj, checksum=checksum)
 
-    def get_bytes(self):
+    def get_bytes(self, checksum=None):
         """
         This stores the file as a byte array in memory
 
+        :param checksum:        optional parameter  - expected checksum as '<algorithm>:<hex digest>'
         :return:                the file as a bytearray
         """
-        return self._execution_handler.get_bytes(self._application_id, self._file_id)
+        return self._execution_handler.get_bytes(self._application_id, self._file_id, checksum=checksum)
+
+    def get_bytes_mapped(self, checksum=None):
+        """
+        This stores the file in an anonymous temporary file mapped in memory, use it instead of get_bytes() for
+        big files
+
+        :param checksum:        optional parameter  - expected checksum as '<algorithm>:<hex digest>'
+        :return:                the file as a read-only mmap, an empty bytearray if the file is empty
+        """
+        return self._execution_handler.get_bytes_mapped(self._application_id, self._file_id, checksum=checksum)
 
     def get_name(self):
         """
@@ -0,0 +1,143 @@
+#!/usr/bin/python -tt
+import logging
+from threading import Event, Lock
+try:
+    from queue import Queue, Empty  # Python 3
+except ImportError:
+    from Queue import Queue, Empty  # Python 2
+from ..exceptions import TimeoutException, IllegalStateException
+
+logger = logging.getLogger(__name__)
+
+
+class CommandFuture(object):
+    """
+    Class representing the pending output of a command submitted for execution
+    """
+
+    def __init__(self, command_str):
+        self._command_str = command_str
+        self._done = Event()
+        self._lock = Lock()
+        self._cancelled = False
+        self._running = False
+        self._output = None
+        self._exc_info = None
+        self._callbacks = []
+
+    def command(self):
+        """
+        :return:                the command string
+        """
+        return self._command_str
+
+    def cancel(self):
+        """
+        Cancels the command if it was not sent to ENM yet.
+
+        :return:                boolean, true if the command was cancelled
+        """
+        with self._lock:
+            if self._done.is_set():
+                return self._cancelled
+            if self._running:
+                return False
+            self._cancelled = True
+        self._finish()
+        return True
+
+    def cancelled(self):
+        """
+        :return:                boolean, true if the command was cancelled before being sent to ENM
+        """
+        return self._cancelled
+
+    def done(self):
+        """
+        :return:                boolean, true if the command completed, failed or was cancelled
+        """
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """
+        Waits for the command to complete.
+
+        :param timeout:         maximum number of seconds to wait, None to wait until the command completes
+        :raise: TimeoutException if the command did not complete within timeout
+                IllegalStateException if the command was cancelled
+                the exception raised executing the command, if any
+        :return:                Output instance
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutException('Command did not complete within [%s seconds]' % timeout)
+        if self._cancelled:
+            raise IllegalStateException('Command [%s] was cancelled' % self._command_str)
+        if self._exc_info is not None:
+            # raise like this is required to keep the original call's stack trace
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._output
+
+    def add_done_callback(self, callback):
+        """
+        Registers a callable to be called with this future as argument once the command completes, fails or is
+        cancelled. If the future is already done the callable is called straight away.
+
+        :param callback:        callable receiving this future
+        """
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        self._call(callback)
+
+    def _set_running(self):
+        """
+        :return:                boolean, false if the command was cancelled and should not be sent to ENM
+        """
+        with self._lock:
+            self._running = not self._cancelled
+            return self._running
+
+    def _set_output(self, output):
+        with self._lock:
+            self._output = output
+        self._finish()
+
+    def _set_exception(self, exc_info):
+        with self._lock:
+            self._exc_info = exc_info
+        self._finish()
+
+    def _finish(self):
+        with self._lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            self._call(callback)
+
+    def _call(self, callback):
+        try:
+            callback(self)
+        except Exception:
+            logger.exception('Exception on command future callback')
+
+
+def as_completed(futures, timeout=None):
+    """
+    Iterates over the given futures as they complete.
+
+    :param futures:             iterable of CommandFuture
+    :param timeout:             maximum number of seconds to wait for the next future to complete,
+                                None to wait indefinitely
+    :raise: TimeoutException if no future completed within timeout
+    :return:                    iterator of CommandFuture
+    """
+    futures = list(futures)
+    completed = Queue()
+    for future in futures:
+        future.add_done_callback(completed.put)
+    for _ in range(len(futures)):
+        try:
+            yield completed.get(timeout=timeout)
+        except Empty:
+            raise TimeoutException('No command completed within [%s seconds]' % timeout)
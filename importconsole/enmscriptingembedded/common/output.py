@@ -3,6 +3,7 @@ import logging
 import json
 from ..exceptions import InternalError
 from element import *
+from element import _create_element
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +24,7 @@ class Output(object):
         self._success = success
         self._parsed_json = None
         self._is_complete = False
-        self._element_group_by_key = {}
+        self._builder = None
 
         if success and json_response is not None:
             self._append_response(json_response)
@@ -57,7 +58,8 @@ class Output(object):
                 raise InternalError('Illegal server response: response is not in JSON format', ex)
 
             if self._parsed_json is None:
-                self._parsed_json = {self._OUTPUT: {Element.KEY_TYPE: ElementGroup.TYPE, ElementGroup.KEY_ITEMS: []}}
+                self._builder = _OutputBuilder()
+                self._parsed_json = {self._OUTPUT: self._builder.root}
 
             self._merge_to_parsed_json(new_json)
 
@@ -67,7 +69,7 @@ class Output(object):
         self._is_complete = self._parsed_json.get(self._RESPONSE_STATUS, '') == 'COMPLETE'
 
         if self._is_complete:
-            self._element_group_by_key = {}  # clear the cache, not needed anymore
+            self._builder = None  # clear the group index, not needed anymore
             self._process_complete_json(self._parsed_json)
 
     def _process_complete_json(self, json):
@@ -81,80 +83,73 @@ class Output(object):
             self._parsed_json[self._COMMAND] = new_json[self._COMMAND]
 
         if self._OUTPUT in new_json and ElementGroup.KEY_ITEMS in new_json[self._OUTPUT]:
-            root_elements_list = Output._get_group_elements_list(self._parsed_json[self._OUTPUT])
-            new_elements_list = Output._get_group_elements_list(new_json[self._OUTPUT])
-
-            for element in new_elements_list:
-                self._append_element_into_list(element, root_elements_list)
-
-    def _append_element_into_list(self, element, element_list):
-
-        if Output._is_group_element(element):
-            append_target = None
-            if ElementGroup.GROUP_KEY in element:
-                group_key = Output._get_group_key(element)
-                append_target = self._element_group_by_key.get(group_key)
-
-            if append_target:
-                target_list = Output._get_group_elements_list(append_target)
-                for group_item in Output._get_group_elements_list(element):
-                    self._append_element_into_list(group_item, target_list)
-            else:
-                element_list.append(element)
-                self._update_element_group_by_key(element)
-        else:
-            element_list.append(element)
-
-    def _update_element_group_by_key(self, element):
-
-        if Output._is_group_element(element):
-            group_key = Output._get_group_key(element)
-            if group_key and group_key not in self._element_group_by_key:
-                self._element_group_by_key[group_key] = element
-
-            for child_element in Output._get_group_elements_list(element):
-                self._update_element_group_by_key(child_element)
+            self._builder.append(Output._get_group_elements_list(new_json[self._OUTPUT]))
 
     def _error_if_not_completed(self):
         if not self._is_complete:
             raise InternalError('Illegal state, response is not completed yet.')
 
-    @staticmethod
-    def _is_group_element(element):
-        return element[Element.KEY_TYPE] == ElementGroup.TYPE
-
-    @staticmethod
-    def _get_group_key(element):
-        return element.get(ElementGroup.GROUP_KEY)
-
     @staticmethod
     def _get_group_elements_list(element):
         return element[ElementGroup.KEY_ITEMS]
 
     def _create_elements(self, output_json):
         """
-        Recursive method to create the elements from the JSON.
+        Creates the elements from the JSON, see ElementView to read the JSON without creating all the elements.
+        """
+        return _create_element(output_json, self._handler)
+
+    def _create_element_view(self, output_json):
+        return ElementView(output_json, self._handler)
+
 
-        JSON contains elements. Each element can be an Element or GroupElement.
-        Each GroupElement can contain Elements and GroupElements, therefore recursive parsing is required.
+class _OutputBuilder(object):
+    """
+    Builds the output JSON from the partial responses of a command.
+
+    The server streams the elements of a group (e.g. the rows of a table) across several responses, each part being
+    a group with the same group key. Every group with a group key is indexed when it is first added, so each later
+    part is merged into it with a dictionary lookup. The elements of a response are only walked once, when they are
+    added, and the elements already merged are never visited again.
+    """
+
+    def __init__(self):
+        self.root = {Element.KEY_TYPE: ElementGroup.TYPE, ElementGroup.KEY_ITEMS: []}
+        self._group_by_key = {}
+
+    def append(self, elements):
         """
-        type = output_json[Element.KEY_TYPE]
-
-        if type == TextElement.TYPE:
-            # Leaf element
-            return TextElement(output_json)
-        elif type == FileElement.TYPE:
-            # Leaf element
-            return FileElement(output_json, self._handler)
-        elif type == ElementGroup.TYPE:
-            # Recursive call with each item
-            items = map(lambda e: self._create_elements(e), output_json[ElementGroup.KEY_ITEMS])
-            output_json[ElementGroup.KEY_ITEMS] = items
-            group = ElementGroup(output_json)
-            return group
-        else:
-            # New DTO
-            return Element(output_json)
+        :param elements:        list of the elements of the root group of a partial response
+        """
+        self._merge(elements, self.root[ElementGroup.KEY_ITEMS])
+
+    def _merge(self, elements, target_list):
+        group_by_key = self._group_by_key
+        for element in elements:
+            if element[Element.KEY_TYPE] == ElementGroup.TYPE:
+                group_key = element.get(ElementGroup.GROUP_KEY)
+                target = group_by_key.get(group_key) if group_key else None
+                if target is not None:
+                    self._merge(element[ElementGroup.KEY_ITEMS], target[ElementGroup.KEY_ITEMS])
+                    continue
+                self._index(element)
+            target_list.append(element)
+
+    def _index(self, group):
+        """
+        Indexes the given group and the groups within it by group key, the first group added with a key is kept.
+        """
+        group_by_key = self._group_by_key
+        pending = [group]
+        while pending:
+            group = pending.pop()
+            group_key = group.get(ElementGroup.GROUP_KEY)
+            if group_key and group_key not in group_by_key:
+                group_by_key[group_key] = group
+            children = [e for e in group[ElementGroup.KEY_ITEMS] if e[Element.KEY_TYPE] == ElementGroup.TYPE]
+            if children:
+                children.reverse()
+                pending.extend(children)
 
 
 class OutputFactory(object):
@@ -2,6 +2,7 @@
 # To make Py2 code safer (more like Py3) by preventing implicit relative imports
 from __future__ import absolute_import
 from .private import session
+from .private import retry
 
 """
 enm module  - allows execution of enm cli commands to an enm deployment
@@ -48,3 +49,15 @@ def close(enm_session):
     :return:              boolean, true if successfully closed
     """
     return session._close_session(enm_session)
+
+
+def retry_stats():
+    """
+    Gets the retries made for the requests towards ENM, by endpoint. Calls succeeding at the first attempt are not
+    counted.
+
+    :return:              dictionary of endpoint (e.g. 'post /server-scripting/services/command') to a dictionary with
+                          the number of calls retried, the number of attempts made for them, the number of calls which
+                          succeeded after retrying and gave up, and the seconds spent retrying
+    """
+    return retry.retry_stats()
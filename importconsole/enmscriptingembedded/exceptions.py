@@ -14,6 +14,10 @@ class InternalError(EnmCmdException):
     """Indicates that an InternalError occurred. This could happen for example if the server response is invalid."""
 
 
+class ChecksumError(InternalError):
+    """Indicates that the content of a downloaded file does not match the expected checksum"""
+
+
 class ConfigurationError(EnmCmdException):
     """Indicates that a configuration error occurred. This could include configuration
     outside ENM Scripting or Python, e.g., an invalid environment variable"""
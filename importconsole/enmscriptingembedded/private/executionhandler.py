@@ -1,11 +1,21 @@
 #!/usr/bin/python -tt
 import logging
+import hashlib
 import io
+import mmap
 import os
+import re
+import sys
+import tempfile
+import time
+from collections import deque
 from posixpath import join as urljoin
-from .poller import Poller
+from requests import exceptions as http_exceptions
+from .poller import Poller, monotonic
+from .pollstrategy import default_strategy
+from ..common.future import CommandFuture
 from ..exceptions import *
-from threading import Lock
+from threading import Lock, Thread
 try:
     range = xrange  # Python 2
 except NameError:
@@ -19,6 +29,8 @@ This is a private module and should not be used outside of the client-scripting
 
 logger = logging.getLogger(__name__)
 
+_CONTENT_RANGE = re.compile(r'bytes\s+(\d+)-\d+/(\d+|\*)')
+
 
 class _IdGenerator(object):
 
@@ -76,7 +88,17 @@ class ExecutionHandler:
     _POLL_SLEEP_MULTIPLIER = 2
     _POLL_SLEEP_CAP = 1
 
-    def __init__(self, session=None, output_factory=None, result_media_type=_HEADER_CONTENT_TYPE_GET_TEXT):
+    # Pipelining parameters
+    _PIPELINE_MAX_IN_FLIGHT = 4
+
+    # Download parameters
+    _DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+    _DOWNLOAD_MAX_RESUMES = 5
+    _DOWNLOAD_RESUMABLE_ERRORS = (http_exceptions.ConnectionError, http_exceptions.ChunkedEncodingError,
+                                  http_exceptions.Timeout)
+
+    def __init__(self, session=None, output_factory=None, result_media_type=_HEADER_CONTENT_TYPE_GET_TEXT,
+                 poll_strategy=None):
         """
         Default
         """
@@ -99,70 +121,277 @@ class ExecutionHandler:
         self._last_request_id = "new"
         self._instance_id = _handler_id_generator.new_id()
         self._request_lock = Lock()
-        self._poller = Poller(timeout=self._POLL_TIMEOUT,
-                              sleep_time=self._POLL_SLEEP_TIME,
-                              sleep_multiplier=self._POLL_SLEEP_MULTIPLIER,
-                              sleep_cap=self._POLL_SLEEP_CAP)
+        self._poll_strategy = poll_strategy or default_strategy
 
-    def execute(self, command_str, file=None, timeout_seconds=600):
+    def execute(self, command_str, file=None, timeout_seconds=600, cancel_event=None):
         """
         :param command_str:      command to be executed. For more information about a command's syntax, please
                                  check the web-cli online help
         :param file:             file object to be imported  - optional parameter -
                                  needed if the command requires a file for upload
-        :param timeout_seconds:
+        :param timeout_seconds:  number of seconds, possibly fractional, the command has to complete, counted from
+                                 when it is posted
+        :param cancel_event:     threading.Event which stops waiting for the command output when set
+        :raise: TimeoutException if the command did not complete within timeout_seconds
+                IllegalStateException if cancel_event was set before the command completed
         :return:                 Output instance
         """
         logger.debug('Starting execution of command....')
+        poller = Poller(timeout=timeout_seconds,
+                        sleep_time=self._POLL_SLEEP_TIME,
+                        sleep_multiplier=self._POLL_SLEEP_MULTIPLIER,
+                        sleep_cap=self._POLL_SLEEP_CAP,
+                        cancel_event=cancel_event)
         with self._request_lock:
+            poller.start()
             response = self._command_post(command_str, file)
             if response.status_code is not 201:
                 logger.warning('Failed to post command [%s]', command_str)
                 return self._output_factory.create_output(response.status_code, False, response.text, self)
             self._last_request_id = response.text
 
-            output = self._command_poll_get(timeout_seconds)
+            output = self._command_poll_get(poller, command_str)
             logger.debug('Command executed successfully [%s], command response is complete', command_str)
             return output
 
-    def download(self, application_id, file_id, path):
+    def execute_many(self, commands, max_in_flight=_PIPELINE_MAX_IN_FLIGHT, timeout_seconds=600):
+        """
+        Submits several commands for execution without waiting for them to complete.
+
+        Up to max_in_flight commands are executed at the same time: a new command is posted as soon as one of them
+        completes. The pending commands are polled together by a single background thread and each future is completed
+        as soon as the output of its command is complete, regardless of the order of the commands.
+
+        :param commands:         iterable of command strings
+        :param max_in_flight:    maximum number of commands executed at the same time
+        :param timeout_seconds:  number of seconds each command has to complete once posted
+        :return:                 list of CommandFuture, in the same order as the commands
+        """
+        futures = [CommandFuture(command_str) for command_str in commands]
+        if futures:
+            thread = Thread(target=self._run_pipeline, args=(futures, max(1, max_in_flight), timeout_seconds),
+                            name='Command-Pipeline-Thread')
+            thread.daemon = True
+            thread.start()
+        return futures
+
+    def poll_stats(self):
+        """
+        :return:                 dictionary of command verb (e.g. 'cmedit get') to the polling statistics of the
+                                 commands completed, see AdaptivePollStrategy.stats
+        """
+        return self._poll_strategy.stats()
+
+    def download(self, application_id, file_id, path, request_id=None, checksum=None):
         logger.debug('Downloading file from ENM')
-        response = self._command_download(application_id, file_id)
+        response = self._command_download(application_id, file_id, request_id)
 
         full_file_name = self._file_path_and_name(response, file_id, path)
-        with io.open(full_file_name, 'wb') as handle:
-            for block in response.iter_content(1024):
-                if not block:
-                    break
-                handle.write(block)
-            logger.debug('Wrote file [%s] to disk', path)
+        try:
+            with io.open(full_file_name, 'wb') as handle:
+                self._stream_file(response, handle, application_id, file_id, request_id, checksum)
+        except ChecksumError:
+            os.remove(full_file_name)
+            raise
+        logger.debug('Wrote file [%s] to disk', full_file_name)
+
+    def download_to(self, application_id, file_id, file_obj, request_id=None, checksum=None):
+        """
+        Streams a file into a writable file object, e.g. an open file or an io.BytesIO. If the connection is dropped
+        and the server does not support resuming the download, the file object must support seek() and truncate().
 
-    def get_bytes(self, application_id, file_id):
+        :return:                 number of bytes written
+        """
+        logger.debug('Downloading file from ENM')
+        response = self._command_download(application_id, file_id, request_id)
+        return self._stream_file(response, file_obj, application_id, file_id, request_id, checksum)
+
+    def get_bytes(self, application_id, file_id, request_id=None, checksum=None):
         logger.debug('Downloading file from ENM')
-        response = self._command_download(application_id, file_id)
         buf = bytearray()
-        for b in response.iter_content():
-            if not b:
-                break
-            buf.extend(b)
+        self.download_to(application_id, file_id, _BytearrayWriter(buf), request_id, checksum)
         logger.debug('Wrote [%i] bytes to memory', len(buf))
         return buf
 
-    def _command_post(self, command, file_in=None):
+    def get_bytes_mapped(self, application_id, file_id, request_id=None, checksum=None):
+        """
+        Downloads a file to an anonymous temporary file and maps it in memory, so big files are not held in the
+        process memory.
+
+        :return:                 read-only mmap of the file content, an empty bytearray if the file is empty
+        """
+        with tempfile.TemporaryFile() as handle:
+            size = self.download_to(application_id, file_id, handle, request_id, checksum)
+            handle.flush()
+            logger.debug('Mapping [%i] bytes downloaded to a temporary file', size)
+            if not size:
+                return bytearray()
+            # the mapping stays valid once the temporary file is closed and deleted
+            return mmap.mmap(handle.fileno(), size, access=mmap.ACCESS_READ)
+
+    def _stream_file(self, response, file_obj, application_id, file_id, request_id, checksum):
+        """
+        Writes the content of a file download response to file_obj in large chunks. If the connection is dropped, the
+        download is resumed from the last byte received with an HTTP Range request. It starts over from the first byte
+        if the server does not support ranges or sends a range starting at another byte.
+
+        :raise: ChecksumError if a checksum ('<algorithm>:<hex digest>', e.g. 'md5:9e10...') is given and the file
+                content does not match it
+        :return:                 number of bytes written
+        """
+        algorithm, expected_digest = checksum.split(':', 1) if checksum else (None, None)
+        digest = hashlib.new(algorithm) if algorithm else None
+        start = file_obj.tell() if hasattr(file_obj, 'tell') else 0
+        size = _expected_size(response)
+        written = 0
+        resumes = 0
+        while True:
+            try:
+                for block in response.iter_content(self._DOWNLOAD_CHUNK_SIZE):
+                    if not block:
+                        break
+                    file_obj.write(block)
+                    if digest:
+                        digest.update(block)
+                    written += len(block)
+                if size is None or written >= size:
+                    break
+                logger.warning('Download of file [%s] ended after [%i] of [%i] bytes', file_id, written, size)
+            except self._DOWNLOAD_RESUMABLE_ERRORS as e:
+                if resumes >= self._DOWNLOAD_MAX_RESUMES:
+                    raise
+                logger.warning('Download of file [%s] interrupted after [%i] bytes: %s', file_id, written, e)
+            if resumes >= self._DOWNLOAD_MAX_RESUMES:
+                raise InternalError('Failed to download file [%s] with application id [%s], incomplete content'
+                                    % (str(file_id), str(application_id)))
+            resumes += 1
+
+            # a range of an encoded (e.g. gzip) response does not match the decoded bytes written, start again
+            offset = written if size is not None else 0
+            response = self._command_download(application_id, file_id, request_id, offset)
+            if response.status_code == 206 and _range_start(response) != offset:
+                # another range cannot be appended to the bytes written, the whole file is requested instead
+                logger.warning('Server sent range [%s] of file [%s] instead of the one from byte [%i]',
+                               response.headers.get('Content-Range'), file_id, offset)
+                response.close()
+                response = self._command_download(application_id, file_id, request_id)
+            if response.status_code != 206:
+                logger.debug('Restarting download of file [%s] from the first byte', file_id)
+                if written:
+                    file_obj.seek(start)
+                    file_obj.truncate()
+                digest = hashlib.new(algorithm) if algorithm else None
+                written = 0
+                size = _expected_size(response)
+            else:
+                logger.debug('Resuming download of file [%s] from byte [%i]', file_id, offset)
+
+        if digest and digest.hexdigest().lower() != expected_digest.lower():
+            logger.error('Checksum of file [%s] is [%s:%s], expected [%s]', file_id, algorithm, digest.hexdigest(),
+                         checksum)
+            raise ChecksumError('Checksum mismatch for file [%s] with application id [%s]'
+                                % (str(file_id), str(application_id)))
+        return written
+
+    def _run_pipeline(self, futures, max_in_flight, timeout_seconds):
+        queued = deque(futures)
+        in_flight = []
+        # each command in flight is posted with its own request sequence, so the server does not serialize them
+        sequence_ids = [_handler_id_generator.new_id() for _ in range(max_in_flight)]
+        sleep_time = self._POLL_SLEEP_TIME
+        while queued or in_flight:
+            while queued and len(in_flight) < max_in_flight:
+                future = queued.popleft()
+                if not future._set_running():
+                    continue
+                pending = _PendingCommand(future, sequence_ids.pop(), timeout_seconds,
+                                          self._poll_strategy.track(future.command()))
+                if self._pipeline_post(pending):
+                    in_flight.append(pending)
+                else:
+                    sequence_ids.append(pending.sequence_id)
+
+            # the server is only asked to wait when a single command is in flight, not to delay polling the others
+            allow_wait = len(in_flight) == 1 and not queued
+            wait_milli = 0
+            completed = []
+            for pending in in_flight:
+                pending_wait_milli = pending.tracker.wait_milli(allow_wait)
+                wait_milli = max(wait_milli, pending_wait_milli)
+                if self._pipeline_poll(pending, pending_wait_milli):
+                    completed.append(pending)
+            for pending in completed:
+                in_flight.remove(pending)
+                sequence_ids.append(pending.sequence_id)
+
+            if completed:
+                sleep_time = self._POLL_SLEEP_TIME
+            elif in_flight and not wait_milli:
+                time.sleep(sleep_time)
+                sleep_time = min(sleep_time * self._POLL_SLEEP_MULTIPLIER, self._POLL_SLEEP_CAP)
+
+    def _pipeline_post(self, pending):
+        """
+        :return: True if the command was posted and needs to be polled
+        """
+        command_str = pending.future.command()
+        try:
+            response = self._command_post(command_str, instance_id=pending.sequence_id)
+            if response.status_code != 201:
+                logger.warning('Failed to post command [%s]', command_str)
+                pending.future._set_output(self._output_factory.create_output(response.status_code, False, response.text, self))
+                return False
+            pending.request_id = response.text
+            pending.deadline = monotonic() + pending.timeout_seconds
+            return True
+        except Exception:
+            pending.future._set_exception(sys.exc_info())
+            return False
+
+    def _pipeline_poll(self, pending, wait_milli):
+        """
+        :return: True if the command is done, either completed, failed or timed out
+        """
+        try:
+            response = self._command_get(pending.request_id, wait_milli)
+            handler = _RequestBoundHandler(self, pending.request_id)
+            if response.status_code != 200:
+                logger.warning('Failed to get result with request ID [%s]', pending.request_id)
+                pending.future._set_output(self._output_factory.create_output(response.status_code, False, response.text, handler))
+                return True
+            if pending.output:
+                pending.output._append_response(response.text)
+            else:
+                pending.output = self._output_factory.create_output(response.status_code, True, response.text, handler)
+            pending.tracker.polled(pending.output.is_complete())
+            if pending.output.is_complete():
+                pending.future._set_output(pending.output)
+                return True
+            if monotonic() >= pending.deadline:
+                message = 'Command did not complete within the specified timeout [%s seconds]' % pending.timeout_seconds
+                pending.future._set_exception((TimeoutException, TimeoutException(message), None))
+                return True
+            return False
+        except Exception:
+            pending.future._set_exception(sys.exc_info())
+            return True
+
+    def _command_post(self, command, file_in=None, instance_id=None):
         logger.debug('POST command request')
-        file_data, req_data = self._get_post_data(self._instance_id, command, file_in)
+        file_data, req_data = self._get_post_data(instance_id or self._instance_id, command, file_in)
         response = self._session_post(file_data=file_data, req_data=req_data)
         logger.debug('POST command request executed')
         return response
 
-    def _command_poll_get(self, timeout_seconds):
+    def _command_poll_get(self, poller, command_str=None):
         logger.debug('Polling for command result')
-        self._poller.reset(timeout_seconds)
+        tracker = self._poll_strategy.track(command_str)
 
         output = None
-        wait_result_milli = 1000
-        while self._poller.poll():
-            response = self._command_get(self._last_request_id, wait_result_milli)
+        while poller.poll(tracker.sleep_time()):
+            # the server must not be asked to wait beyond the command deadline
+            wait_milli = int(min(tracker.wait_milli(), poller.remaining() * 1000))
+            response = self._command_get(self._last_request_id, wait_milli)
             if response.status_code is not 200:
                 logger.warning('Failed to get result with request ID [%s]', self._last_request_id)
                 return self._output_factory.create_output(response.status_code, False, response.text, self)
@@ -171,14 +400,17 @@ class ExecutionHandler:
                 output._append_response(response.text)
             else:
                 output = self._output_factory.create_output(response.status_code, True, response.text, self)
+            tracker.polled(output.is_complete())
             if output.is_complete():
                 return output
-            wait_result_milli = max(0, wait_result_milli - 500)
 
-        logger.debug('Command did not complete within the specified timeout [%i seconds], '
-                     'raising TimeoutException', timeout_seconds)
-        raise TimeoutException('Command did not complete within the specified timeout [%i seconds]'
-                               % timeout_seconds)
+        if poller.cancelled():
+            logger.debug('Command [%s] cancelled, raising IllegalStateException', command_str)
+            raise IllegalStateException('Command [%s] was cancelled' % command_str)
+        logger.debug('Command did not complete within the specified timeout [%s seconds], '
+                     'raising TimeoutException', poller.timeout_seconds())
+        raise TimeoutException('Command did not complete within the specified timeout [%s seconds]'
+                               % poller.timeout_seconds())
 
     def _command_get(self, _last_request_id, wait_milli=0):
         logger.debug('GET command result')
@@ -187,9 +419,10 @@ class ExecutionHandler:
         logger.debug('GET command result executed')
         return response
 
-    def _command_download(self, application_id, file_id):
-        response = self._session_files(application_id=application_id, file_id=file_id)
-        if response.status_code is not 200:
+    def _command_download(self, application_id, file_id, request_id=None, offset=0):
+        response = self._session_files(application_id=application_id, file_id=file_id, request_id=request_id,
+                                       offset=offset)
+        if response.status_code != 200 and not (offset and response.status_code == 206):
             logger.error('Failed to download file [%s] with application id [%s]', str(file_id), str(application_id))
             logger.error('Server response is [%s]', str(response.text))
             raise InternalError('Failed to download file [%s] with application id [%s]'
@@ -243,18 +476,22 @@ class ExecutionHandler:
             headers=self._headers[self._KEY_GET],
             allow_redirects=self._allow_redirects)
 
-    def _session_files(self, application_id, file_id):
+    def _session_files(self, application_id, file_id, request_id=None, offset=0):
+        headers = self._headers[self._KEY_FILES]
+        if offset:
+            headers = self._merge(headers, {'Range': 'bytes=%i-' % offset})
         return self._session.get(
-            self._get_request_url(self._urls[self._KEY_FILES], '/'.join((str(application_id), str(file_id)))),
-            headers=self._headers[self._KEY_FILES],
+            self._get_request_url(self._urls[self._KEY_FILES], '/'.join((str(application_id), str(file_id))),
+                                  request_id=request_id),
+            headers=headers,
             stream=True)
 
-    def _get_request_url(self, url, *args):
+    def _get_request_url(self, url, *args, **kwargs):
         for arg in args:
             url = urljoin(url, str(arg).lstrip('/'))
             logger.debug("Argument [%s] is added to url", str(arg))
 
-        url = "%s?%s=%s" % (url, self._REQUEST_ID, self._last_request_id)
+        url = "%s?%s=%s" % (url, self._REQUEST_ID, kwargs.get('request_id') or self._last_request_id)
 
         logger.debug("Generated URL with arguments and request_id is [%s]", url)
         return url
@@ -294,3 +531,81 @@ class ExecutionHandler:
                 if filename:
                     return filename
         return ''
+
+
+class _PendingCommand(object):
+    """
+    State of a command executed by ExecutionHandler.execute_many
+    """
+
+    def __init__(self, future, sequence_id, timeout_seconds, tracker):
+        self.future = future
+        self.tracker = tracker
+        self.sequence_id = sequence_id
+        self.timeout_seconds = timeout_seconds
+        self.request_id = None
+        self.deadline = None
+        self.output = None
+
+
+class _RequestBoundHandler(object):
+    """
+    Handler given to the outputs of the commands executed by ExecutionHandler.execute_many, so their files are
+    downloaded with the request id of their own command instead of the last one executed by the handler.
+    """
+
+    def __init__(self, handler, request_id):
+        self._handler = handler
+        self._request_id = request_id
+
+    def download(self, application_id, file_id, path, checksum=None):
+        return self._handler.download(application_id, file_id, path, self._request_id, checksum)
+
+    def download_to(self, application_id, file_id, file_obj, checksum=None):
+        return self._handler.download_to(application_id, file_id, file_obj, self._request_id, checksum)
+
+    def get_bytes(self, application_id, file_id, checksum=None):
+        return self._handler.get_bytes(application_id, file_id, self._request_id, checksum)
+
+    def get_bytes_mapped(self, application_id, file_id, checksum=None):
+        return self._handler.get_bytes_mapped(application_id, file_id, self._request_id, checksum)
+
+
+class _BytearrayWriter(object):
+    """
+    File-like wrapper writing to a bytearray
+    """
+
+    def __init__(self, buf):
+        self._buf = buf
+        self._offset = 0
+
+    def write(self, block):
+        self._buf.extend(block)
+
+    def tell(self):
+        return len(self._buf)
+
+    def seek(self, offset):
+        self._offset = offset
+
+    def truncate(self):
+        del self._buf[self._offset:]
+
+
+def _range_start(response):
+    """
+    :return: first byte of the Content-Range of a partial content response, None if it has none
+    """
+    match = _CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+    return int(match.group(1)) if match else None
+
+
+def _expected_size(response):
+    """
+    :return: number of bytes of the file content, None if unknown or if the content is encoded (e.g. gzip)
+    """
+    if response.headers.get('Content-Encoding', 'identity') != 'identity':
+        return None
+    length = response.headers.get('Content-Length')
+    return int(length) if length and length.isdigit() else None
@@ -1,7 +1,7 @@
 #!/usr/bin/python -tt
 import logging
+import sys
 import time
-from datetime import datetime
 
 
 """
@@ -13,16 +13,62 @@ This is a private module and should not be used outside of the client-scripting
 logger = logging.getLogger(__name__)
 
 
+def _monotonic_clock():
+    """
+    :return: function returning the seconds elapsed on a clock which is not affected by system clock adjustments,
+             falling back to the system clock if no such clock is available
+    """
+    try:
+        from time import monotonic  # Python 3
+        return monotonic
+    except ImportError:
+        pass
+
+    if sys.platform.startswith('linux'):
+        try:
+            import ctypes
+            import ctypes.util
+
+            class _Timespec(ctypes.Structure):
+                _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+            clock_monotonic = 1
+            libc = ctypes.CDLL(ctypes.util.find_library('rt') or ctypes.util.find_library('c'), use_errno=True)
+            clock_gettime = libc.clock_gettime
+            clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(_Timespec)]
+
+            def monotonic():
+                timespec = _Timespec()
+                if clock_gettime(clock_monotonic, ctypes.pointer(timespec)) != 0:
+                    raise OSError(ctypes.get_errno(), 'clock_gettime failed')
+                return timespec.tv_sec + timespec.tv_nsec / 1e9
+
+            monotonic()
+            return monotonic
+        except (OSError, AttributeError, TypeError):
+            pass
+
+    logger.debug('No monotonic clock available, using the system clock')
+    return time.time
+
+
+monotonic = _monotonic_clock()
+
+
 class Poller(object):
     """
     Class used to calculate the polling intervals and sleep between polling.
 
+    Time is measured on a monotonic clock, so the timeout is not affected by system clock adjustments, and can be a
+    fraction of a second. If a cancel event is given, the sleeps are interrupted as soon as the event is set and the
+    polling stops.
+
     Example usage:
         poller = Poller(timeout=10)
         while poller.poll():
             # Do something
     """
-    def __init__(self, timeout=600, sleep_time=0.1, sleep_multiplier=2, sleep_cap=1):
+    def __init__(self, timeout=600, sleep_time=0.1, sleep_multiplier=2, sleep_cap=1, cancel_event=None):
         """
         Initializes a Poller object.
 
@@ -31,6 +77,7 @@ class Poller(object):
         sleep_time - time to sleep in seconds between polls (default 0.1)
         sleep_multiplier - multiplier to be applied to the sleep_time after each poll (default 2)
         sleep_cap - cap amount time to sleep between polls (default 1)
+        cancel_event - threading.Event which stops the polling when set (default None)
 
         For example, default values will result in the following sleep times: [0, 0.1, 0.2, 0.4, 0.8, 1, 1, ...]
         """
@@ -40,18 +87,28 @@ class Poller(object):
         self._sleep_multiplier = sleep_multiplier
         self._sleep_cap = sleep_cap
         self._current_sleep_time = self._sleep_time
+        self._cancel_event = cancel_event
 
-    def poll(self):
-        if self.start():
+    def poll(self, sleep_time=None):
+        """
+        :param sleep_time:  seconds to sleep before this poll instead of the current sleep time, the sleep time
+                            progression is not updated when given
+        :return:            False if the timeout is reached or the polling is cancelled
+        """
+        if self.cancelled():
+            logger.debug('Polling cancelled')
+            return False
+        elif self.start():
             return True
         elif self._timeout():
             logger.debug('Polling timeout [%s seconds] reached', str(self._timeout_seconds))
             return False
         else:
-            logger.debug('Sleeping [%s seconds] before next poll', str(self._current_sleep_time))
-            time.sleep(self._current_sleep_time)
-            self._update_sleep_time()
-            return True
+            if sleep_time is None:
+                sleep_time = self._current_sleep_time
+                self._update_sleep_time()
+            self._sleep(min(sleep_time, self.remaining()))
+            return not self.cancelled()
 
     def reset(self, timeout=600):
         self._start_time = None
@@ -66,12 +123,38 @@ class Poller(object):
         Calling start() is optional, it is called implicitly at the first poll()
         """
         if self._start_time is None:
-            self._start_time = datetime.now()
+            self._start_time = monotonic()
             return True
         return False
 
+    def timeout_seconds(self):
+        return self._timeout_seconds
+
+    def remaining(self):
+        """
+        :return: seconds left before the timeout, the whole timeout if the poller is not started
+        """
+        if self._start_time is None:
+            return self._timeout_seconds
+        return max(0, self._timeout_seconds - (monotonic() - self._start_time))
+
+    def cancelled(self):
+        """
+        :return: True if the cancel event is set
+        """
+        return self._cancel_event is not None and self._cancel_event.is_set()
+
     def _timeout(self):
-        return (datetime.now() - self._start_time).seconds >= self._timeout_seconds
+        return self.remaining() <= 0
+
+    def _sleep(self, seconds):
+        if seconds <= 0:
+            return
+        logger.debug('Sleeping [%s seconds] before next poll', str(seconds))
+        if self._cancel_event is not None:
+            self._cancel_event.wait(seconds)
+        else:
+            time.sleep(seconds)
 
     def _update_sleep_time(self):
         if self._current_sleep_time < self._sleep_cap:
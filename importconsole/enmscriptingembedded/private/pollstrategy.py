@@ -0,0 +1,189 @@
+#!/usr/bin/python -tt
+import logging
+from threading import Lock
+from .poller import monotonic
+
+"""
+enm-client-scripting private module: pollstrategy
+
+This is a private module and should not be used outside of the client-scripting module.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptivePollStrategy(object):
+    """
+    Class deciding how long each poll for a command output should wait on the server (long-poll) and how long to sleep
+    between polls, learning from the completion times observed for each command verb (e.g. 'cmedit get').
+
+    The long-poll wait covers the time the command is expected to still need, so short commands are answered as soon as
+    they complete and long commands are polled a few times only. If the server answers sooner than asked without the
+    output being complete, it is not honouring the wait and the strategy falls back to sleeping between polls.
+
+    Example usage:
+        tracker = strategy.track(command_str)
+        while not complete:
+            get_output(wait_milli=tracker.wait_milli())
+            tracker.polled(complete)
+            time.sleep(tracker.sleep_time())
+    """
+
+    def __init__(self, default_wait_milli=1000, min_wait_milli=100, max_wait_milli=5000, margin=1.25, smoothing=0.3,
+                 sleep_time=0.1, sleep_multiplier=2, sleep_cap=1):
+        """
+        :param default_wait_milli:  long-poll wait used for the verbs without completion time observed yet
+        :param min_wait_milli:      minimum long-poll wait
+        :param max_wait_milli:      maximum long-poll wait
+        :param margin:              factor applied to the expected remaining time of the command
+        :param smoothing:           weight of the latest completion time on the expected completion time of the verb
+        :param sleep_time:          first sleep between polls when the server does not honour the long-poll wait
+        :param sleep_multiplier:    multiplier applied to the sleep time after each of those polls
+        :param sleep_cap:           maximum sleep between polls
+        """
+        self._default_wait_milli = default_wait_milli
+        self._min_wait_milli = min_wait_milli
+        self._max_wait_milli = max_wait_milli
+        self._margin = margin
+        self._smoothing = smoothing
+        self._sleep_time = sleep_time
+        self._sleep_multiplier = sleep_multiplier
+        self._sleep_cap = sleep_cap
+        self._lock = Lock()
+        self._stats = {}
+
+    def track(self, command_str):
+        """
+        :param command_str:     command about to be polled
+        :return:                PollTracker to be used while polling the command output
+        """
+        return PollTracker(self, command_verb(command_str))
+
+    def expected_seconds(self, verb):
+        """
+        :return:                expected completion time of the commands with the given verb, None if unknown
+        """
+        with self._lock:
+            stats = self._stats.get(verb)
+            return stats.expected_seconds if stats else None
+
+    def stats(self):
+        """
+        :return:                dictionary of verb to a dictionary with the number of commands completed, the number of
+                                polls made, the average polls per command and the average and expected completion times
+        """
+        with self._lock:
+            return dict((verb, stats.as_dict()) for verb, stats in self._stats.items())
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {}
+
+    def _completed(self, verb, seconds, polls):
+        with self._lock:
+            stats = self._stats.get(verb)
+            if stats is None:
+                stats = self._stats[verb] = _VerbStats()
+            stats.add(seconds, polls, self._smoothing)
+        logger.debug('Command [%s] completed in [%.3f seconds] after [%d] polls', verb, seconds, polls)
+
+
+class PollTracker(object):
+    """
+    Class tracking the polls of one command, see AdaptivePollStrategy
+    """
+
+    def __init__(self, strategy, verb):
+        self._strategy = strategy
+        self._verb = verb
+        self._expected_seconds = strategy.expected_seconds(verb)
+        self._start_time = monotonic()
+        self._poll_start_time = None
+        self._wait_milli = 0
+        self._polls = 0
+        self._current_sleep_time = 0
+
+    def verb(self):
+        return self._verb
+
+    def wait_milli(self, allow_wait=True):
+        """
+        :param allow_wait:      False if the server should answer straight away, e.g. other commands need polling
+        :return:                milliseconds the server should wait for the command output on the next poll
+        """
+        self._poll_start_time = monotonic()
+        if not allow_wait or self._current_sleep_time:
+            self._wait_milli = 0
+        elif self._expected_seconds is None:
+            self._wait_milli = self._strategy._default_wait_milli
+        else:
+            elapsed = self._poll_start_time - self._start_time
+            remaining = self._expected_seconds - elapsed
+            if remaining > 0:
+                wait_milli = remaining * self._strategy._margin * 1000
+            else:
+                # the command is late: wait longer the later it is, to keep the number of polls low
+                wait_milli = elapsed * 1000 / 2
+            self._wait_milli = int(min(max(wait_milli, self._strategy._min_wait_milli), self._strategy._max_wait_milli))
+        return self._wait_milli
+
+    def polled(self, complete):
+        """
+        Registers a poll made with the wait returned by wait_milli().
+
+        :param complete:        True if the command output is complete
+        """
+        self._polls += 1
+        if complete:
+            self._strategy._completed(self._verb, monotonic() - self._start_time, self._polls)
+        elif self._wait_milli and self._poll_start_time is not None and \
+                (monotonic() - self._poll_start_time) * 1000 < self._wait_milli / 2:
+            logger.debug('Server answered before the long-poll wait of [%d ms], sleeping between polls', self._wait_milli)
+            self._current_sleep_time = self._strategy._sleep_time
+        elif self._current_sleep_time:
+            self._current_sleep_time = min(self._current_sleep_time * self._strategy._sleep_multiplier,
+                                           self._strategy._sleep_cap)
+
+    def sleep_time(self):
+        """
+        :return:                seconds to sleep before the next poll
+        """
+        return self._current_sleep_time
+
+
+class _VerbStats(object):
+
+    def __init__(self):
+        self.commands = 0
+        self.polls = 0
+        self.total_seconds = 0.0
+        self.expected_seconds = None
+
+    def add(self, seconds, polls, smoothing):
+        self.commands += 1
+        self.polls += polls
+        self.total_seconds += seconds
+        if self.expected_seconds is None:
+            self.expected_seconds = seconds
+        else:
+            self.expected_seconds = self.expected_seconds * (1 - smoothing) + seconds * smoothing
+
+    def as_dict(self):
+        return {'commands': self.commands,
+                'polls': self.polls,
+                'polls_per_command': float(self.polls) / self.commands,
+                'average_seconds': self.total_seconds / self.commands,
+                'expected_seconds': self.expected_seconds}
+
+
+def command_verb(command_str):
+    """
+    :return:                    the command name followed by its sub-command, if any (e.g. 'cmedit get')
+    """
+    words = (command_str or '').split()[:2]
+    if len(words) == 2 and not words[1].isalpha():
+        words = words[:1]
+    return ' '.join(words).lower()
+
+
+default_strategy = AdaptivePollStrategy()
@@ -1,8 +1,11 @@
 import logging
 
 import sys
+import time
+import random
 import functools
-from .poller import Poller
+from threading import Lock, local
+from .poller import monotonic
 
 """
 enm-client-scripting private module: retry
@@ -12,8 +15,16 @@ This is a private module and should not be used outside of the client-scripting
 
 logger = logging.getLogger(__name__)
 
+# on_fail_sleep backoff: 2, 4, 8, 8, ... seconds, each one reduced by up to half by the jitter
+_BACKOFF_SLEEP_TIME = 2
+_BACKOFF_MULTIPLIER = 2
+_BACKOFF_CAP = 8
 
-def retry(attempts=2, on_fail_func=None, accept_func=None):
+# deadline of the retries in progress on the current thread, used to cut the sleeps of on_fail_sleep
+_retrying = local()
+
+
+def retry(attempts=2, on_fail_func=None, accept_func=None, deadline_seconds=None, metrics_key=None):
     """
     Decorator to support re-try
 
@@ -26,6 +37,7 @@ def retry(attempts=2, on_fail_func=None, accept_func=None):
     @retry(attempts=5)  # Specify the number of attempts to be made before giving up
     @retry(accept_func=accept_everything)  # Specify the function that decides if result can be accepted or not
     @retry(on_fail_func=on_fail_sleep)  # Specify the function to be called if result is not accepted (eg sleep)
+    @retry(attempts=5, deadline_seconds=30)  # Give up after 5 attempts or 30 seconds after the call
 
     Examples with lambda functions:
     @retry(accept_func=lambda result: False)  # lambda function that rejects every result
@@ -34,34 +46,62 @@ def retry(attempts=2, on_fail_func=None, accept_func=None):
     :param attempts: number of attempts to be made before giving up
     :param on_fail_func: function to call if execution fails
     :param accept_func: function that returns a boolean whether the result is accepted or not
+    :param deadline_seconds: number of seconds after the call, first attempt included, after which no more attempts
+                             are made, None to limit the retries by number of attempts only
+    :param metrics_key: function receiving the call arguments and returning the endpoint the retries are counted
+                        for in retry_stats(), next to the function name
     :return: function
     """
     def _retry(func):
-        # TODO: Consider change the retry to be "timeout" driven instead of number of "attempts"
+        retrier = Retry(attempts, on_fail_func, accept_func, deadline_seconds, metrics_key)
+
         def _wrap(*args, **kwargs):
-            return Retry(attempts, on_fail_func, accept_func).call(func, *args, **kwargs)
+            return retrier.call(func, *args, **kwargs)
         _wrap = functools.wraps(func, assigned=functools.WRAPPER_ASSIGNMENTS, updated=functools.WRAPPER_UPDATES)(_wrap)
         _wrap.__wrapped__ = func
         return _wrap
     return _retry
 
 
-def on_fail_sleep(result, poller, *args, **kwargs):
-    if poller is None:  # Means this is the first attempt
-        poller = Poller(timeout=float('inf'), sleep_time=2, sleep_multiplier=2, sleep_cap=float('inf'))
-        poller.start()
-    poller.poll()
-    return poller
+def on_fail_sleep(result, backoff, *args, **kwargs):
+    """
+    Sleeps before the next attempt, with a capped exponential backoff and a random jitter so that the clients failing
+    at the same time do not retry at the same time. The sleep never goes past the deadline of the retries.
+    """
+    if backoff is None:  # Means this is the first attempt
+        backoff = _BACKOFF_SLEEP_TIME
+    sleep_time = backoff / 2.0 + random.uniform(0, backoff / 2.0)
+    deadline = getattr(_retrying, 'deadline', None)
+    if deadline is not None:
+        sleep_time = min(sleep_time, max(0, deadline - monotonic()))
+    if sleep_time > 0:
+        logger.debug('Sleeping [%.3f seconds] before next attempt', sleep_time)
+        time.sleep(sleep_time)
+    return min(backoff * _BACKOFF_MULTIPLIER, _BACKOFF_CAP)
+
+
+def retry_stats():
+    """
+    :return: dictionary of endpoint to a dictionary with the number of calls retried, the number of attempts made for
+             them, the number of calls which succeeded after retrying and gave up, and the seconds spent retrying
+    """
+    return _metrics.stats()
+
+
+def reset_retry_stats():
+    _metrics.reset()
 
 
 class Retry(object):
-    def __init__(self, attempts=2, on_fail_func=None, accept_func=None):
+    def __init__(self, attempts=2, on_fail_func=None, accept_func=None, deadline_seconds=None, metrics_key=None):
         if attempts is not None:
             self.attempts = attempts
         if on_fail_func is not None:
             self.on_fail = on_fail_func
         if accept_func is not None:
             self.accept = accept_func
+        self.deadline_seconds = deadline_seconds
+        self.metrics_key = metrics_key
 
     def abandon(self, attempts):
         return attempts >= self.attempts
@@ -75,50 +115,132 @@ class Retry(object):
         return
 
     def call(self, f, *args, **kwargs):
-        attempts = 0
+        # Nothing is allocated until the first failure, the success path is the call and its acceptance, after reading
+        # the clock when the retries have a deadline
+        deadline = monotonic() + self.deadline_seconds if self.deadline_seconds is not None else None
+        try:
+            result = f(*args, **kwargs)
+        except Exception:
+            exc_info = sys.exc_info()  # exc_info is used to keep the stacktrace
+            if self.accept(exc_info[1]):
+                # raise like this is required to keep the original call's stack trace
+                raise exc_info[0], exc_info[1], exc_info[2]
+            return self._retry(f, exc_info, True, deadline, args, kwargs)
+
+        if self.accept(result):
+            return result
+        return self._retry(f, result, False, deadline, args, kwargs)
+
+    def _retry(self, f, result, is_exception, deadline, args, kwargs):
+        start = monotonic()
+        outer_deadline = getattr(_retrying, 'deadline', None)
+        if outer_deadline is not None and (deadline is None or outer_deadline < deadline):
+            deadline = outer_deadline
+        _retrying.deadline = deadline
+
+        attempts = 1
         on_fail_return_object = None
+        try:
+            while True:
+                logger.debug("Function [%s] call failed", f.__name__)
+
+                if self.abandon(attempts) or _is_past(deadline):
+                    return self._give_up(f, args, kwargs, attempts, start, result, is_exception)
+
+                on_fail_return_object = self.on_fail(_value(result, is_exception), on_fail_return_object,
+                                                     *args, **kwargs)
+                # on_fail may have slept until the deadline
+                if _is_past(deadline):
+                    return self._give_up(f, args, kwargs, attempts, start, result, is_exception)
+                logger.debug("Re-trying function call [%s]", f.__name__)
 
-        while True:
-            try:
                 attempts += 1
-                result = Result(f(*args, **kwargs))
-            except Exception:
-                result = Result(sys.exc_info(), True)  # exc_info is used to keep the stacktrace
+                try:
+                    result, is_exception = f(*args, **kwargs), False
+                except Exception:
+                    result, is_exception = sys.exc_info(), True
+
+                if self.accept(_value(result, is_exception)):
+                    self._record(f, args, kwargs, attempts, True, start)
+                    return _return_raise(result, is_exception)
+        finally:
+            _retrying.deadline = outer_deadline
+
+    def _give_up(self, f, args, kwargs, attempts, start, result, is_exception):
+        logger.debug("Giving up [%s] after [%s] attempts, returning or raising result", f.__name__, attempts)
+        self._record(f, args, kwargs, attempts, False, start)
+        return _return_raise(result, is_exception)
+
+    def _record(self, f, args, kwargs, attempts, recovered, start):
+        key = f.__name__
+        if self.metrics_key is not None:
+            try:
+                key = '%s %s' % (key, self.metrics_key(*args, **kwargs))
+            except Exception as e:
+                logger.debug('Failed to get the metrics key of [%s]: %s', f.__name__, e)
+        _metrics.add(key, attempts, recovered, monotonic() - start)
 
-            if self.accept(result.get_result()):
-                return result.return_raise_result()
 
-            logger.debug("Function [%s] call failed", f.__name__)
+def _is_past(deadline):
+    return deadline is not None and monotonic() >= deadline
 
-            if self.abandon(attempts):
-                logger.debug("Giving up [%s] after [%s] attempts, returning or raising result", f.__name__, attempts)
-                return result.return_raise_result()
 
-            on_fail_return_object = self.on_fail(result.get_result(), on_fail_return_object, *args, **kwargs)
-            logger.debug("Re-trying function call [%s]", f.__name__)
+def _value(result, is_exception):
+    # Exception is stored as a tuple: (<type>, <exception instance>, <trace object>)
+    return result[1] if is_exception else result
 
 
-class Result(object):
-    """
-    Result object that wraps the result
-    """
-    def __init__(self, result, is_exception=False):
-        self._result = result
-        self._is_exception = is_exception
-
-    def get_result(self):
-        if self._is_exception:
-            # Exception is stored as a tuple: (<type>, <exception instance>, <trace object>)
-            # Returning the exception
-            return self._result[1]
-        else:
-            return self._result
-
-    def return_raise_result(self):
-        if self._is_exception:
-            # raise like this is required to keep the original call's stack trace
-            raise self._result[0], self._result[1], self._result[2]
-            # The above is incompatible with Python 3, install six and replace raise with this:
-            # six.reraise(self._result[0], self._result[1], self._result[2])
-        else:
-            return self._result
+def _return_raise(result, is_exception):
+    if is_exception:
+        # raise like this is required to keep the original call's stack trace
+        raise result[0], result[1], result[2]
+        # The above is incompatible with Python 3, install six and replace raise with this:
+        # six.reraise(result[0], result[1], result[2])
+    return result
+
+
+class _RetryMetrics(object):
+
+    def __init__(self):
+        self._lock = Lock()
+        self._stats = {}
+
+    def add(self, key, attempts, recovered, seconds):
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _EndpointStats()
+            stats.add(attempts, recovered, seconds)
+
+    def stats(self):
+        with self._lock:
+            return dict((key, stats.as_dict()) for key, stats in self._stats.items())
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+
+class _EndpointStats(object):
+
+    def __init__(self):
+        self.retried = 0
+        self.attempts = 0
+        self.recovered = 0
+        self.seconds = 0.0
+
+    def add(self, attempts, recovered, seconds):
+        self.retried += 1
+        self.attempts += attempts
+        self.recovered += 1 if recovered else 0
+        self.seconds += seconds
+
+    def as_dict(self):
+        return {'retried': self.retried,
+                'attempts': self.attempts,
+                'recovered': self.recovered,
+                'given_up': self.retried - self.recovered,
+                'seconds': self.seconds}
+
+
+_metrics = _RetryMetrics()
@@ -2,6 +2,7 @@
 from __future__ import absolute_import
 import socket
 import io
+import re
 import hashlib
 import logging
 import requests
@@ -42,6 +43,8 @@ except AttributeError:
 
 _AUTH_COOKIE_KEY = 'iPlanetDirectoryPro'
 _ENV_CLIENT_SCRIPTING_VERIFY = 'ENM_CLIENT_SCRIPTING_VERIFY'
+_RETRY_DEADLINE_SECONDS = 30
+_ID_PATH_SEGMENT = re.compile(r'/[^/]*[0-9][^/]*')
 
 logger = logging.getLogger(__name__)
 
@@ -97,6 +100,13 @@ def __external_session(url):
     return ExternalSession(url)
 
 
+def _endpoint(session, url, *args, **kwargs):
+    """
+    :return: path of the url, with the segments holding ids (e.g. request or file ids) replaced by '*'
+    """
+    return _ID_PATH_SEGMENT.sub('/*', urlparse(url).path)
+
+
 def _check_for_warning_header(response):
     headers = response.headers
     for header_key in headers:
@@ -202,7 +212,8 @@ class ExternalSession(Session):
         return True
 
     @overrides
-    @retry(attempts=5, accept_func=_accept_response_post, on_fail_func=on_fail_sleep)
+    @retry(attempts=5, accept_func=_accept_response_post, on_fail_func=on_fail_sleep,
+           deadline_seconds=_RETRY_DEADLINE_SECONDS, metrics_key=_endpoint)
     def post(self, url, data=None, **kwargs):
         logger.debug('ExternalSession POST called [%s]', url)
         if 'verify' not in kwargs:
@@ -211,7 +222,8 @@ class ExternalSession(Session):
             return super(ExternalSession, self).post(url, data=data, **kwargs)
 
     @overrides
-    @retry(attempts=5, accept_func=_accept_response, on_fail_func=on_fail_sleep)
+    @retry(attempts=5, accept_func=_accept_response, on_fail_func=on_fail_sleep,
+           deadline_seconds=_RETRY_DEADLINE_SECONDS, metrics_key=_endpoint)
     def get(self, url, **kwargs):
         logger.debug('InternalSession GET called [%s]', url)
         if 'verify' not in kwargs:
@@ -219,7 +231,8 @@ class ExternalSession(Session):
         return super(ExternalSession, self).get(url, **kwargs)
 
     @overrides
-    @retry(attempts=5, accept_func=_accept_response, on_fail_func=on_fail_sleep)
+    @retry(attempts=5, accept_func=_accept_response, on_fail_func=on_fail_sleep,
+           deadline_seconds=_RETRY_DEADLINE_SECONDS, metrics_key=_endpoint)
     def head(self, url, **kwargs):
         logger.debug('InternalSession HEAD called [%s]', url)
         if 'verify' not in kwargs:
@@ -265,19 +278,22 @@ class InternalSession(ExternalSession):
         self._re_authenticate()
 
     @overrides
-    @retry(attempts=2, accept_func=_accept_response_redirect, on_fail_func=_on_fail_reload_cookie)
+    @retry(attempts=2, accept_func=_accept_response_redirect, on_fail_func=_on_fail_reload_cookie,
+           metrics_key=_endpoint)
     def post(self, url, data=None, **kwargs):
         logger.debug('InternalSession POST called [%s]', url)
         return super(InternalSession, self).post(url, data=data, **kwargs)
 
     @overrides
-    @retry(attempts=2, accept_func=_accept_response_redirect, on_fail_func=_on_fail_reload_cookie)
+    @retry(attempts=2, accept_func=_accept_response_redirect, on_fail_func=_on_fail_reload_cookie,
+           metrics_key=_endpoint)
     def get(self, url, **kwargs):
         logger.debug('InternalSession GET called [%s]', url)
         return super(InternalSession, self).get(url, **kwargs)
 
     @overrides
-    @retry(attempts=2, accept_func=_accept_response_redirect, on_fail_func=_on_fail_reload_cookie)
+    @retry(attempts=2, accept_func=_accept_response_redirect, on_fail_func=_on_fail_reload_cookie,
+           metrics_key=_endpoint)
     def head(self, url, **kwargs):
         logger.debug('InternalSession HEAD called [%s]', url)
         return super(InternalSession, self).head(url, **kwargs)
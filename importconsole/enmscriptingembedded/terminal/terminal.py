@@ -23,7 +23,7 @@ class EnmTerminal():
     def __init__(self, session=None):
         self._handler = ExecutionHandler(session, TerminalOutputFactory(), self._MEDIA_TYPE)
 
-    def execute(self, command_str, file=None, timeout_seconds=600):
+    def execute(self, command_str, file=None, timeout_seconds=600, cancel_event=None):
         """
         Execute the command and return the result from enm.
 
@@ -32,10 +32,12 @@ class EnmTerminal():
         :param file:       file object to be imported  - optional parameter - needed if the command requires a file for
         upload
         :param timeout_seconds: number of seconds before a timeout will occur on a command. Default value = 600 seconds 
+        :param cancel_event: threading.Event which stops waiting for the command output when set, raising
+        IllegalStateException - optional parameter
         :return TerminalOutput: TerminalOutput instance
         """
         logger.debug('Executing Terminal command...')
-        return self._handler.execute(command_str, file, timeout_seconds)
+        return self._handler.execute(command_str, file, timeout_seconds, cancel_event)
 
 
 class TerminalOutput(Output):
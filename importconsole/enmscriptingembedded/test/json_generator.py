@@ -1,3 +1,5 @@
+import json
+
 COMMAND = 'cmedit get * MeContext.* -t'
 
 
@@ -51,6 +53,35 @@ def generate_json(nr_lines, nr_tables, nr_rows, nr_columns, nr_of_files=0, termi
     return json
 
 
+def generate_json_chunks(nr_lines, nr_tables, nr_rows, nr_columns, nr_chunks):
+    """
+    Generates the same output as generate_json split in a number of partial responses, as streamed by the server.
+    The rows of a table can be split across responses, each part being a group with the same group key.
+    """
+    items = [(None, l) for l in range(nr_lines)] + [(t, r) for t in range(nr_tables) for r in range(nr_rows)]
+    chunk_size = max(1, -(-len(items) // nr_chunks))
+    chunks = []
+    for start in range(0, len(items), chunk_size):
+        elements = []
+        for table, index in items[start:start + chunk_size]:
+            if table is None:
+                elements.append({"type": "text", "value": "line_number_" + str(index)})
+                continue
+            if not elements or elements[-1].get("_group_key") != str(table):
+                elements.append({"type": "group", "_group_key": str(table), "_label": ["table" + str(table)],
+                                 "_elements": []})
+            elements[-1]["_elements"].append(
+                {"type": "group", "_elements": [{"type": "text", "_label": ["column" + str(c)],
+                                                 "value": "cell_value_at_" + str(table) + str(index) + str(c)}
+                                                for c in range(nr_columns)]})
+        last = start + chunk_size >= len(items)
+        chunks.append(json.dumps({"output": {"type": "group", "_elements": elements},
+                                  "command": COMMAND,
+                                  "_response_status": "COMPLETE" if last else "FETCHING",
+                                  "v": "2"}))
+    return chunks
+
+
 # DATA
 
 first_line = 'first_line'
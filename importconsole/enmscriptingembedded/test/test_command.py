@@ -31,3 +31,43 @@ def test_command_output_factory_create_output():
     assert expected_output.__getattribute__('_http_response_code') == actual_output.__getattribute__(
         '_http_response_code')
     assert expected_output.__getattribute__('_parsed_json') == actual_output.__getattribute__('_parsed_json')
+
+
+def test_get_tables_columnar():
+    output = CommandOutput(200, True, generate_json(3, 2, 4, 3))
+    tables = output.get_tables()
+
+    assert len(tables) == 2
+    table = tables[1]
+    assert table.labels() == ('table1',)
+    assert table.headers() == ('column0', 'column1', 'column2')
+    assert len(table) == 4
+    assert table.column('column2') == ['cell_value_at_1%d2' % r for r in range(4)]
+    assert table.row(3) == ('cell_value_at_130', 'cell_value_at_131', 'cell_value_at_132')
+    assert list(table.rows())[0] == table.row(0)
+    assert len(table.columns()) == 3
+    assert_raises(KeyError, table.column, 'missing')
+
+
+def test_get_tables_matches_elements():
+    output = CommandOutput(200, True, generate_json(1, 3, 5, 4))
+    for table, group in zip(output.get_tables(), output.get_output().groups()):
+        assert list(table.rows()) == [tuple(cell.value() for cell in row) for row in group]
+        assert table.headers() == tuple(cell.labels()[0] for cell in group[0])
+
+
+def test_table_missing_cells_are_none():
+    table = TableView({'type': 'group', '_elements': [
+        {'type': 'group', '_elements': [{'type': 'text', '_label': ['a'], 'value': 'a0'},
+                                        {'type': 'text', '_label': ['b'], 'value': 'b0'}]},
+        {'type': 'group', '_elements': [{'type': 'text', '_label': ['b'], 'value': 'b1'},
+                                        {'type': 'text', '_label': ['c'], 'value': 'c1'}]}]})
+
+    assert table.headers() == ('a', 'b', 'c')
+    assert table.columns() == [['a0', None], ['b0', 'b1'], [None, 'c1']]
+    assert table.index_by('b') == {'b0': {'a': 'a0', 'b': 'b0', 'c': None}, 'b1': {'a': None, 'b': 'b1', 'c': 'c1'}}
+
+
+def test_get_tables_without_tables():
+    output = CommandOutput(200, True, generate_json(3, 0, 0, 0))
+    assert output.get_tables() == []
@@ -168,3 +168,88 @@ def test_group_element_deep_copy():
     assert len(group) is 2
     group_copied = copy.deepcopy(group)
     assert len(group_copied) is 2
+
+
+# ElementView
+
+def test_element_view_reads_table():
+    cmd_output = CommandOutput(200, True, generate_json(2, 1, 3, 2))
+    view = cmd_output.get_output_view()
+
+    assert len(view) == 3
+    assert view[0].value() == 'line_number_0'
+    assert not view[0].is_group()
+
+    table = view.groups()[0]
+    assert table.labels() == ('table0',)
+    assert len(table) == 3
+    assert [row.values() for row in table][2] == ['cell_value_at_020', 'cell_value_at_021']
+    assert table[0][1].labels() == ('column1',)
+    assert [cell.value() for cell in table[1][:]] == ['cell_value_at_010', 'cell_value_at_011']
+
+
+def test_element_view_creates_cells_on_access():
+    cmd_output = CommandOutput(200, True, generate_json(0, 1, 2, 2))
+    row = cmd_output.get_output_view()[0][0]
+
+    assert isinstance(row, ElementView)
+    assert isinstance(row[0], ElementView)
+    assert type(row.element()) is ElementGroup
+    assert type(row.element()[0]) is TextElement
+    assert row.element()[0].value() == row[0].value()
+
+
+def test_element_view_matches_elements():
+    cmd_output = CommandOutput(200, True, generate_json(5, 2, 3, 3, 2))
+    view = cmd_output.get_output_view()
+    output = cmd_output.get_output()
+
+    assert len(view) == len(output)
+    assert len(view.groups()) == len(output.groups())
+    for table_view, table in zip(view.groups(), output.groups()):
+        assert table_view.labels() == table.labels()
+        for row_view, row in zip(table_view, table):
+            assert row_view.values() == [cell.value() for cell in row]
+            assert [cell.labels() for cell in row_view] == [cell.labels() for cell in row]
+
+    # the output JSON is still readable once the elements are created
+    assert cmd_output.get_output_view()[-1].element().get_name() == output[-1].get_name()
+
+
+def test_command_output_files_do_not_create_the_output():
+    cmd_output = CommandOutput(200, True, generate_json(5, 2, 3, 3, 2))
+
+    assert len(cmd_output.files()) == 2
+    assert cmd_output._output is None
+
+
+def test_group_find_by_label_is_indexed():
+    cmd_output = CommandOutput(200, True, generate_json(0, 1, 3, 3))
+    row = cmd_output.get_output()[0][0]
+
+    found = row.find_by_label('column1')
+    assert len(found) == 1
+    assert found[0] is row[1]
+    assert found.labels() == ('column1',)
+    assert row.find_by_label('column1') is found
+    assert len(row.find_by_label('missing')) == 0
+
+
+def test_group_find_by_label_with_repeated_labels():
+    e1 = TextElement({'value': 'v1', '_label': ['a', 'a', 'b']})
+    e2 = TextElement({'value': 'v2', '_label': ['b']})
+    group = ElementGroup(ElementGroup._get_attributes(items=[e1, e2]))
+
+    assert list(group.find_by_label('a')) == [e1]
+    assert list(group.find_by_label('b')) == [e1, e2]
+
+
+def test_group_find_by_type_value_does_not_copy_attributes():
+    cmd_output = CommandOutput(200, True, generate_json(2, 1, 1, 1, 1))
+    output = cmd_output.get_output()
+
+    texts = output._find_by_type_value(TextElement.TYPE)
+    assert len(texts) == 2
+    assert texts[0] is output[0]
+    assert len(output._find_by_type_value(FileElement.TYPE)) == 1
+    assert output._find_by_type(ElementGroup) is output.groups()
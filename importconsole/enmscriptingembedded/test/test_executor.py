@@ -4,10 +4,14 @@ import os
 import logging
 from nose.tools import assert_raises
 from mock import MagicMock, ANY, patch
-from requests.exceptions import ConnectionError
+import sys
+from threading import Event, Lock, Thread
+from requests.exceptions import ConnectionError, ChunkedEncodingError
 from enmscripting import *
 from enmscripting.common.file import FileResult
+from enmscripting.common.future import as_completed
 from enmscripting.private.executionhandler import ExecutionHandler
+from enmscripting.private.pollstrategy import AdaptivePollStrategy
 from enmscripting.command.command import EnmCommand
 from enmscripting.terminal.terminal import TerminalOutputFactory
 from enmscripting.test.json_generator import generate_json
@@ -127,6 +131,121 @@ def test_get_bytes_internal_error():
     assert_raises(InternalError, handler.get_bytes, 'appId', 'fileId')
 
 
+def mock_download_responses(*responses):
+    """
+    :param responses:   tuples of (status code, list of blocks, headers), a block being an exception to raise
+    """
+    session = MagicMock()
+    session.url = lambda: 'fakeUrl'
+    mock_responses = []
+    for status_code, blocks, headers in responses:
+        r = requests.Response()
+        r.status_code = status_code
+        r.headers.update(headers)
+        r.iter_content = _iter_blocks(blocks)
+        r.raw = MagicMock()
+        mock_responses.append(r)
+    session.get.side_effect = mock_responses
+    return session
+
+
+def _iter_blocks(blocks):
+    def iter_content(chunk_size=1):
+        for block in blocks:
+            if isinstance(block, Exception):
+                raise block
+            yield block
+    return iter_content
+
+
+def test_download_uses_large_chunks():
+    session = mock_download_response()
+    chunk_sizes = []
+    session.get(None).iter_content = lambda chunk_size=1: chunk_sizes.append(chunk_size) or iter([b'abc'])
+    handler = ExecutionHandler(session)
+
+    assert handler.get_bytes('appId', 'fileId') == b'abc'
+    assert chunk_sizes == [ExecutionHandler._DOWNLOAD_CHUNK_SIZE]
+
+
+def test_download_resumes_with_range_after_dropped_connection():
+    session = mock_download_responses(
+        (200, [b'abc', ChunkedEncodingError('dropped')], {'Content-Length': '6'}),
+        (206, [b'def'], {'Content-Length': '3', 'Content-Range': 'bytes 3-5/6'}))
+    handler = ExecutionHandler(session)
+
+    assert handler.get_bytes('appId', 'fileId') == b'abcdef'
+    assert 'Range' not in session.get.call_args_list[0][1]['headers']
+    assert session.get.call_args_list[1][1]['headers']['Range'] == 'bytes=3-'
+
+
+def test_download_resumes_when_content_is_shorter_than_content_length():
+    session = mock_download_responses(
+        (200, [b'abc'], {'Content-Length': '6'}),
+        (206, [b'def'], {'Content-Length': '3', 'Content-Range': 'bytes 3-5/6'}))
+    handler = ExecutionHandler(session)
+
+    content = io.BytesIO()
+    assert handler.download_to('appId', 'fileId', content) == 6
+    assert content.getvalue() == b'abcdef'
+
+
+def test_download_restarts_if_range_is_not_supported():
+    session = mock_download_responses(
+        (200, [b'abc', ConnectionError('dropped')], {'Content-Length': '6'}),
+        (200, [b'abcdef'], {'Content-Length': '6'}))
+    handler = ExecutionHandler(session)
+
+    handler.download('appId', 'fileId', _FILE_PATH)
+    with io.open(_FILE_PATH, 'rb') as f:
+        assert f.read() == b'abcdef'
+    os.remove(_FILE_PATH)
+
+
+def test_download_restarts_if_range_does_not_match():
+    # the server answers the request of the bytes from 3 with the bytes from 2
+    session = mock_download_responses(
+        (200, [b'abc', ConnectionError('dropped')], {'Content-Length': '6'}),
+        (206, [b'cdef'], {'Content-Length': '4', 'Content-Range': 'bytes 2-5/6'}),
+        (200, [b'abcdef'], {'Content-Length': '6'}))
+    handler = ExecutionHandler(session)
+
+    assert handler.get_bytes('appId', 'fileId') == b'abcdef'
+    assert session.get.call_args_list[1][1]['headers']['Range'] == 'bytes=3-'
+    assert 'Range' not in session.get.call_args_list[2][1]['headers']
+
+
+def test_download_gives_up_after_max_resumes():
+    responses = [(200, [b'a', ChunkedEncodingError('dropped')], {})]
+    responses += [(200, [ChunkedEncodingError('dropped')], {})] * ExecutionHandler._DOWNLOAD_MAX_RESUMES
+    handler = ExecutionHandler(mock_download_responses(*responses))
+
+    assert_raises(ChunkedEncodingError, handler.get_bytes, 'appId', 'fileId')
+
+
+def test_download_checksum():
+    handler = ExecutionHandler(mock_download_responses((200, [b'abc'], {})))
+    assert handler.get_bytes('appId', 'fileId', checksum='md5:900150983CD24FB0D6963F7D28E17F72') == b'abc'
+
+
+def test_download_checksum_mismatch_removes_file():
+    handler = ExecutionHandler(mock_download_responses((200, [b'abc'], {})))
+    assert_raises(ChecksumError, handler.download, 'appId', 'fileId', _FILE_PATH, checksum='md5:' + '0' * 32)
+    assert not os.path.exists(_FILE_PATH)
+
+
+def test_get_bytes_mapped():
+    handler = ExecutionHandler(mock_download_responses((200, [b'abc', b'def'], {})))
+    content = handler.get_bytes_mapped('appId', 'fileId')
+
+    assert content[:] == b'abcdef'
+    assert len(content) == 6
+    content.close()
+
+    handler = ExecutionHandler(mock_download_responses((200, [], {})))
+    assert len(handler.get_bytes_mapped('appId', 'fileId')) == 0
+
+
 # FILE / GET_FILE_NAME
 
 class File():
@@ -215,7 +334,7 @@ def test_file_result_delegate_no_path():
     handler = MagicMock()
     object_under_test = FileResult("app", "file", handler)
     object_under_test.download()
-    handler.download.assert_called_with('app', 'file', None)
+    handler.download.assert_called_with('app', 'file', None, checksum=None)
 
 
 def test_file_result_delegate_with_path():
@@ -226,7 +345,7 @@ def test_file_result_delegate_with_path():
     terminal.download = MagicMock()
     object_under_test = FileResult("app", "file", terminal)
     object_under_test.download('some/path')
-    terminal.download.assert_called_with('app', 'file', 'some/path')
+    terminal.download.assert_called_with('app', 'file', 'some/path', checksum=None)
 
 
 def test_get_bytes_result_delegate():
@@ -237,7 +356,7 @@ def test_get_bytes_result_delegate():
     terminal.download = MagicMock()
     object_under_test = FileResult("app", "file", terminal)
     object_under_test.get_bytes()
-    terminal.get_bytes.assert_called_with('app', 'file')
+    terminal.get_bytes.assert_called_with('app', 'file', checksum=None)
 
 
 def test_command_execute_handler_delegate():
@@ -249,7 +368,134 @@ def test_command_execute_handler_delegate():
     object_under_test._handler = MagicMock()
     object_under_test._handler.execute.return_value = (NORMAL_RESPONSE, 200, True)
     object_under_test.execute("aaa")
-    object_under_test._handler.execute.assert_called_with('aaa', None, 600)
+    object_under_test._handler.execute.assert_called_with('aaa', None, 600, None)
+
+
+# PIPELINED EXECUTION TESTS
+
+class PipelineSessionMock(object):
+    """
+    Session answering each command after a number of polls, keeping track of the commands in flight
+    """
+    def __init__(self, polls_to_complete=1, post_res_code=201):
+        self.polls_to_complete = polls_to_complete
+        self.post_res_code = post_res_code
+        self.lock = Lock()
+        self.posted = []
+        self.sequences = []
+        self.polls = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def url(self):
+        return 'fakeUrl'
+
+    def post(self, url, headers=None, files=None, data=None, allow_redirects=True):
+        with self.lock:
+            request_id = 'req_%d' % len(self.posted)
+            self.posted.append(files['command'])
+            self.sequences.append(files['requestSequence'])
+            if self.post_res_code == 201:
+                self.polls[request_id] = 0
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return _response(self.post_res_code, request_id)
+
+    def get(self, url, headers=None, allow_redirects=True):
+        request_id = url.split('/')[-2]
+        with self.lock:
+            self.polls[request_id] += 1
+            complete = self.polls[request_id] >= self.polls_to_complete
+            if complete:
+                self.in_flight -= 1
+        return _response(200, generate_json(1, 0, 0, 0, terminated=complete))
+
+
+def _response(status_code, text):
+    response = MagicMock()
+    response.status_code = status_code
+    response.text = text
+    return response
+
+
+def test_execute_many_completes_all_commands():
+    session = PipelineSessionMock(polls_to_complete=3)
+    handler = ExecutionHandler(session, output_factory=TerminalOutputFactory())
+    commands = ['command %d' % i for i in range(10)]
+
+    futures = handler.execute_many(commands, max_in_flight=3)
+
+    assert [future.command() for future in futures] == commands
+    for future in futures:
+        assert future.result(timeout=5).is_command_result_available() is True
+    assert sorted(session.posted) == sorted(commands)
+
+
+def test_execute_many_caps_commands_in_flight():
+    session = PipelineSessionMock(polls_to_complete=2)
+    handler = ExecutionHandler(session, output_factory=TerminalOutputFactory())
+
+    futures = handler.execute_many(['command %d' % i for i in range(12)], max_in_flight=4)
+    for future in as_completed(futures, timeout=5):
+        future.result()
+
+    assert session.max_in_flight == 4
+
+
+def test_execute_many_uses_a_request_sequence_per_command_in_flight():
+    session = PipelineSessionMock(polls_to_complete=2)
+    handler = ExecutionHandler(session, output_factory=TerminalOutputFactory())
+
+    for future in handler.execute_many(['command %d' % i for i in range(3)], max_in_flight=3):
+        future.result(timeout=5)
+
+    assert len(set(session.sequences)) == 3
+    assert handler._instance_id not in session.sequences
+
+
+def test_execute_many_post_fails():
+    session = PipelineSessionMock(post_res_code=404)
+    handler = ExecutionHandler(session, output_factory=TerminalOutputFactory())
+
+    futures = handler.execute_many(['command'])
+
+    assert futures[0].result(timeout=5).is_command_result_available() is False
+
+
+def test_execute_many_times_out():
+    session = PipelineSessionMock(polls_to_complete=sys.maxsize)
+    handler = ExecutionHandler(session, output_factory=TerminalOutputFactory())
+
+    futures = handler.execute_many(['command'], timeout_seconds=0)
+
+    assert_raises(TimeoutException, futures[0].result, 5)
+
+
+def test_execute_many_cancelled_commands_are_not_posted():
+    session = PipelineSessionMock()
+    handler = ExecutionHandler(session, output_factory=TerminalOutputFactory())
+    with patch.object(Thread, 'start'):
+        futures = handler.execute_many(['command 1', 'command 2'])
+
+    assert futures[1].cancel() is True
+    handler._run_pipeline(futures, 1, 600)
+
+    assert session.posted == ['command 1']
+    assert futures[0].result(timeout=0).is_command_result_available() is True
+    assert_raises(IllegalStateException, futures[1].result, 0)
+    assert futures[0].cancel() is False
+
+
+def test_execute_many_output_downloads_with_its_own_request_id():
+    session = PipelineSessionMock()
+    handler = ExecutionHandler(session, output_factory=TerminalOutputFactory())
+
+    output = handler.execute_many(['command'])[0].result(timeout=5)
+    handler._last_request_id = 'another_request'
+    handler._command_download = MagicMock()
+    output._handler.get_bytes('appId', 'fileId')
+
+    handler._command_download.assert_called_with('appId', 'fileId', 'req_0')
 
 
 def set_command_mock(handler, post_response_text='', post_res_code='', get_res_code=''):
@@ -272,3 +518,37 @@ NORMAL_RESPONSE = '{"nonCachableDtos":[],"responseDto":' \
                   '{"dtoType":"line","value":"","dtoName":null},{"dtoType":"line","value":null,"dtoName":null},' \
                   '{"dtoType":"line","value":"FDN : MeContext=LTE09ERBS00002","dtoName":null},' \
                   '{"dtoType":"command","value":"cmedit get * MeContext","dtoName":null}],"dtoName":null}}'
+
+
+def test_execute_records_poll_stats():
+    handler = ExecutionHandler(output_factory=TerminalOutputFactory(), poll_strategy=AdaptivePollStrategy())
+    set_command_mock(handler, post_response_text='req', post_res_code=201, get_res_code=200)
+    handler.execute('cmedit get * MeContext')
+    handler.execute('cmedit get * NetworkElement')
+
+    stats = handler.poll_stats()
+    assert stats['cmedit get']['commands'] == 2
+    assert stats['cmedit get']['polls'] == 2
+    assert '_wait_milli=1000' in handler._session.get.call_args_list[0][0][0]
+
+
+def test_execute_cancelled():
+    handler = ExecutionHandler(output_factory=TerminalOutputFactory())
+    set_command_mock(handler, post_response_text='req', post_res_code=201, get_res_code=200)
+    handler._session.get.return_value.text = generate_json(1, 0, 0, 0, terminated=False)
+    cancel_event = Event()
+    handler._session.get.side_effect = lambda *args, **kwargs: cancel_event.set() or handler._session.get.return_value
+
+    assert_raises(IllegalStateException, handler.execute, 'cmedit get *', cancel_event=cancel_event)
+    assert handler._session.get.call_count == 1
+
+
+def test_execute_fractional_timeout_limits_long_poll_wait():
+    handler = ExecutionHandler(output_factory=TerminalOutputFactory(), poll_strategy=AdaptivePollStrategy())
+    set_command_mock(handler, post_response_text='req', post_res_code=201, get_res_code=200)
+    handler._session.get.return_value.text = generate_json(1, 0, 0, 0, terminated=False)
+
+    assert_raises(TimeoutException, handler.execute, 'cmedit get *', timeout_seconds=0.2)
+    for call in handler._session.get.call_args_list:
+        url = call[0][0]
+        assert '_wait_milli' not in url or int(url.rsplit('=', 1)[1]) <= 200
@@ -0,0 +1,98 @@
+import logging
+
+from mock import patch
+from enmscripting.private.pollstrategy import AdaptivePollStrategy, command_verb
+
+logging.basicConfig()
+logging.getLogger().setLevel(level=logging.DEBUG)
+
+
+def test_command_verb():
+    assert command_verb('cmedit get * MeContext') == 'cmedit get'
+    assert command_verb('CMEDIT SET MeContext=1 userLabel=x') == 'cmedit set'
+    assert command_verb('cmedit import -f file:a.xml') == 'cmedit import'
+    assert command_verb('cmedit -h') == 'cmedit'
+    assert command_verb('alarm') == 'alarm'
+    assert command_verb(None) == ''
+
+
+def test_unknown_verb_uses_default_wait():
+    strategy = AdaptivePollStrategy(default_wait_milli=1000)
+    tracker = strategy.track('cmedit get * MeContext')
+    assert tracker.wait_milli() == 1000
+    assert tracker.sleep_time() == 0
+
+
+def test_wait_follows_expected_completion_time():
+    strategy = AdaptivePollStrategy(min_wait_milli=100, max_wait_milli=5000, margin=1)
+    with patch('enmscripting.private.pollstrategy.monotonic') as mock_monotonic:
+        mock_monotonic.side_effect = [0, 0, 2, 2]
+        tracker = strategy.track('cmedit get x')
+        tracker.wait_milli()
+        tracker.polled(True)
+    assert strategy.expected_seconds('cmedit get') == 2
+
+    with patch('enmscripting.private.pollstrategy.monotonic') as mock_monotonic:
+        mock_monotonic.side_effect = [10, 10, 10.5]
+        tracker = strategy.track('cmedit get y')
+        assert tracker.wait_milli() == 2000
+        assert tracker.wait_milli() == 1500
+
+    with patch('enmscripting.private.pollstrategy.monotonic') as mock_monotonic:
+        mock_monotonic.side_effect = [10, 11.99, 30, 100, 100]
+        tracker = strategy.track('cmedit get z')
+        assert tracker.wait_milli() == 100
+        assert tracker.wait_milli() == 5000
+        assert strategy.track('cmedit set z').wait_milli() == 1000
+
+
+def test_falls_back_to_sleep_when_server_does_not_wait():
+    strategy = AdaptivePollStrategy(default_wait_milli=1000, sleep_time=0.1, sleep_multiplier=2, sleep_cap=0.3)
+    with patch('enmscripting.private.pollstrategy.monotonic') as mock_monotonic:
+        mock_monotonic.side_effect = [0, 0, 0.01, 0.02, 0.03, 0.04, 0.05]
+        tracker = strategy.track('cmedit get x')
+        assert tracker.wait_milli() == 1000
+        tracker.polled(False)
+        assert tracker.sleep_time() == 0.1
+        assert tracker.wait_milli() == 0
+        tracker.polled(False)
+        assert tracker.sleep_time() == 0.2
+        assert tracker.wait_milli() == 0
+        tracker.polled(False)
+        assert tracker.sleep_time() == 0.3
+
+
+def test_long_poll_honoured_does_not_sleep():
+    strategy = AdaptivePollStrategy(default_wait_milli=1000)
+    with patch('enmscripting.private.pollstrategy.monotonic') as mock_monotonic:
+        mock_monotonic.side_effect = [0, 0, 1, 1, 2]
+        tracker = strategy.track('cmedit get x')
+        tracker.wait_milli()
+        tracker.polled(False)
+        assert tracker.sleep_time() == 0
+        assert tracker.wait_milli() == 1000
+
+
+def test_stats_per_verb():
+    strategy = AdaptivePollStrategy(smoothing=0.5)
+    with patch('enmscripting.private.pollstrategy.monotonic') as mock_monotonic:
+        mock_monotonic.side_effect = [0, 0, 1, 1, 2, 10, 10, 14]
+        tracker = strategy.track('cmedit get x')
+        tracker.wait_milli()
+        tracker.polled(False)
+        tracker.wait_milli()
+        tracker.polled(True)
+        tracker = strategy.track('cmedit get y')
+        tracker.wait_milli()
+        tracker.polled(True)
+
+    stats = strategy.stats()
+    assert stats.keys() == ['cmedit get']
+    assert stats['cmedit get']['commands'] == 2
+    assert stats['cmedit get']['polls'] == 3
+    assert stats['cmedit get']['polls_per_command'] == 1.5
+    assert stats['cmedit get']['average_seconds'] == 3
+    assert stats['cmedit get']['expected_seconds'] == 3
+
+    strategy.reset_stats()
+    assert strategy.stats() == {}
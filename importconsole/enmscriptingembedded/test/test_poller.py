@@ -1,8 +1,10 @@
 import datetime
 import logging
 
+from mock import patch
 from nose import with_setup
-from enmscripting.private.poller import Poller
+from threading import Event, Timer
+from enmscripting.private.poller import Poller, monotonic
 from . import restore_sleep, disable_sleep
 
 logging.basicConfig()
@@ -77,3 +79,54 @@ def test_poller_timeout_infinity():
     poller = Poller(timeout=float('inf'))
     for _ in range(4):
         assert poller.poll() is True
+
+
+def test_poller_fractional_timeout():
+    poller = Poller(timeout=0.05, sleep_time=0.01, sleep_multiplier=1)
+    polls = 0
+    with patch('enmscripting.private.poller.monotonic', side_effect=[0, 0.01, 0.02, 0.03, 0.04, 0.05, 0.06]):
+        while poller.poll():
+            polls += 1
+    assert polls == 3
+    assert poller.remaining() == 0
+
+
+def test_poller_is_not_affected_by_wall_clock():
+    poller = Poller(timeout=2 * 24 * 60 * 60)
+    with patch('enmscripting.private.poller.monotonic', side_effect=[0, 24 * 60 * 60 + 1, 24 * 60 * 60 + 1, 2 * 24 * 60 * 60]):
+        assert poller.poll() is True
+        assert poller.poll() is True
+        assert poller.poll() is False
+
+
+def test_poller_sleep_does_not_exceed_timeout():
+    sleeps = []
+    poller = Poller(timeout=0.5, sleep_time=1)
+    with patch('enmscripting.private.poller.monotonic', side_effect=[0, 0.2, 0.2]), \
+            patch('enmscripting.private.poller.time.sleep', side_effect=sleeps.append):
+        assert poller.poll() is True
+        assert poller.poll() is True
+    assert len(sleeps) == 1
+    assert abs(sleeps[0] - 0.3) < 1e-9
+
+
+def test_poller_remaining_before_start():
+    assert Poller(timeout=1.5).remaining() == 1.5
+
+
+def test_poller_cancel_interrupts_sleep():
+    cancel_event = Event()
+    poller = Poller(timeout=60, sleep_time=30, cancel_event=cancel_event)
+    assert poller.poll() is True
+
+    Timer(0.05, cancel_event.set).start()
+    start = monotonic()
+    assert poller.poll() is False
+    assert monotonic() - start < 5
+    assert poller.cancelled() is True
+    assert poller.poll() is False
+
+
+def test_monotonic_clock_does_not_go_backwards():
+    first = monotonic()
+    assert monotonic() >= first
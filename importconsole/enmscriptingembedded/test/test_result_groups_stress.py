@@ -42,6 +42,35 @@ def test_memory():
     assert_big_output(2, 25, 50, 10)
 
 
+def test_big_output_in_100_responses_10k_0k():
+    assert_big_output_in_responses(10000, 0, 0, 0, 100)
+
+
+def test_big_output_in_100_responses_1k_1k_10k():
+    assert_big_output_in_responses(1000, 10, 100, 10, 100)
+
+
+@nottest
+def test_big_output_in_1000_responses_5k_5k_50k():
+    assert_big_output_in_responses(5000, 100, 50, 10, 1000)
+
+
+@nottest
+def test_benchmark():
+    """
+    Prints the time taken to build the output of each stress shape, received in one or many responses
+    """
+    for shape in ((10000, 0, 0, 0), (20000, 0, 0, 0), (50000, 0, 0, 0), (1000, 10, 100, 10), (5000, 100, 50, 10)):
+        for nr_chunks in (1, 100, 1000):
+            responses = generate_json_chunks(*(shape + (nr_chunks,)))
+            t1 = datetime.datetime.now()
+            result = CommandOutput(200, True, responses[0])
+            for response in responses[1:]:
+                result._append_response(response)
+            t2 = datetime.datetime.now()
+            print(shape, nr_chunks, 'responses:', str(t2 - t1))
+
+
 # HELPER METHODS
 # @profile
 def assert_big_output(lines, tables, rows, columns):
@@ -70,5 +99,20 @@ def assert_big_output(lines, tables, rows, columns):
     assert exp_cells == act_cells, 'There should be ' + str(exp_cells) + ' cells, but there was[' + str(act_cells) + ']'
     assert lines == result_string.count('line_number_'), 'There should be ' + str(lines) + ' lines'
 
+
+def assert_big_output_in_responses(lines, tables, rows, columns, nr_responses):
+    responses = generate_json_chunks(lines, tables, rows, columns, nr_responses)
+
+    result = CommandOutput(200, True, responses[0])
+    for response in responses[1:]:
+        assert not result.is_complete()
+        result._append_response(response)
+    assert result.is_complete()
+
+    expected = CommandOutput(200, True, generate_json(lines, tables, rows, columns))
+    assert expected._parsed_json[expected._OUTPUT] == result._parsed_json[result._OUTPUT]
+    assert to_string_iterate(expected.get_output()) == to_string_iterate(result.get_output())
+
 if __name__ == '__main__':
     test_memory()
+    test_benchmark()
@@ -1,5 +1,7 @@
-from enmscripting.private.retry import retry, on_fail_sleep
+from enmscripting.private.retry import retry, on_fail_sleep, retry_stats, reset_retry_stats
+from enmscripting.private.session import _endpoint
 from nose.tools import assert_raises
+from mock import patch
 import logging
 
 logging.basicConfig()
@@ -106,6 +108,102 @@ def test_retry_twice_disjunctive():
     assert t.exec_times() == 10
 
 
+# Success path
+def test_success_calls_accept_once():
+    accepted = []
+
+    @retry(attempts=5, accept_func=lambda result: accepted.append(result) or True)
+    def do_stuff():
+        return 'ok'
+
+    assert do_stuff() == 'ok'
+    assert accepted == ['ok']
+
+
+# Backoff
+def test_on_fail_sleep_backoff_is_capped_with_jitter():
+    sleeps = []
+    with patch('time.sleep', sleeps.append):
+        backoff = None
+        for _ in range(6):
+            backoff = on_fail_sleep(None, backoff)
+
+    assert backoff == 8
+    for sleep_time, backoff in zip(sleeps, [2, 4, 8, 8, 8, 8]):
+        assert backoff / 2.0 <= sleep_time <= backoff
+
+
+@patch('enmscripting.private.retry.monotonic')
+def test_deadline_stops_retries(monotonic_mock):
+    now = [100.0]
+    monotonic_mock.side_effect = lambda: now[0]
+    t = TestRetry(10)
+
+    def on_fail(result, state, *args):
+        now[0] += 4
+
+    do_retry = retry(attempts=10, on_fail_func=on_fail, deadline_seconds=10)(TestRetry._do_stuff)
+    assert_raises(ValueError, do_retry, t)
+    assert t.exec_times() == 3  # failures at 100, 104, 108, on_fail returns at 112: past the deadline
+
+
+@patch('enmscripting.private.retry.monotonic')
+def test_deadline_counts_from_call(monotonic_mock):
+    now = [100.0]
+    monotonic_mock.side_effect = lambda: now[0]
+    attempts = []
+
+    def slow_failure():
+        attempts.append(now[0])
+        now[0] += 7
+        raise ValueError('slow failure')
+
+    def on_fail(result, state, *args):
+        now[0] += 4
+
+    do_retry = retry(attempts=10, on_fail_func=on_fail, deadline_seconds=10)(slow_failure)
+    assert_raises(ValueError, do_retry)
+    assert attempts == [100.0]  # failed at 107, on_fail returns at 111: past the deadline of the call at 100
+
+
+@patch('enmscripting.private.retry.monotonic')
+def test_on_fail_sleep_stops_at_deadline(monotonic_mock):
+    now = [100.0]
+    monotonic_mock.side_effect = lambda: now[0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    t = TestRetry(10)
+    do_retry = retry(attempts=10, on_fail_func=on_fail_sleep, deadline_seconds=5)(TestRetry._do_stuff)
+    with patch('time.sleep', sleep):
+        assert_raises(ValueError, do_retry, t)
+
+    assert abs(sum(sleeps) - 5) < 1e-9
+    assert abs(now[0] - 105) < 1e-9
+
+
+# Metrics
+def test_retry_stats():
+    reset_retry_stats()
+    assert TestRetry(1).do_retry_5_endpoint('https://enm/files/123/file') == 2
+    assert_raises(ValueError, TestRetry(10).do_retry_5_endpoint, 'https://enm/files/456/file')
+    TestRetry().do_retry_5_endpoint('https://enm/files/789/file')
+
+    stats = retry_stats()
+    assert list(stats.keys()) == ['do_retry_5_endpoint /files/*/file']
+    endpoint_stats = stats['do_retry_5_endpoint /files/*/file']
+    assert endpoint_stats['retried'] == 2  # success at first attempt is not counted
+    assert endpoint_stats['attempts'] == 7
+    assert endpoint_stats['recovered'] == 1
+    assert endpoint_stats['given_up'] == 1
+
+    reset_retry_stats()
+    assert retry_stats() == {}
+
+
 class TestRetry(object):
     def __init__(self, fail_times=0):
         self._fail_times = fail_times
@@ -192,3 +290,7 @@ class TestRetry(object):
     @retry(attempts=5, accept_func=accept_first_5)
     def do_retry_2_decorator_disjunctive(self):
         return self._do_stuff()
+
+    @retry(attempts=5, metrics_key=_endpoint)
+    def do_retry_5_endpoint(self, url):
+        return self._do_stuff()
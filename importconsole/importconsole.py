@@ -16,20 +16,28 @@ import ConfigParser
 import time
 import logging
 import os
-try:
-    import enmscripting as enm
-except ImportError:
-    print '.'
-    import enmscriptingembedded as enm
+import shutil
+import tempfile
+
+from threading import Thread, Lock
+
+# the time to first screen is measured from here
+_START_TIME = time.time()
 
 from lib.config import *
-from lib import nbisession, MissingCredentialsException
+from lib import nbisession, CmImport, CmImportUndo, MissingCredentialsException
 from lib.filecleanup import FileCleaner, _30_DAYS, _1_HOUR_IN_SECONDS
+from lib.clipool import CliSessionPool, is_connection_error
+from lib.nbistats import NbiStats
+from lib.batchimport import BatchImport, find_import_files, RESULT_SUCCESS, RESULT_SPLIT
 
 signal.signal(signal.SIGINT, lambda x, y: sys.exit(1))
 
 logger = None
 
+# ENM scripting client, imported on the first CLI command, see _scripting()
+enm = None
+
 
 def setup_logging(log, log_file_name='importconsole.log'):
     logger = logging.getLogger()
@@ -64,6 +72,20 @@ def read_args():
     optional_args.add_argument('--file-cleanup-only', help="Indicates to just run the file cleanup procedure", action='store_true')
     optional_args.add_argument('--file-cleanup-interval', help="Interval in seconds to perform file clean-up", default='0')
     optional_args.add_argument('--file-retention-days', help="Retention days of import files for failed jobs", default='0')
+    optional_args.add_argument('--batch-import', nargs='+', metavar='PATH', default=None,
+                               help="Imports the files, directories or glob patterns without the UI, then exits")
+    optional_args.add_argument('--batch-flow', help="Execution flow of the batch import jobs (default: validate-and-execute)",
+                               choices=['validate', 'validate-and-execute'], default=None)
+    optional_args.add_argument('--batch-validation-policy', help="Validation policy of the batch import jobs",
+                               choices=['instance-validation', 'no-instance-validation'], default=None)
+    optional_args.add_argument('--batch-execution-policy', help="Execution policy of the batch import jobs (default: stop-on-error)",
+                               choices=['stop-on-error', 'continue-on-error-operation', 'continue-on-error-node'], default=None)
+    optional_args.add_argument('--batch-jobs', help="Number of batch import jobs in progress at the same time (default: 4)", default='0')
+    optional_args.add_argument('--batch-summary', help="File the batch import summary is written to, as JSON", default=None)
+    optional_args.add_argument('--batch-check', help="Checks the syntax of the batch import files before uploading them",
+                               action='store_true')
+    optional_args.add_argument('--batch-split', metavar='PARTS', default='0',
+                               help="Splits each batch import file by node into up to PARTS files imported in parallel")
     optional_args.add_argument("-h", "--help", action="help", help="show this help message and exit")
 
     # advanced options
@@ -71,6 +93,13 @@ def read_args():
     parser.add_argument('--nbi-base-uri', help=argparse.SUPPRESS, default='bulk-configuration/v1/import-jobs/')
     parser.add_argument('--lic', help=argparse.SUPPRESS, default=False)
     parser.add_argument('--refresh-interval', help=argparse.SUPPRESS, default=0)
+    parser.add_argument('--redraw-interval', help=argparse.SUPPRESS, default=0)
+    parser.add_argument('--cli-sessions', help=argparse.SUPPRESS, default=0)
+    parser.add_argument('--stats', help=argparse.SUPPRESS, action='store_true')
+    parser.add_argument('--stats-file', help=argparse.SUPPRESS, default=None)
+    parser.add_argument('--profile', help=argparse.SUPPRESS, nargs='?', const='importconsole.prof', default=None)
+    parser.add_argument('--profile-slow-ms', help=argparse.SUPPRESS, default=0)
+    parser.add_argument('--batch-job-timeout', help=argparse.SUPPRESS, default=0)
 
     return parser.parse_args()
 
@@ -142,29 +171,54 @@ def main():
 
     set_config(config)
 
-    from lib import uibind, CmImport, CmImportUndo
+    stats_file = args.stats_file or config_file.get('stats-file')
+    nbi_stats = NbiStats() if args.stats or stats_file else None
 
-    if args.lic:
-        uibind.disable_catch_view_exceptions()
+    enm_url = args.url or config_file.get('url')
+    nbi_uri = args.nbi_base_uri or config_file.get('nbi-base-uri')
 
     print 'Connecting to ENM...\n'
-    session = _auth_open_session(args.url or config_file.get('url'), args.username, args.password, args.nbi_base_uri or config_file.get('nbi-base-uri'))
+    connecting = _start_connecting(enm_url, args.username, args.password, nbi_uri, nbi_stats)
 
-    cli_session = enm.open(session.host(), session.username(), session.password())
+    # the UI is loaded while the login and the test of the service are in progress, only when it is shown
+    if not args.file_cleanup_only and not args.batch_import:
+        from lib import uibind, uibind_profile
+        from lib.ui import error_handler, MainMenuView
 
-    cm_import = CmImport(session, cli_session.command())
-    cm_undo = CmImportUndo(session)
+        if args.lic:
+            uibind.disable_catch_view_exceptions()
 
-    print 'Testing service...\n'
-    cm_import.get_jobs(limit=1)
+    try:
+        session = connecting()
+    except MissingCredentialsException:
+        session = _prompt_open_session(enm_url, nbi_uri, nbi_stats)
+        print 'Testing service...\n'
+        CmImport(session, None).get_jobs(limit=1)
 
     print '   ... all looking good\n'
 
-    time.sleep(1)
+    # the CLI sessions are opened on the first CLI command
+    cli_sessions = int(args.cli_sessions) or int(config_file.get('cli-sessions', '0')) or 4
+    cli_pool = CliSessionPool(lambda: _scripting().open(session.host(), session.username(), session.password()),
+                              lambda enm_session: _scripting().close(enm_session),
+                              max_sessions=cli_sessions, min_sessions=0, session_error_check=_is_cli_session_error)
+
+    upload_compression = config_file.get('upload-compression', 'auto').lower()
+    upload_max_kbps = int(config_file.get('upload-max-kbps', '0'))
+    session.set_upload_options(None if upload_compression == 'auto' else upload_compression in _TRUE_VALUES,
+                               upload_max_kbps * 1024 if upload_max_kbps > 0 else None)
+    download_chunk_kb = int(config_file.get('download-chunk-kb', '0')) or 1024
+    session.set_download_options(download_chunk_kb * 1024)
+
+    cm_import = CmImport(session, cli_pool)
+    cm_undo = CmImportUndo(session)
 
     if args.file_cleanup_only:
         _clean_files_and_exit(cm_import, config)
 
+    if args.batch_import:
+        _batch_import_and_exit(cm_import, config, args, config_file)
+
     if config.file_cleanup_interval > 0:
         file_cleaner = FileCleaner(config.work_dir, cm_import, config.file_cleanup_interval, config.file_retention_days)
     else:
@@ -191,20 +245,81 @@ def main():
         ('focus button', 'white', 'dark red', None, '#fff', '#600'),
         ('focus textinput', 'white', 'brown', None, '#ff0', '#66d')]
 
+    profiler = None
+    startup = {}
     try:
         refresh_interval = int(args.refresh_interval) or int(config_file.get('refresh-interval', '0')) or 18
 
-        from lib.ui import error_handler, MainMenuView
         display = uibind.Display(palette=palette)
         display.exception_handler = error_handler
+        display.set_first_draw_listener(lambda: _on_first_screen(startup))
         display.set_update_interval(refresh_interval)
-        display.start(MainMenuView(cm_import, cm_undo, file_cleaner))
+        redraw_interval = float(args.redraw_interval) or float(config_file.get('redraw-interval', '0'))
+        if redraw_interval > 0:
+            display.set_redraw_interval(redraw_interval)
+        profile_file = args.profile or config_file.get('profile')
+        if profile_file:
+            slow_ms = int(args.profile_slow_ms) or int(config_file.get('profile-slow-ms', '0')) or 200
+            profiler = uibind_profile.enable(profile_file, slow_ms / 1000.0)
+        display.start(MainMenuView(cm_import, cm_undo, file_cleaner, nbi_stats, lambda: _format_cli_stats(cli_pool)))
     except Exception as e:
         logger.exception('Exiting application due to error %s', e)
         print 'Error: %s' % str(e)
     finally:
-        if cli_session:
-            enm.close(cli_session)
+        # the statistics are taken before the CLI sessions are closed, which happens even if writing them fails
+        extra = _cli_stats(cli_pool) if stats_file else None
+        cli_pool.close()
+        if profiler is not None:
+            profiler.dump()
+        if stats_file:
+            extra.update(startup)
+            try:
+                nbi_stats.dump(stats_file, extra)
+            except IOError as e:
+                logger.error('Could not write the statistics to [%s]: %s', stats_file, e)
+                print 'Error: could not write the statistics to %s: %s' % (stats_file, e)
+
+
+def _on_first_screen(startup):
+    startup['time_to_first_screen_seconds'] = time.time() - _START_TIME
+    logger.info('Time to first screen: %.3f seconds', startup['time_to_first_screen_seconds'])
+
+
+def _scripting():
+    """
+    :return: the ENM scripting client module, the installed one if any, else the embedded one. It is imported on the
+             first call, so that the start-up does not pay for it
+    """
+    global enm
+    if enm is None:
+        try:
+            import enmscripting as scripting
+        except ImportError:
+            import enmscriptingembedded as scripting
+        enm = scripting
+    return enm
+
+
+def _is_cli_session_error(error):
+    # an expired ENM session cannot be used any more either
+    return is_connection_error(error) or isinstance(error, _scripting().SessionTimeoutException)
+
+
+def _cli_stats(cli_pool):
+    stats = {'cli_sessions': cli_pool.stats()}
+    if enm is not None and hasattr(enm, 'retry_stats'):
+        stats['cli_retries'] = enm.retry_stats()
+    return stats
+
+
+def _format_cli_stats(cli_pool):
+    stats = _cli_stats(cli_pool)
+    text = 'CLI sessions: %(size)d open, %(busy)d busy, %(borrowed)d commands, %(waited)d waited for a session' % \
+        stats['cli_sessions']
+    for endpoint, retries in sorted(stats.get('cli_retries', {}).items()):
+        text += '\nCLI retries %s: %d retried, %d given up, %.1f s' % (endpoint, retries['retried'],
+                                                                      retries['given_up'], retries['seconds'])
+    return text
 
 
 def _clean_files_and_exit(cm_import, config):
@@ -215,27 +330,93 @@ def _clean_files_and_exit(cm_import, config):
     exit(0)
 
 
-def _auth_open_session(enm_url, username, password, nbi_uri):
-    if username:
-        session = nbisession.NbiSession(nbi_uri, username=username, password=password, host=enm_url)
-        session.open_session()
-        return session
-    else:
+def _batch_import_and_exit(cm_import, config, args, config_file):
+    file_paths = find_import_files(args.batch_import)
+    if not file_paths:
+        print 'No import files found in %s' % ', '.join(args.batch_import)
+        exit(1)
+
+    validation_policy = args.batch_validation_policy or config_file.get('batch-validation-policy')
+    execution_policy = args.batch_execution_policy or config_file.get('batch-execution-policy', 'stop-on-error')
+    max_jobs = int(args.batch_jobs) or int(config_file.get('batch-jobs', '0')) or 4
+    job_timeout = int(args.batch_job_timeout) or int(config_file.get('batch-job-timeout', '0')) or 4 * 60 * 60
+    summary_file = args.batch_summary or config_file.get('batch-summary', 'batch-import-summary.json')
+    check = args.batch_check or config_file.get('batch-check', 'false').lower() in _TRUE_VALUES
+    split_parts = int(args.batch_split) or int(config_file.get('batch-split', '0')) or 1
+    split_dir = tempfile.mkdtemp(prefix='batch-split-', dir=config.work_dir) if split_parts > 1 else None
+    done = []
+    print_lock = Lock()
+
+    def _print_progress(result):
+        details = result['error'] or result['status']
+        with print_lock:
+            done.append(result)
+            # split files add their parts to the results
+            print '[%d/%d] %s: job [%s] %s%s' % (len(done), len(batch.results()), os.path.basename(result['file']),
+                                                 result['job_id'], result['result'], ' (%s)' % details if details else '')
+
+    batch = BatchImport(cm_import, args.batch_flow or config_file.get('batch-flow', 'validate-and-execute'),
+                        validation_policy=[validation_policy] if validation_policy else None,
+                        execution_policy=[execution_policy] if execution_policy else None,
+                        max_jobs=max_jobs, job_timeout=job_timeout, progress_listener=_print_progress,
+                        check=check, split_parts=split_parts, split_dir=split_dir)
+    print 'Importing %d files, %d jobs at a time\n' % (len(file_paths), max_jobs)
+    try:
+        results = batch.run(file_paths)
+    finally:
+        batch.write_summary(summary_file)
+        print '\nSummary written to %s' % summary_file
+        if split_dir:
+            shutil.rmtree(split_dir, ignore_errors=True)
+    results = [result for result in results if result['result'] != RESULT_SPLIT]
+    failed = len([result for result in results if result['result'] != RESULT_SUCCESS])
+    print '%d of %d files imported successfully' % (len(results) - failed, len(results))
+    exit(1 if failed else 0)
+
+
+def _start_connecting(enm_url, username, password, nbi_uri, nbi_stats=None):
+    """
+    Opens the session towards ENM and tests the import service on a background thread.
+
+    :return: callable waiting for the connection, returning the open NbiSession or raising the error of the login or of
+             the test. MissingCredentialsException is raised when there is neither username nor SSO cookie
+    """
+    result = {}
+
+    def _connect():
+        try:
+            session = nbisession.NbiSession(nbi_uri, username=username, password=password, host=enm_url, stats=nbi_stats)
+            session.open_session()
+            CmImport(session, None).get_jobs(limit=1)
+            result['session'] = session
+        except BaseException:
+            result['error'] = sys.exc_info()
+
+    thread = Thread(target=_connect, name='connect')
+    thread.daemon = True
+    thread.start()
+
+    def _wait():
+        while thread.is_alive():
+            thread.join(0.1)  # with a timeout, so that the wait can be interrupted
+        if 'error' in result:
+            error = result['error']
+            raise error[0], error[1], error[2]
+        return result['session']
+    return _wait
+
+
+def _prompt_open_session(enm_url, nbi_uri, nbi_stats=None):
+    while True:
+        username = raw_input("username: ")
+        password = getpass.getpass()
+
+        session = nbisession.NbiSession(nbi_uri, username=username, password=password, host=enm_url, stats=nbi_stats)
         try:
-            session = nbisession.NbiSession(nbi_uri, username=username, password=password, host=enm_url)
             session.open_session()
-        except MissingCredentialsException:
-            while True:
-                username = raw_input("username: ")
-                password = getpass.getpass()
-
-                session = nbisession.NbiSession(nbi_uri, username=username, password=password, host=enm_url)
-                try:
-                    session.open_session()
-                    return session
-                except (ValueError, MissingCredentialsException):
-                    print 'Invalid username/password combination.'
-        return session
+            return session
+        except (ValueError, MissingCredentialsException):
+            print 'Invalid username/password combination.'
 
 
 if __name__ == "__main__":
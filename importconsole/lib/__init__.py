@@ -1,10 +1,9 @@
 from cmimport import (CmImport, ImportJob, ImportJobSummary, ImportOperation, ImportOperationAttribute, ImportOperations)
 from cmundo import (CmImportUndo, ImportUndoJob)
-from uibind import (Display, View, PopUpView, divider, text, textinput, texttable,
-                    propagate_exception, radios, buttons, filebrowser,
-                    file_sort_by_last_modified_desc, file_sort_by_name_asc,
-                    popup, Binder, listbox)
+# uibind is not imported here, so that the modules without UI load without urwid: from lib import uibind
 from nbisession import (NbiNoContentException, NbiSession, NbiBadRequestException,
                         AuthenticationTokenExpiredException, ConnectionError, NbiAccessNotAllowedException,
                         NbiConnectionException, NbiRequestException, NbiServiceUnavailableException,
                         NbiUnknownServiceHostException, MissingCredentialsException)
+from nbiupload import UploadCancelledException
+from nbidownload import DownloadCancelledException, DownloadIntegrityException
@@ -0,0 +1,306 @@
+import glob
+import json
+import logging
+import os
+import tempfile
+import time
+
+from Queue import Queue, Empty
+from threading import Thread, Lock
+
+import importfile
+from nbisession import NbiConnectionException, NbiServiceUnavailableException
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_MAX_JOBS = 4
+
+_DEFAULT_POLL_INTERVAL = 5
+
+_DEFAULT_MAX_POLL_INTERVAL = 60
+
+_DEFAULT_JOB_TIMEOUT = 4 * 60 * 60
+
+# final status of the jobs which are validated only
+_VALIDATE_FINAL_STATUSES = ('validated', 'invalid', 'executed', 'execution-interrupted')
+
+RESULT_PENDING = 'pending'
+RESULT_RUNNING = 'running'
+RESULT_SUCCESS = 'success'
+RESULT_ERRORS = 'completed-with-errors'
+RESULT_FAILED = 'failed'
+RESULT_TIMEOUT = 'timeout'
+# the file has syntax errors, found before uploading it
+RESULT_INVALID_FILE = 'invalid-file'
+# the file was split into files imported separately, reported with their own results
+RESULT_SPLIT = 'split'
+
+
+def find_import_files(paths):
+    """
+    :param paths: list of files, directories or glob patterns
+    :return: sorted list of the files matching the paths, without duplicates. The files of a directory are included,
+             not the ones of its sub-directories
+    """
+    files = set()
+    for path in paths:
+        path = os.path.expanduser(path)
+        if os.path.isdir(path):
+            matches = [os.path.join(path, name) for name in os.listdir(path)]
+        else:
+            matches = glob.glob(path)
+        files.update(os.path.abspath(match) for match in matches if os.path.isfile(match))
+    return sorted(files)
+
+
+class BatchImport(object):
+    """
+    Imports files without the UI: a job is created for each file, the file is added to it and the job is executed.
+
+    Up to max_jobs jobs are in progress at the same time, each one being polled until it is finished, with an interval
+    growing from poll_interval up to max_poll_interval seconds. A job not finished after job_timeout seconds is left
+    running on ENM and reported as timed out.
+
+    With check, each file is scanned before being uploaded, the files with syntax errors not being imported. With
+    split_parts, the files are scanned and split by node into up to split_parts files of balanced number of operations,
+    imported as separate jobs in parallel.
+
+    Sample usage:
+        batch = BatchImport(cm_import, ImportJob.EXECUTION_MODE_VALIDATE_EXECUTE, max_jobs=8)
+        results = batch.run(find_import_files(['/home/user/imports/*.xml']))
+        batch.write_summary('summary.json')
+    """
+
+    def __init__(self, cm_import, execution_flow, validation_policy=None, execution_policy=None,
+                 max_jobs=_DEFAULT_MAX_JOBS, poll_interval=_DEFAULT_POLL_INTERVAL,
+                 max_poll_interval=_DEFAULT_MAX_POLL_INTERVAL, job_timeout=_DEFAULT_JOB_TIMEOUT,
+                 progress_listener=None, check=False, split_parts=1, split_dir=None):
+        """
+        :param cm_import:           CmImport creating the jobs
+        :param execution_flow:      execution flow of the jobs, e.g. ImportJob.EXECUTION_MODE_VALIDATE_EXECUTE
+        :param validation_policy:   list of validation policies of the jobs
+        :param execution_policy:    list of execution (error) policies of the jobs
+        :param max_jobs:            maximum number of jobs in progress at the same time
+        :param poll_interval:       seconds before the first poll of a job
+        :param max_poll_interval:   maximum number of seconds between two polls of a job
+        :param job_timeout:         seconds after which a job still in progress is reported as timed out
+        :param progress_listener:   optional callable receiving the result of each file as it is done
+        :param check:               True to scan the files for syntax errors before uploading them
+        :param split_parts:         maximum number of files each file is split into, 1 not to split the files
+        :param split_dir:           directory the split files are written to, required when split_parts is above 1
+        """
+        if max_jobs < 1:
+            raise ValueError('Invalid number of concurrent jobs: %s' % max_jobs)
+        if split_parts < 1:
+            raise ValueError('Invalid number of split files: %s' % split_parts)
+        if split_parts > 1 and not split_dir:
+            raise ValueError('A directory is required to split the files')
+        self._cm_import = cm_import
+        self._execution_flow = execution_flow
+        self._validation_policy = validation_policy or []
+        self._execution_policy = execution_policy or []
+        self._max_jobs = max_jobs
+        self._poll_interval = poll_interval
+        self._max_poll_interval = max_poll_interval
+        self._job_timeout = job_timeout
+        self._progress_listener = progress_listener
+        self._check = check or split_parts > 1
+        self._split_parts = split_parts
+        self._split_dir = split_dir
+        self._lock = Lock()
+        self._results = []
+        self._started = None
+        self._ended = None
+
+    def run(self, file_paths):
+        """
+        Imports the files, blocking until all the jobs are finished or timed out.
+
+        :param file_paths: list of files to be imported
+        :return: list of the results, see results()
+        """
+        self._started = time.time()
+        self._results = [_new_result(file_path) for file_path in file_paths]
+        pending = Queue()
+        for result in self._results:
+            pending.put(result)
+
+        threads = []
+        # the parts of the split files are imported by all the workers
+        workers = self._max_jobs if self._split_parts > 1 else min(self._max_jobs, len(self._results))
+        for index in xrange(workers if self._results else 0):
+            thread = Thread(target=self._do_work, args=(pending,), name='Batch-Import-%d' % index)
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(1)  # with a timeout, so that the wait can be interrupted
+        self._ended = time.time()
+        return self.results()
+
+    def results(self):
+        """
+        :return: list of dictionaries with the file, job id, result, status, failure reason, summary counts and
+                 elapsed seconds of each file. The files split are followed by the results of their parts, with the
+                 split file as source
+        """
+        with self._lock:
+            return [dict(result) for result in self._results]
+
+    def summary(self):
+        """
+        :return: dictionary with the number of files by result and the results of each file
+        """
+        results = self.results()
+        totals = {}
+        for result in results:
+            totals[result['result']] = totals.get(result['result'], 0) + 1
+        ended = self._ended or time.time()
+        return {'execution_flow': self._execution_flow,
+                'validation_policy': self._validation_policy,
+                'execution_policy': self._execution_policy,
+                'started': _format_time(self._started) if self._started else None,
+                'seconds': ended - self._started if self._started else 0.0,
+                'files': len(results),
+                'totals': totals,
+                'results': results}
+
+    def write_summary(self, file_path):
+        """
+        Writes the summary to a JSON file, see summary()
+        """
+        with open(file_path, 'w') as summary_file:
+            json.dump(self.summary(), summary_file, indent=2, sort_keys=True)
+        logger.info('Batch import summary written to [%s]', file_path)
+
+    def _do_work(self, pending):
+        while True:
+            try:
+                result = pending.get(timeout=0.5)
+            except Empty:
+                # the files being split by other workers may still add parts to the queue
+                if pending.unfinished_tasks:
+                    continue
+                return
+            start = time.time()
+            try:
+                # the parts of a split file were checked along with it
+                if not self._check or 'source' in result or self._pre_check(result, start, pending):
+                    self._import(result, start)
+            except Exception as e:
+                logger.exception('Failed to import file [%s]: %s', result['file'], e)
+                self._update(result, result=RESULT_FAILED, error=str(e), seconds=time.time() - start)
+            finally:
+                pending.task_done()
+            if self._progress_listener:
+                self._progress_listener(dict(result))
+
+    def _pre_check(self, result, start, pending):
+        """
+        Scans the file and splits it if requested, queuing its parts
+
+        :return: True if the file has to be imported, False if it is invalid or was split
+        """
+        self._update(result, result=RESULT_RUNNING)
+        file_scan = importfile.scan(result['file'])
+        self._update(result, operations=file_scan.operation_count(), nodes=file_scan.node_count())
+        if not file_scan.is_valid():
+            self._update(result, result=RESULT_INVALID_FILE, error=str(file_scan), seconds=time.time() - start,
+                         file_errors=['line %d: %s' % error for error in file_scan.errors])
+            return False
+        if self._split_parts < 2 or file_scan.node_count() < 2:
+            return True
+        try:
+            # a directory for each file, the files of different directories may have the same name
+            part_dir = tempfile.mkdtemp(prefix=os.path.basename(result['file']) + '-', dir=self._split_dir)
+            parts = importfile.split(result['file'], self._split_parts, part_dir, file_scan)
+        except ValueError as e:
+            logger.info('Importing [%s] without splitting it: %s', result['file'], e)
+            return True
+
+        part_results = []
+        for part_path, nodes, operations in parts:
+            part_result = _new_result(part_path)
+            part_result.update(source=result['file'], nodes=nodes, operations=operations)
+            part_results.append(part_result)
+        with self._lock:
+            self._results.extend(part_results)
+            result.update(result=RESULT_SPLIT, parts=[part['file'] for part in part_results],
+                          seconds=time.time() - start)
+        for part_result in part_results:
+            pending.put(part_result)
+        return False
+
+    def _import(self, result, start):
+        self._update(result, result=RESULT_RUNNING)
+        import_job = self._cm_import.create_job(validation_policy_list=self._validation_policy,
+                                                error_policy_list=self._execution_policy,
+                                                name=os.path.basename(result['file']))
+        self._update(result, job_id=import_job.id())
+        logger.info('Created job [%s] for file [%s]', import_job.id(), result['file'])
+
+        import_job.add_file(result['file'])
+        import_job.execute(self._execution_flow, validation_policy_list=self._validation_policy,
+                           error_policy_list=self._execution_policy)
+        finished = self._wait_for(import_job, start)
+
+        self._update(result, status=import_job.status(), error=import_job.failureReason() or None,
+                     summary=_total_summary(import_job), seconds=time.time() - start,
+                     result=RESULT_TIMEOUT if not finished else RESULT_ERRORS if import_job.has_errors() else
+                     RESULT_SUCCESS)
+
+    def _wait_for(self, import_job, start):
+        """
+        :return: True if the job finished, False if it timed out
+        """
+        interval = self._poll_interval
+        while not self._is_finished(import_job):
+            remaining = start + self._job_timeout - time.time() if self._job_timeout else interval
+            if remaining <= 0:
+                logger.warning('Job [%s] not finished after [%s] seconds', import_job.id(), self._job_timeout)
+                return False
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, self._max_poll_interval)
+            try:
+                import_job.refresh()
+            except (NbiConnectionException, NbiServiceUnavailableException) as e:
+                # the job keeps running on ENM, it is polled again later
+                logger.warning('Failed to refresh job [%s]: %s', import_job.id(), e)
+        return True
+
+    def _is_finished(self, import_job):
+        if import_job.failureReason():
+            return True
+        if self._execution_flow == import_job.EXECUTION_MODE_VALIDATE:
+            return str(import_job.status()).lower() in _VALIDATE_FINAL_STATUSES
+        return import_job.is_finished()
+
+    def _update(self, file_result, **values):
+        with self._lock:
+            file_result.update(values)
+
+
+def _new_result(file_path):
+    return {'file': file_path,
+            'job_id': None,
+            'result': RESULT_PENDING,
+            'status': None,
+            'error': None,
+            'summary': None,
+            'seconds': 0.0}
+
+
+def _total_summary(import_job):
+    for summary in import_job.job_summary() or []:
+        if summary.type().lower() == 'total':
+            return {'parsed': summary.parsed(),
+                    'valid': summary.valid(),
+                    'invalid': summary.invalid(),
+                    'executed': summary.executed(),
+                    'execution_errors': summary.execution_errors()}
+    return None
+
+
+def _format_time(seconds):
+    return time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(seconds))
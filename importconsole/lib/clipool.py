@@ -0,0 +1,304 @@
+import logging
+import socket
+import time
+
+from contextlib import contextmanager
+from threading import Condition, Lock
+from requests import RequestException
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_MAX_SESSIONS = 4
+
+_DEFAULT_IDLE_TIMEOUT = 5 * 60
+
+_DEFAULT_MAX_SESSION_IDLE = 30 * 60
+
+
+class CliSessionPoolClosedException(Exception):
+    pass
+
+
+class CliSessionPool(object):
+    """
+    Bounded pool of authenticated ENM CLI sessions.
+
+    Each command borrows a session for its own execution, so independent commands run on separate sessions instead of
+    queueing behind each other on a single one. Sessions are opened only when all the open ones are busy, up to
+    max_sessions, and the sessions left idle for idle_timeout seconds are closed, down to min_sessions.
+
+    A session is checked before being lent if it was idle for more than max_session_idle seconds, or when a
+    health_check callable is given: a session failing the check is closed and replaced. A session whose command raised
+    a connection error, or was interrupted, is closed as well instead of going back to the pool. The other errors of
+    the commands, e.g. a command timing out, leave the session in the pool.
+
+    The pool can be used in place of the EnmCommand of a session:
+        pool = CliSessionPool(lambda: enm.open(url, username, password), enm.close)
+        output = pool.execute('cmedit get * NetworkElement')
+        pool.close()
+    """
+
+    def __init__(self, open_session, close_session, max_sessions=_DEFAULT_MAX_SESSIONS, min_sessions=1,
+                 idle_timeout=_DEFAULT_IDLE_TIMEOUT, max_session_idle=_DEFAULT_MAX_SESSION_IDLE, health_check=None,
+                 session_error_check=None):
+        """
+        :param open_session:        callable returning a new authenticated EnmSession
+        :param close_session:       callable closing an EnmSession
+        :param max_sessions:        maximum number of sessions open at the same time
+        :param min_sessions:        number of sessions kept open when idle
+        :param idle_timeout:        seconds after which an idle session above min_sessions is closed
+        :param max_session_idle:    seconds after which an idle session is not trusted anymore and is replaced
+        :param health_check:        optional callable receiving an EnmSession, returning False if it cannot be used
+        :param session_error_check: optional callable receiving the exception raised by a command, returning True if
+                                    the session cannot be used any more. By default, the connection errors
+        """
+        if max_sessions < 1 or min_sessions < 0 or min_sessions > max_sessions:
+            raise ValueError('Invalid pool size: min [%s], max [%s]' % (min_sessions, max_sessions))
+        self._open_session = open_session
+        self._close_session = close_session
+        self._max_sessions = max_sessions
+        self._min_sessions = min_sessions
+        self._idle_timeout = idle_timeout
+        self._max_session_idle = max_session_idle
+        self._health_check = health_check
+        self._session_error_check = session_error_check or is_connection_error
+        self._condition = Condition(Lock())
+        self._idle = []  # most recently used last
+        self._size = 0
+        self._closed = False
+        self._stats = {'opened': 0, 'closed': 0, 'borrowed': 0, 'waited': 0, 'discarded': 0}
+
+    def start(self):
+        """
+        Opens min_sessions sessions, so that authentication errors are raised straight away.
+
+        :return: self
+        """
+        sessions = []
+        try:
+            for _ in xrange(self._min_sessions):
+                sessions.append(self._borrow())
+        finally:
+            for session in sessions:
+                self._release(session)
+        return self
+
+    def execute(self, command_str, *args, **kwargs):
+        """
+        Executes the command on a session borrowed from the pool, see EnmCommand.execute()
+        """
+        with self.command() as command:
+            return command.execute(command_str, *args, **kwargs)
+
+    def execute_many(self, commands, max_in_flight=4, timeout_seconds=600):
+        """
+        Executes the commands on a session borrowed from the pool until all of them are done,
+        see EnmCommand.execute_many()
+        """
+        session = self._borrow()
+        futures = None
+        usable = False
+        try:
+            futures = session.command.execute_many(commands, max_in_flight, timeout_seconds)
+            usable = True
+        except Exception as e:
+            usable = not self._session_error_check(e)
+            raise
+        finally:
+            if not futures:
+                self._give_back(session, usable)
+        if not futures:
+            return futures
+
+        # number of futures not done yet, True once a command failed with a session error
+        pending = [len(futures), False]
+        lock = Lock()
+
+        def done(future):
+            error = _error_of(future)
+            with lock:
+                pending[0] -= 1
+                pending[1] = pending[1] or (error is not None and self._session_error_check(error))
+                if pending[0]:
+                    return
+            self._give_back(session, not pending[1])
+
+        for future in futures:
+            future.add_done_callback(done)
+        return futures
+
+    @contextmanager
+    def command(self):
+        """
+        Borrows a session from the pool, giving it back once the with block completes.
+
+        Sample usage:
+            with pool.command() as command:
+                output = command.execute('cmedit get * NetworkElement')
+
+        :return: context manager giving an EnmCommand
+        """
+        session = self._borrow()
+        # the session is not given back to the pool if the command is interrupted, e.g. by KeyboardInterrupt
+        usable = False
+        try:
+            yield session.command
+            usable = True
+        except Exception as e:
+            usable = not self._session_error_check(e)
+            raise
+        finally:
+            self._give_back(session, usable)
+
+    def stats(self):
+        """
+        :return: dictionary with the number of sessions open, idle and busy and the number of sessions opened, closed,
+                 borrowed, waited for and discarded since the pool was created
+        """
+        with self._condition:
+            stats = dict(self._stats)
+            stats.update(size=self._size, idle=len(self._idle), busy=self._size - len(self._idle))
+            return stats
+
+    def close(self):
+        """
+        Closes the idle sessions, the sessions in use are closed when they are given back to the pool
+        """
+        with self._condition:
+            self._closed = True
+            to_close, self._idle = self._idle, []
+            self._condition.notify_all()
+        for session in to_close:
+            self._close(session)
+
+    def _borrow(self):
+        while True:
+            session = self._take()
+            if session is None:
+                session = self._open()
+            elif not self._healthy(session):
+                self._discard(session)
+                continue
+            with self._condition:
+                self._stats['borrowed'] += 1
+            return session
+
+    def _take(self):
+        """
+        :return: an idle session, or None if a new session should be opened
+        """
+        with self._condition:
+            waited = False
+            while True:
+                if self._closed:
+                    raise CliSessionPoolClosedException('CLI session pool is closed')
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self._max_sessions:
+                    self._size += 1
+                    return None
+                if not waited:
+                    self._stats['waited'] += 1
+                    waited = True
+                    logger.debug('All the [%d] CLI sessions are busy, waiting', self._size)
+                self._condition.wait()
+
+    def _open(self):
+        session = None
+        try:
+            session = _PooledSession(self._open_session())
+        finally:
+            if session is None:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+        with self._condition:
+            self._stats['opened'] += 1
+            logger.debug('Opened CLI session, pool size is [%d]', self._size)
+        return session
+
+    def _healthy(self, session):
+        if time.time() - session.last_used > self._max_session_idle:
+            logger.debug('CLI session was idle for more than [%s seconds], replacing it', self._max_session_idle)
+            return False
+        if self._health_check is None:
+            return True
+        try:
+            return self._health_check(session.enm_session)
+        except Exception as e:
+            logger.debug('CLI session health check failed: %s', e)
+            return False
+
+    def _give_back(self, session, usable):
+        if usable:
+            self._release(session)
+        else:
+            self._discard(session)
+
+    def _release(self, session):
+        session.last_used = time.time()
+        with self._condition:
+            if self._closed:
+                to_close = [session]
+            else:
+                self._idle.append(session)
+                to_close = self._expired_sessions(session.last_used)
+            self._condition.notify()
+        for expired in to_close:
+            self._close(expired)
+
+    def _discard(self, session):
+        logger.debug('Discarding CLI session')
+        with self._condition:
+            self._stats['discarded'] += 1
+        self._close(session)
+
+    def _expired_sessions(self, now):
+        """
+        Removes from the idle list the sessions unused for more than idle_timeout, keeping min_sessions open.
+        Must be called holding the condition.
+        """
+        expired = []
+        while self._idle and self._size - len(expired) > self._min_sessions and \
+                now - self._idle[0].last_used > self._idle_timeout:
+            expired.append(self._idle.pop(0))
+        return expired
+
+    def _close(self, session):
+        with self._condition:
+            self._size -= 1
+            self._stats['closed'] += 1
+            self._condition.notify()
+        try:
+            self._close_session(session.enm_session)
+        except Exception as e:
+            logger.debug('Error closing CLI session: %s', e)
+        logger.debug('Closed CLI session, pool size is [%d]', self._size)
+
+
+class _PooledSession(object):
+
+    def __init__(self, enm_session):
+        self.enm_session = enm_session
+        self.command = enm_session.command()
+        self.last_used = time.time()
+
+
+def is_connection_error(error):
+    """
+    :return: True if the exception is a connection error, after which a CLI session is not trusted anymore
+    """
+    return isinstance(error, (RequestException, socket.error))
+
+
+def _error_of(future):
+    """
+    :return: the exception raised by the command of a future done, None if it succeeded or was cancelled
+    """
+    if future.cancelled():
+        return None
+    try:
+        future.result(0)
+        return None
+    except Exception as e:
+        return e
@@ -2,6 +2,9 @@ from nbisession import *
 import json
 import logging
 import re
+import time
+from collections import OrderedDict
+from Queue import Queue, Empty
 from datetime import datetime, timedelta
 from posixpath import join as urljoin
 from urlparse import urlsplit, urlunsplit
@@ -9,6 +12,17 @@ from math import ceil
 
 logger = logging.getLogger(__name__)
 
+# weight of the latest command latency on the estimation of the time to complete
+_LATENCY_SMOOTHING = 0.3
+
+# number of cmedit commands executed at the same time to fetch the current values
+_CLI_MAX_IN_FLIGHT = 4
+
+# maximum number of job ids of a single list request, keeping the url short
+_JOBS_BY_ID_BATCH_SIZE = 50
+
+_CANCEL_CHECK_SECONDS = 0.5
+
 
 class CmImport(object):
 
@@ -35,6 +49,31 @@ class CmImport(object):
             return []
         return self._generate_import_jobs_list_from_response(response)
 
+    def get_jobs_by_id(self, job_ids, batch_size=_JOBS_BY_ID_BATCH_SIZE):
+        """
+        Gets several jobs with a list request filtered by id for each batch_size jobs, instead of a request for each
+        job. The jobs missing from the list response, if any, are requested one by one.
+
+        :param job_ids: list of job ids
+        :return: list of the jobs found, in the order of job_ids
+        """
+        job_ids = [str(job_id) for job_id in job_ids]
+        jobs = {}
+        for start in xrange(0, len(job_ids), batch_size):
+            batch = job_ids[start:start + batch_size]
+            for job in self.get_jobs(limit=len(batch), job_id=batch):
+                jobs[str(job.id())] = job
+
+        missing = [job_id for job_id in job_ids if job_id not in jobs]
+        if missing:
+            logger.debug('jobs %s missing from the list response, requested one by one', missing)
+        for job_id in missing:
+            try:
+                jobs[job_id] = self.get_job(job_id)
+            except NbiRequestException as e:
+                logger.warning('Failed to get job [%s]: %s', job_id, e)
+        return [jobs[job_id] for job_id in job_ids if job_id in jobs]
+
     def find_jobs(self, created_start, created_end, job_name=None, user_id=None, page_size=200):
         logger.debug('starting job search...')
         jobs_found = []
@@ -381,19 +420,24 @@ class ImportJob(object):
     def can_have_file(self):
         return 'files' in self._links
 
-    def add_file(self, file_path):
+    def add_file(self, file_path, progress_listener=None, is_cancelled=None):
+        """
+        Uploads the file to the job, streamed from the disk, see NbiSession.upload()
+        :param file_path: path of the import file
+        :param progress_listener: optional callable receiving the number of bytes sent and the size of the file
+        :param is_cancelled: optional callable returning True to abort the upload
+        """
         if not os.path.exists(file_path):
             raise ValueError('Path does not exist: ' + file_path)
         if not os.path.isfile(file_path):
             raise ValueError('It is not a file: ' + file_path)
 
-        with open(file_path, 'rb') as f:
-            file_name = os.path.basename(file_path)
-            request = {'file': (file_name, f)}
-            result = self._session.post(self._links['files']['href'], files=request, request_body={'filename': file_name})
-            links = result.get('_links')
-            if links and 'invocations' in links:
-                self._links['invocations'] = links['invocations']
+        file_name = os.path.basename(file_path)
+        result = self._session.upload(self._links['files']['href'], file_path, fields={'filename': file_name},
+                                      progress_listener=progress_listener, is_cancelled=is_cancelled)
+        links = result.get('_links')
+        if links and 'invocations' in links:
+            self._links['invocations'] = links['invocations']
 
     def files(self):
         files = []
@@ -553,34 +597,108 @@ class ImportOperations(object):
         for operation in operations:
             self._operations.append(ImportOperation(self._session, **operation))
 
-    def load_attribute_values(self, progress_listener=None):
+    def load_attribute_values(self, progress_listener=None, is_cancelled=None):
+        """
+        Fetches the current value of the attributes of the created/updated MOs, one cmedit get command per MO.
+        When the CLI supports it, several commands are executed at the same time.
+
+        :param progress_listener: callable receiving the completion percentage and the estimated number of seconds to
+                                  complete, based on the time between the command completions so far.
+        :param is_cancelled: callable returning True when no more commands should be executed. The values fetched
+                             until then are kept.
+        """
         self._attr_value_cache = {}
-        if self._operations:
-            total_of_operations = len(self._operations)
-            operations_evaluated = 0
-            logger.debug('operations to get the current value from: %d', total_of_operations)
-            for operation in self._operations:
-                if operation.type().lower() in ('update', 'create'):
-                    if not operation.fdn() in self._attr_value_cache:
-                        cmedit_get = 'cmedit get %s -t' % operation.fdn()
-                        logger.debug('executing: %s', cmedit_get)
-                        result = self._cli.execute(cmedit_get)
-                        if not result.is_command_result_available():
-                            logger.error('Failed to fetch current value for MO %s. Http response code: %s', operation.fdn(), result.http_response_code())
-                        else:
-                            output = result.get_output()
-                            if output.has_groups():
-                                current_values = output.groups()[0][0]
-                                values_cache = {}
-                                for i in xrange(len(current_values)):
-                                    values_cache[current_values[i].labels()[0]] = _cli_complex_to_json_object(current_values[i].value())
-
-                                self._attr_value_cache[operation.fdn()] = values_cache
-                            elif operation.type().lower() == 'update':
-                                logger.warn('MO not found %s', operation.fdn())
-                if progress_listener:
-                    operations_evaluated += 1
-                    progress_listener(int(operations_evaluated * 100 / total_of_operations))
+        if not self._operations:
+            return
+
+        mo_types = OrderedDict()
+        for operation in self._operations:
+            if operation.type().lower() in ('update', 'create') and operation.fdn() not in mo_types:
+                mo_types[operation.fdn()] = operation.type().lower()
+        total_of_mos = len(mo_types)
+        logger.debug('MOs to get the current value from: %d', total_of_mos)
+
+        if hasattr(self._cli, 'execute_many'):
+            results = self._cmedit_get_pipelined(mo_types.keys(), is_cancelled)
+        else:
+            results = self._cmedit_get_sequential(mo_types.keys(), is_cancelled)
+
+        latency = None
+        last_completion = time.time()
+        for mos_evaluated, (fdn, result) in enumerate(results, 1):
+            if is_cancelled and is_cancelled():
+                # the result of the command still running when cancelled is ignored
+                logger.debug('Fetching of current values cancelled, ignoring the result for %s', fdn)
+                break
+            self._load_mo_values(fdn, mo_types[fdn], result)
+            now = time.time()
+            elapsed, last_completion = now - last_completion, now
+            latency = elapsed if latency is None else latency * (1 - _LATENCY_SMOOTHING) + elapsed * _LATENCY_SMOOTHING
+            if progress_listener:
+                progress_listener(int(mos_evaluated * 100 / total_of_mos), latency * (total_of_mos - mos_evaluated))
+
+        if progress_listener and total_of_mos == 0:
+            progress_listener(100, 0)
+
+    def _cmedit_get_sequential(self, fdns, is_cancelled):
+        for fdn in fdns:
+            if is_cancelled and is_cancelled():
+                logger.debug('Fetching of current values cancelled')
+                return
+            cmedit_get = 'cmedit get %s -t' % fdn
+            logger.debug('executing: %s', cmedit_get)
+            yield fdn, self._cli.execute(cmedit_get)
+
+    def _cmedit_get_pipelined(self, fdns, is_cancelled):
+        futures = self._cli.execute_many(['cmedit get %s -t' % fdn for fdn in fdns], max_in_flight=_CLI_MAX_IN_FLIGHT)
+        fdn_by_future = dict(zip(futures, fdns))
+        completed = Queue()
+        for future in futures:
+            future.add_done_callback(completed.put)
+
+        pending = len(futures)
+        while pending:
+            try:
+                future = completed.get(timeout=_CANCEL_CHECK_SECONDS)
+            except Empty:
+                future = None
+            if is_cancelled and is_cancelled():
+                not_executed = [f for f in futures if f.cancel()]
+                logger.debug('Fetching of current values cancelled, %d commands not executed', len(not_executed))
+                return
+            if future:
+                pending -= 1
+                yield fdn_by_future[future], future.result()
+
+    def _load_mo_values(self, fdn, mo_type, result):
+        if not result.is_command_result_available():
+            logger.error('Failed to fetch current value for MO %s. Http response code: %s', fdn, result.http_response_code())
+        else:
+            values = self._first_row_values(result)
+            if values is not None:
+                self._attr_value_cache[fdn] = dict((attribute, _cli_complex_to_json_object(value))
+                                                   for attribute, value in values)
+            elif mo_type == 'update':
+                logger.warn('MO not found %s', fdn)
+
+    @staticmethod
+    def _first_row_values(result):
+        """
+        :return: list of (attribute, value) of the first row of the first table of a cmedit get output, None if the
+                 output has no table
+        """
+        if hasattr(result, 'get_tables'):
+            # columnar view, read in a single pass without creating an element per attribute. The columns of the
+            # attributes found in other rows only are None in the first row
+            tables = result.get_tables()
+            if tables and len(tables[0]):
+                return [(attribute, value) for attribute, value in zip(tables[0].headers(), tables[0].row(0))
+                        if value is not None]
+            return None
+        output = result.get_output()
+        if output.has_groups():
+            return [(attribute.labels()[0], attribute.value()) for attribute in output.groups()[0][0]]
+        return None
 
 
 class ImportOperation(object):
@@ -1,7 +1,9 @@
 import json
 import logging
 
+from datetime import datetime, timedelta
 from posixpath import join as urljoin
+from threading import Lock
 
 logger = logging.getLogger(__name__)
 
@@ -9,40 +11,80 @@ _HAL_JSON_CONTENT_TYPE = {'Content-type': 'application/json'}
 
 
 class CmImportUndo(object):
+    """
+    Client of the undo jobs. The undo jobs are synced incrementally: only the jobs created since the last sync, or
+    since the oldest job still in progress, are requested. The jobs are kept along with the map of import job id to
+    undo job ids, so that the undo jobs of an import job are looked up without a request.
+    """
 
     _JOBS_URI = '/configuration/jobs'
     _JOB_TYPE = 'UNDO_IMPORT_TO_LIVE'
 
+    # the jobs in these statuses do not change any more
+    _FINAL_STATUSES = ('COMPLETED', 'FAILED')
+
+    # seconds the sync starts before the creation time of the last job, covering the jobs created in the same second
+    _SYNC_OVERLAP_SECONDS = 1
+
     def __init__(self, nbi_session):
         self._session = nbi_session
-        self._import_to_undo_cache = None
-
-    def get_jobs(self, for_import_job=None):
-        response = self._session.get(self._JOBS_URI, parameters={'type': self._JOB_TYPE}, headers=_HAL_JSON_CONTENT_TYPE)
+        self._lock = Lock()
+        self._jobs = {}  # undo job id -> ImportUndoJob
+        self._import_to_undo_cache = {}  # import job id -> list of undo job ids
+        self._sync_from = None  # creation time the next sync starts from
+        self._synced = False
+
+    def sync(self):
+        """
+        Requests the undo jobs created since the last sync, or since the creation of the oldest job still in progress.
+        The first sync requests all the undo jobs.
+        """
+        parameters = {'type': self._JOB_TYPE}
+        if self._sync_from:
+            parameters['createdAfter'] = self._sync_from
+        response = self._session.get(self._JOBS_URI, parameters=parameters, headers=_HAL_JSON_CONTENT_TYPE)
         jobs = self._job_list_from_response(response)
-        self._map_import_to_undo(jobs)
-        logger.debug('job list is %s', str(jobs))
+        with self._lock:
+            for job in jobs:
+                self._add_job(job)
+            self._sync_from = self._next_sync_from()
+            self._synced = True
+        logger.debug('synced %d undo jobs, %d in total, next sync from %s', len(jobs), len(self._jobs), self._sync_from)
 
-        return jobs if for_import_job is None else [j for j in jobs if j.job_id() == for_import_job]
+    def get_jobs(self, for_import_job=None):
+        """
+        :param for_import_job: optional id of the import job the undo jobs are of
+        :return: the undo jobs, the latest first, after syncing them
+        """
+        self.sync()
+        with self._lock:
+            if for_import_job is None:
+                jobs = self._jobs.values()
+            else:
+                jobs = [self._jobs[job_id] for job_id in self._import_to_undo_cache.get(for_import_job, [])
+                        if job_id in self._jobs]
+        return sorted(jobs, key=lambda job: job.creation_time(), reverse=True)
 
     def get_job(self, undo_job_id):
         response = self._session.get(urljoin(self._JOBS_URI, str(undo_job_id)), parameters={'type': self._JOB_TYPE}, headers=_HAL_JSON_CONTENT_TYPE)
         return ImportUndoJob(self._session, **response)
 
     def get_job_for_import(self, import_job_id):
-        if self._import_to_undo_cache is None:
-            self.get_jobs()
-        return self._import_to_undo_cache.get(import_job_id, [])
+        """
+        :return: the ids of the undo jobs of the import job, without any request once the undo jobs have been synced
+        """
+        if not self._synced:
+            self.sync()
+        with self._lock:
+            return list(self._import_to_undo_cache.get(str(import_job_id), []))
 
     def undo_import_job(self, import_job_id):
         data = {'type': self._JOB_TYPE, 'id': import_job_id, 'fileFormat': '3GPP'}
         response = self._session.post(self._JOBS_URI, request_body=json.dumps(data), headers=_HAL_JSON_CONTENT_TYPE)
         job_id = response['id']
-        if self._import_to_undo_cache is None:
-            self._import_to_undo_cache = {}
-        undo_list = self._import_to_undo_cache.get(str(import_job_id), [])
-        undo_list.append(job_id)
-        self._import_to_undo_cache[str(import_job_id)] = undo_list
+        # the job itself is fetched by the next sync
+        with self._lock:
+            self._map_import_to_undo(str(import_job_id), job_id)
 
         return job_id
 
@@ -53,14 +95,23 @@ class CmImportUndo(object):
                 list_of_jobs.append(ImportUndoJob(self._session, **job))
         return list_of_jobs
 
-    def _map_import_to_undo(self, undo_jobs_list):
-        self._import_to_undo_cache = {}
-        for job in undo_jobs_list:
-            if not job.job_id() or not job.job_id().isdigit():
-                continue
-            undo_list = self._import_to_undo_cache.get(job.job_id(), [])
-            undo_list.append(job.id())
-            self._import_to_undo_cache[job.job_id()] = undo_list
+    def _add_job(self, job):
+        self._jobs[job.id()] = job
+        if job.job_id() and job.job_id().isdigit():
+            self._map_import_to_undo(job.job_id(), job.id())
+
+    def _map_import_to_undo(self, import_job_id, undo_job_id):
+        undo_list = self._import_to_undo_cache.setdefault(import_job_id, [])
+        if undo_job_id not in undo_list:
+            undo_list.append(undo_job_id)
+
+    def _next_sync_from(self):
+        in_progress = [job.creation_time() for job in self._jobs.itervalues()
+                       if job.status() not in self._FINAL_STATUSES and job.creation_time()]
+        creation_times = in_progress or [job.creation_time() for job in self._jobs.itervalues() if job.creation_time()]
+        if not creation_times:
+            return None
+        return _seconds_before(min(creation_times) if in_progress else max(creation_times), self._SYNC_OVERLAP_SECONDS)
 
 
 class ImportUndoJob(object):
@@ -125,19 +176,35 @@ class ImportUndoJob(object):
     def is_successful(self):
         return self._status == 'COMPLETED'
 
-    def save_file(self, dest_file):
+    def save_file(self, dest_file, progress_listener=None, is_cancelled=None):
+        """
+        Downloads the undo file into dest_file, resuming the download if the connection is interrupted
+
+        :param progress_listener: optional callable receiving the number of bytes received and the size of the file,
+                                  None if unknown
+        :param is_cancelled: optional callable returning True to abort the download
+        """
         if not self._file_uri:
             raise ValueError('There is not file available to download.')
         header = _HAL_JSON_CONTENT_TYPE.copy()
         header.update({'Accept': 'application/octet-stream, application/json, application/hal+json'})
-        response = self._nbi_session.send_request(self._nbi_session.get_method, path=self._file_uri, stream=True, headers=header)
-        for block in response.iter_content(1024):
-            if not block:
-                break
-            dest_file.write(block)
+        self._nbi_session.download(self._file_uri, dest_file, headers=header, progress_listener=progress_listener,
+                                   is_cancelled=is_cancelled)
 
     @staticmethod
     def _fix_context_uri(uri):
         if uri and uri.startswith('/configuration') and not uri.startswith('/configuration/'):
             return '/configuration/' + uri[len('/configuration'):]
-        return uri
\ No newline at end of file
+        return uri
+
+
+def _seconds_before(timestamp, seconds):
+    """
+    :return: the timestamp, e.g. 2017-07-20T17:03:31.593, moved the given seconds before, to the second
+    """
+    try:
+        date = datetime.strptime(timestamp[:19], '%Y-%m-%dT%H:%M:%S')
+    except ValueError:
+        logger.warning('Unexpected undo job creation time [%s], syncing all the undo jobs', timestamp)
+        return None
+    return (date - timedelta(seconds=seconds)).strftime('%Y-%m-%dT%H:%M:%S')
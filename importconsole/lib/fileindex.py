@@ -0,0 +1,278 @@
+import os
+import re
+import json
+import heapq
+import hashlib
+import logging
+
+from itertools import islice
+from threading import Thread, Lock, Event
+
+import uibind_fs
+
+_REFRESH_INTERVAL_SECONDS = 5 * 60
+
+_INDEX_FORMAT_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+class FileIndex(object):
+    """
+    Index of the files under a root directory, used to find files by substring or fuzzy (subsequence) queries.
+
+    The index is built on a background thread and saved to index_file, so the next run starts with the files known by
+    the previous one. Refreshing the index only lists again the directories whose modification time has changed, the
+    listing of the other directories is taken from the previous index.
+
+    Searching for a query that extends the previous one (the user typed one more character) only looks at the files
+    matching the previous query. Files are kept ordered by the length of their path, so the best results of each match
+    group are the first ones found and the search can stop as soon as enough of them are found.
+    """
+
+    def __init__(self, root, index_file=None, refresh_interval=_REFRESH_INTERVAL_SECONDS):
+        self._root = os.path.abspath(root)
+        self._index_file = index_file
+        self._refresh_interval = refresh_interval
+        self._lock = Lock()
+        self._dirs = {}
+        self._paths = []
+        self._lower_paths = []
+        self._lower_names = []
+        self._generation = 0
+        self._last_search = None
+        self._indexed = False
+        self._closed = False
+        self._on_refresh = []
+        self._refresh_requested = Event()
+        self._refresh_requested.set()
+        self._thread = Thread(target=self._do_work, name='File-Index-Thread')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def root(self):
+        return self._root
+
+    def size(self):
+        """
+        :return: number of files in the index
+        """
+        return len(self._paths)
+
+    def is_indexed(self):
+        """
+        :return: True once the file system has been scanned at least once, i.e. the index is not just what was loaded
+                 from the index file.
+        """
+        return self._indexed
+
+    def refresh(self, on_done=None):
+        """
+        Requests the index to be refreshed.
+
+        :param on_done: callable with no arguments called from the index thread once the refresh is completed
+        """
+        if on_done:
+            with self._lock:
+                self._on_refresh.append(on_done)
+        self._refresh_requested.set()
+
+    def close(self):
+        """
+        Stops refreshing the index.
+        """
+        self._closed = True
+        self._refresh_requested.set()
+
+    def search(self, query, limit=100):
+        """
+        Finds the files whose path relative to the root matches the query, ignoring case.
+
+        Files containing the query in their name come first, followed by the ones containing it anywhere in the path
+        and then by the ones containing all the query characters in the same order. Within each group the files where
+        the matched characters are closer together come first.
+
+        :param query: text to search for
+        :param limit: maximum number of results
+        :return: list of absolute file paths
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        with self._lock:
+            paths = self._paths
+            lower_paths = self._lower_paths
+            lower_names = self._lower_names
+            generation = self._generation
+            last_search = self._last_search
+
+        if last_search and last_search[0] == generation and query.startswith(last_search[1]):
+            candidates = last_search[2]
+        else:
+            candidates = xrange(len(lower_paths))
+
+        if len(query) == 1:
+            matches = [i for i in candidates if query in lower_paths[i]]
+        else:
+            is_match = _fuzzy_regex(query).search
+            matches = [i for i in candidates if is_match(lower_paths[i])]
+
+        with self._lock:
+            if generation == self._generation:
+                self._last_search = (generation, query, matches)
+
+        found = list(islice((i for i in matches if query in lower_names[i]), limit))
+        if len(found) < limit:
+            in_name = set(found)
+            found.extend(islice((i for i in matches if i not in in_name and query in lower_paths[i]), limit - len(found)))
+        if len(found) < limit:
+            in_path = set(found)
+            fuzzy = (i for i in matches if i not in in_path)
+            found.extend(heapq.nsmallest(limit - len(found), fuzzy, key=lambda i: (_fuzzy_span(query, lower_paths[i]), i)))
+
+        return [os.path.join(self._root, paths[i]) for i in found]
+
+    def _do_work(self):
+        self._load()
+        while not self._closed:
+            self._refresh_requested.wait(self._refresh_interval)
+            if self._closed:
+                break
+            self._refresh_requested.clear()
+            with self._lock:
+                on_refresh, self._on_refresh = self._on_refresh, []
+            try:
+                self._refresh()
+            except Exception as e:
+                logger.exception('Failed to refresh the file index of [%s]: %s', self._root, e)
+            for call in on_refresh:
+                try:
+                    call()
+                except Exception as e:
+                    logger.exception('Exception on file index refresh callback. %s', e)
+
+    def _refresh(self):
+        previous_dirs = self._dirs
+        dirs = {}
+        visited = set()
+        changed = False
+        pending = ['']
+        while pending and not self._closed:
+            rel_dir = pending.pop()
+            dir_path = os.path.join(self._root, rel_dir) if rel_dir else self._root
+            try:
+                st = os.stat(dir_path)
+            except OSError:
+                changed = True
+                continue
+            if (st.st_dev, st.st_ino) in visited:
+                continue
+            visited.add((st.st_dev, st.st_ino))
+
+            previous = previous_dirs.get(rel_dir)
+            if previous and previous[0] == st.st_mtime:
+                files, sub_dirs = previous[1], previous[2]
+            else:
+                changed = True
+                files, sub_dirs = [], []
+                try:
+                    for batch in uibind_fs.iter_directory(dir_path):
+                        for entry in batch:
+                            (sub_dirs if entry['is_dir'] else files).append(entry['name'])
+                except OSError as e:
+                    logger.debug('Can not index directory [%s]: %s', dir_path, e)
+            dirs[rel_dir] = (st.st_mtime, files, sub_dirs)
+            pending.extend(os.path.join(rel_dir, name) if rel_dir else name for name in sub_dirs)
+
+        if self._closed:
+            return
+
+        changed = changed or len(dirs) != len(previous_dirs)
+        if changed:
+            self._publish(dirs)
+            self._save()
+        self._indexed = True
+        logger.debug('File index of [%s] refreshed: %d files, changed=%s', self._root, len(self._paths), changed)
+
+    def _publish(self, dirs):
+        paths = [os.path.join(rel_dir, name) if rel_dir else name for rel_dir, (_, files, _) in dirs.iteritems() for name in files]
+        paths.sort(key=lambda p: (len(p), p))
+        lower_paths = [p.lower() for p in paths]
+        lower_names = [os.path.basename(p) for p in lower_paths]
+        with self._lock:
+            self._dirs = dirs
+            self._paths = paths
+            self._lower_paths = lower_paths
+            self._lower_names = lower_names
+            self._generation += 1
+            self._last_search = None
+
+    def _load(self):
+        if not self._index_file or not os.path.isfile(self._index_file):
+            return
+        try:
+            with open(self._index_file) as f:
+                data = json.load(f)
+            if data.get('version') != _INDEX_FORMAT_VERSION or data.get('root') != self._root:
+                return
+            self._publish(dict((rel_dir, tuple(value)) for rel_dir, value in data['dirs'].iteritems()))
+            logger.debug('Loaded %d files from the file index [%s]', len(self._paths), self._index_file)
+        except (IOError, ValueError, KeyError, TypeError) as e:
+            logger.warning('Ignoring invalid file index [%s]: %s', self._index_file, e)
+
+    def _save(self):
+        if not self._index_file:
+            return
+        tmp_file = self._index_file + '.tmp'
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump({'version': _INDEX_FORMAT_VERSION, 'root': self._root, 'dirs': self._dirs}, f)
+            os.rename(tmp_file, self._index_file)
+        except (IOError, OSError) as e:
+            logger.warning('Failed to save the file index [%s]: %s', self._index_file, e)
+
+
+def _fuzzy_regex(query):
+    """
+    :return: regular expression matching any text containing all the query characters in the same order
+    """
+    pattern = re.escape(query[0]) + ''.join('[^%s]*%s' % (re.escape(char), re.escape(char)) for char in query[1:])
+    return re.compile(pattern)
+
+
+def _fuzzy_span(query, text):
+    """
+    :return: length of the shortest text section, starting at the first query character, that contains all the query
+             characters in the same order
+    """
+    first = pos = text.find(query[0])
+    for char in query[1:]:
+        pos = text.find(char, pos + 1)
+    return pos - first
+
+
+def index_file_for(root, index_dir):
+    """
+    :return: path of the file where the index of the given root directory is saved
+    """
+    digest = hashlib.md5(os.path.abspath(root)).hexdigest()[:12]
+    return os.path.join(index_dir or os.curdir, '.importconsole-index-%s.json' % digest)
+
+
+_index = None
+_index_lock = Lock()
+
+
+def get_file_index(root, index_dir=None):
+    """
+    Returns the FileIndex of the given root directory, creating it on first use. Only one index is kept at a time,
+    the index of a different root is closed when a new root is requested.
+    """
+    global _index
+    with _index_lock:
+        if _index is None or _index.root() != os.path.abspath(root):
+            if _index:
+                _index.close()
+            _index = FileIndex(root, index_file_for(root, index_dir))
+        return _index
@@ -0,0 +1,335 @@
+import logging
+import os
+import re
+
+from xml.sax import make_parser, SAXParseException
+from xml.sax.handler import ContentHandler
+from xml.sax.saxutils import XMLGenerator
+
+logger = logging.getLogger(__name__)
+
+FORMAT_3GPP_XML = '3gpp-xml'
+FORMAT_DYNAMIC = 'dynamic'
+
+_DEFAULT_MAX_ERRORS = 100
+
+_XML_ROOT = 'bulkCmConfigDataFile'
+_XML_MODIFIERS = ('create', 'delete', 'update')
+# MO elements holding a node, the first one found being the node
+_NODE_MO_TYPES = ('MeContext', 'ManagedElement', 'NetworkElement')
+
+_DYNAMIC_OPERATIONS = ('create', 'set', 'delete', 'action')
+_DYNAMIC_FDN = re.compile(r'^FDN\s*:\s*"?([^"]*)"?\s*$', re.IGNORECASE)
+_DYNAMIC_ATTRIBUTE = re.compile(r'^[A-Za-z_][\w.\[\]-]*\s*:')
+_FDN_NODES = tuple((mo_type, re.compile(r'(?:^|,)\s*%s=([^,]+)' % mo_type)) for mo_type in _NODE_MO_TYPES)
+
+
+class ImportFileScan(object):
+    """
+    Result of the scan of an import file: format, operations by type, operations by node and syntax errors.
+
+    The operations of a 3GPP bulk file are the MOs with a modifier, either their own or inherited from the parent MO.
+    The node of an operation is its MeContext, ManagedElement or NetworkElement, the first of them in the FDN.
+    """
+
+    def __init__(self, file_path, file_format):
+        self.file_path = file_path
+        self.format = file_format
+        self.operations = {}  # operation type -> count
+        self.nodes = {}  # node -> number of operations
+        self.node_order = []  # nodes in the order they are found in the file
+        self.operations_outside_nodes = 0
+        self.errors = []  # list of (line number, message)
+        self.errors_truncated = False
+
+    def operation_count(self):
+        return sum(self.operations.values())
+
+    def node_count(self):
+        return len(self.nodes)
+
+    def is_valid(self):
+        return not self.errors
+
+    def as_dict(self):
+        return {'file': self.file_path,
+                'format': self.format,
+                'operations': self.operation_count(),
+                'operations_by_type': dict(self.operations),
+                'nodes': self.node_count(),
+                'errors': ['line %d: %s' % error for error in self.errors]}
+
+    def __str__(self):
+        text = '%s: %s file, %d operations on %d nodes' % (os.path.basename(self.file_path), self.format,
+                                                           self.operation_count(), self.node_count())
+        if self.errors:
+            text += ', %s%d errors, first one at line %d: %s' % ('more than ' if self.errors_truncated else '',
+                                                              len(self.errors), self.errors[0][0], self.errors[0][1])
+        return text
+
+    def _add_operation(self, operation_type, node):
+        self.operations[operation_type] = self.operations.get(operation_type, 0) + 1
+        if node is None:
+            self.operations_outside_nodes += 1
+        elif node in self.nodes:
+            self.nodes[node] += 1
+        else:
+            self.nodes[node] = 1
+            self.node_order.append(node)
+
+    def _add_error(self, line, message, max_errors):
+        if len(self.errors) < max_errors:
+            self.errors.append((line, message))
+        else:
+            self.errors_truncated = True
+
+
+def detect_format(file_path):
+    """
+    :return: FORMAT_3GPP_XML if the file starts with an XML tag, FORMAT_DYNAMIC otherwise
+    """
+    with open(file_path, 'rb') as import_file:
+        start = import_file.read(1024).lstrip('\xef\xbb\xbf \t\r\n')
+    return FORMAT_3GPP_XML if start.startswith('<') else FORMAT_DYNAMIC
+
+
+def scan(file_path, max_errors=_DEFAULT_MAX_ERRORS):
+    """
+    Scans an import file, 3GPP bulk XML or dynamic text, reading it as a stream so that the memory used does not depend
+    on the size of the file.
+
+    :param file_path: path of the import file
+    :param max_errors: maximum number of errors reported
+    :return: ImportFileScan
+    """
+    file_format = detect_format(file_path)
+    result = ImportFileScan(file_path, file_format)
+    if file_format == FORMAT_3GPP_XML:
+        _parse_xml(file_path, _XmlScanHandler(result, max_errors), result, max_errors)
+    else:
+        _scan_dynamic(file_path, result, max_errors)
+    logger.info('Scanned %s', result)
+    return result
+
+
+def split(file_path, parts, output_dir, file_scan=None):
+    """
+    Splits an import file into files holding all the operations of a subset of its nodes, balanced by number of
+    operations, so that they can be imported in parallel. The operations keep their order within each node.
+
+    :param file_path: path of the import file
+    :param parts: maximum number of files, less files are written if the file has less nodes
+    :param output_dir: directory the files are written to
+    :param file_scan: the ImportFileScan of the file, if already scanned
+    :return: list of (file path, number of nodes, number of operations) of the files written
+    :raise ValueError: if the file has errors or operations outside of the nodes, which cannot be split
+    """
+    file_scan = file_scan or scan(file_path)
+    if not file_scan.is_valid():
+        raise ValueError('The file %s has errors and cannot be split' % file_path)
+    if file_scan.operations_outside_nodes:
+        raise ValueError('The file %s has %d operations outside of the nodes and cannot be split' %
+                         (file_path, file_scan.operations_outside_nodes))
+
+    assignment, part_nodes, part_operations = _balance(file_scan, parts)
+    name, extension = os.path.splitext(os.path.basename(file_path))
+    part_paths = [os.path.join(output_dir, '%s.part%02d%s' % (name, index + 1, extension))
+                  for index in xrange(len(part_nodes))]
+    outputs = [open(part_path, 'wb') for part_path in part_paths]
+    try:
+        if file_scan.format == FORMAT_3GPP_XML:
+            _parse_xml(file_path, _XmlSplitHandler(assignment, outputs), file_scan, 1)
+        else:
+            _split_dynamic(file_path, assignment, outputs)
+    finally:
+        for output in outputs:
+            output.close()
+    logger.info('Split [%s] into %d files', file_path, len(part_paths))
+    return zip(part_paths, part_nodes, part_operations)
+
+
+def _balance(file_scan, parts):
+    """
+    :return: dictionary of node to part index, number of nodes and of operations of each part. The nodes with the
+             most operations are assigned first, each to the part with the least operations so far
+    """
+    parts = max(1, min(parts, file_scan.node_count()))
+    part_nodes = [0] * parts
+    part_operations = [0] * parts
+    assignment = {}
+    for node in sorted(file_scan.node_order, key=lambda node: file_scan.nodes[node], reverse=True):
+        index = part_operations.index(min(part_operations))
+        assignment[node] = index
+        part_nodes[index] += 1
+        part_operations[index] += file_scan.nodes[node]
+    return assignment, part_nodes, part_operations
+
+
+def _parse_xml(file_path, handler, file_scan, max_errors):
+    parser = make_parser()
+    parser.setContentHandler(handler)
+    try:
+        # the parser reads the file in blocks, setting the document locator of the handler
+        with open(file_path, 'rb') as import_file:
+            parser.parse(import_file)
+    except SAXParseException as e:
+        file_scan._add_error(e.getLineNumber(), e.getMessage(), max_errors)
+
+
+def _local_name(name):
+    return name.rsplit(':', 1)[-1]
+
+
+class _XmlNodeTracker(ContentHandler):
+    """
+    Tracks the MO and the node the parser is in: MOs are the elements with an id, nodes the outermost MOs of one of the
+    node types
+    """
+
+    def __init__(self):
+        ContentHandler.__init__(self)
+        self._modifiers = []  # effective modifier of each open element
+        self._node = None
+        self._node_depth = None
+
+    def startElement(self, name, attrs):
+        modifier = attrs.get('modifier') or (self._modifiers[-1] if self._modifiers else None)
+        if self._node is None and 'id' in attrs and _local_name(name) in _NODE_MO_TYPES:
+            self._node = '%s=%s' % (_local_name(name), attrs['id'])
+            self._node_depth = len(self._modifiers)
+        self._modifiers.append(modifier)
+        return modifier
+
+    def endElement(self, name):
+        self._modifiers.pop()
+        if self._node_depth == len(self._modifiers):
+            self._node = None
+            self._node_depth = None
+
+
+class _XmlScanHandler(_XmlNodeTracker):
+
+    def __init__(self, file_scan, max_errors):
+        _XmlNodeTracker.__init__(self)
+        self._scan = file_scan
+        self._max_errors = max_errors
+        self._locator = None
+
+    def setDocumentLocator(self, locator):
+        self._locator = locator
+
+    def startElement(self, name, attrs):
+        if not self._modifiers and _local_name(name) != _XML_ROOT:
+            self._error('Unexpected root element %s, expected %s' % (name, _XML_ROOT))
+        own_modifier = attrs.get('modifier')
+        if own_modifier is not None and own_modifier not in _XML_MODIFIERS:
+            self._error('Unknown modifier [%s] of %s' % (own_modifier, name))
+        modifier = _XmlNodeTracker.startElement(self, name, attrs)
+        if modifier is not None and 'id' in attrs:
+            self._scan._add_operation(modifier, self._node)
+
+    def _error(self, message):
+        self._scan._add_error(self._locator.getLineNumber() if self._locator else 0, message, self._max_errors)
+
+
+class _XmlSplitHandler(_XmlNodeTracker):
+    """
+    Writes the elements of each node to the output of its part, and the elements outside of the nodes (header,
+    configuration data, sub-networks and footer) to all the outputs
+    """
+
+    def __init__(self, assignment, outputs):
+        _XmlNodeTracker.__init__(self)
+        self._assignment = assignment
+        self._generators = [XMLGenerator(output, 'UTF-8') for output in outputs]
+
+    def _targets(self):
+        return self._generators if self._node is None else (self._generators[self._assignment[self._node]],)
+
+    def startDocument(self):
+        for generator in self._generators:
+            generator.startDocument()
+
+    def endDocument(self):
+        for generator in self._generators:
+            generator.endDocument()
+
+    def startElement(self, name, attrs):
+        _XmlNodeTracker.startElement(self, name, attrs)
+        for generator in self._targets():
+            generator.startElement(name, attrs)
+
+    def endElement(self, name):
+        targets = self._targets()
+        _XmlNodeTracker.endElement(self, name)
+        for generator in targets:
+            generator.endElement(name)
+
+    def characters(self, content):
+        for generator in self._targets():
+            generator.characters(content)
+
+    def ignorableWhitespace(self, whitespace):
+        self.characters(whitespace)
+
+
+def _dynamic_operations(file_path):
+    """
+    Iterates over the operations of a dynamic text file, separated by empty lines
+
+    :return: iterator of (line number, lines) of each operation, the first line being the operation type, or of the
+             lines found outside of an operation
+    """
+    with open(file_path, 'rb') as import_file:
+        lines = []
+        start = 0
+        for number, line in enumerate(import_file, 1):
+            stripped = line.strip()
+            if stripped.lower() in _DYNAMIC_OPERATIONS and lines:
+                yield start, lines
+                lines = []
+            if not stripped:
+                if lines:
+                    yield start, lines
+                    lines = []
+                continue
+            if not lines:
+                start = number
+            lines.append(line)
+        if lines:
+            yield start, lines
+
+
+def _dynamic_node(fdn):
+    for mo_type, pattern in _FDN_NODES:
+        match = pattern.search(fdn)
+        if match:
+            return '%s=%s' % (mo_type, match.group(1).strip())
+    return None
+
+
+def _scan_dynamic(file_path, file_scan, max_errors):
+    for number, lines in _dynamic_operations(file_path):
+        operation = lines[0].strip().lower()
+        if operation not in _DYNAMIC_OPERATIONS:
+            file_scan._add_error(number, 'Unknown operation [%s], expected one of %s' %
+                                 (lines[0].strip()[:50], ', '.join(_DYNAMIC_OPERATIONS)), max_errors)
+            continue
+        fdn = _DYNAMIC_FDN.match(lines[1].strip()) if len(lines) > 1 else None
+        if not fdn or not fdn.group(1).strip():
+            file_scan._add_error(number + 1, 'Missing FDN of the %s operation' % operation, max_errors)
+            continue
+        for offset, line in enumerate(lines[2:], 2):
+            # indented lines continue the value of the previous attribute
+            if operation == 'delete' or not (_DYNAMIC_ATTRIBUTE.match(line) or line[:1] in ' \t'):
+                file_scan._add_error(number + offset, 'Unexpected line in the %s operation, expected '
+                                     '<attribute> : <value>' % operation, max_errors)
+                break
+        file_scan._add_operation(operation, _dynamic_node(fdn.group(1)))
+
+
+def _split_dynamic(file_path, assignment, outputs):
+    for number, lines in _dynamic_operations(file_path):
+        output = outputs[assignment[_dynamic_node(_DYNAMIC_FDN.match(lines[1].strip()).group(1))]]
+        output.writelines(lines)
+        output.write('\n')
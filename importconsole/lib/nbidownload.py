@@ -0,0 +1,175 @@
+import base64
+import hashlib
+import logging
+import re
+import socket
+import time
+import zlib
+
+from httplib import HTTPException
+
+try:
+    from requests.packages.urllib3.exceptions import HTTPError as _StreamError
+except ImportError:
+    from urllib3.exceptions import HTTPError as _StreamError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+_DEFAULT_MAX_RETRIES = 3
+
+_RETRY_DELAY_SECONDS = 1
+
+# zlib window bits decoding both the gzip and the zlib (deflate) formats
+_AUTO_WBITS = 32 + zlib.MAX_WBITS
+
+_CONTENT_RANGE = re.compile(r'bytes\s+(\d+)-\d+/(\d+|\*)')
+
+
+class DownloadCancelledException(Exception):
+    def __str__(self):
+        return 'The download was cancelled'
+
+
+class DownloadIntegrityException(IOError):
+    pass
+
+
+class ResumableDownload(object):
+    """
+    Download of a resource into a file, read from the connection in chunks of chunk_size bytes written to the file as
+    they are read. A download interrupted by a connection error, or ending before Content-Length, is resumed where it
+    stopped with a Range request, up to max_retries times. It starts over when the server does not support ranges or
+    sends a range not starting where the download stopped.
+
+    The content encoding (gzip or deflate) is decoded on the fly. The ranges, the progress, the size check against
+    Content-Length and the check of Content-MD5, when the server sends it, are on the encoded content.
+
+    Sample usage:
+        with open('/tmp/undo.txt', 'wb') as dest_file:
+            ResumableDownload(lambda headers: session.send_request(session.get_method, path, headers=headers,
+                                                                   stream=True), dest_file).run()
+    """
+
+    def __init__(self, send_request, dest_file, chunk_size=DEFAULT_CHUNK_SIZE, progress_listener=None,
+                 is_cancelled=None, max_retries=_DEFAULT_MAX_RETRIES, connection_errors=()):
+        """
+        :param send_request:        callable receiving the extra request headers and returning the streamed response
+        :param dest_file:           file object the content is written to, from its current position
+        :param chunk_size:          number of bytes read from the connection at a time
+        :param progress_listener:   optional callable receiving the number of bytes received and the size of the
+                                    content, None if unknown
+        :param is_cancelled:        optional callable returning True when the download has to be aborted, raising
+                                    DownloadCancelledException
+        :param max_retries:         number of times an interrupted download is resumed
+        :param connection_errors:   exceptions raised by send_request on connection errors, which are retried too
+        """
+        self._send_request = send_request
+        self._dest_file = dest_file
+        self._chunk_size = chunk_size
+        self._progress_listener = progress_listener
+        self._is_cancelled = is_cancelled
+        self._max_retries = max_retries
+        self._retried_errors = (_StreamError, HTTPException, socket.error) + tuple(connection_errors)
+        self._start_position = dest_file.tell()
+        self._received = 0
+        self._size = None
+        self._validator = None
+        self._expected_md5 = None
+        self._md5 = None
+        self._decoder = None
+
+    def run(self):
+        """
+        :return: number of bytes received
+        :raise DownloadIntegrityException: if the content does not match the size or MD5 sent by the server
+        """
+        retries = 0
+        while True:
+            try:
+                self._download()
+                break
+            except self._retried_errors as e:
+                if retries >= self._max_retries:
+                    raise
+                error = e
+            retries += 1
+            logger.warning('Download interrupted after %d bytes (%s), resuming, attempt %d of %d', self._received,
+                           error, retries, self._max_retries)
+            time.sleep(_RETRY_DELAY_SECONDS * retries)
+        self._check()
+        return self._received
+
+    def _download(self):
+        headers = {}
+        if self._received:
+            headers['Range'] = 'bytes=%d-' % self._received
+            if self._validator:
+                headers['If-Range'] = self._validator
+        response = self._send_request(headers)
+        if response.status_code == 206 and not self._resumes(response):
+            # a range other than the one requested cannot be appended, the whole content is requested instead
+            logger.info('The server sent the range [%s] instead of the one from %d bytes, starting the download over',
+                        response.headers.get('Content-Range'), self._received)
+            response.close()
+            headers = {}
+            response = self._send_request(headers)
+        try:
+            if response.status_code == 206:
+                if not headers:
+                    raise DownloadIntegrityException('Partial content [%s] received without requesting a range' %
+                                                     response.headers.get('Content-Range'))
+                logger.info('Download resumed at %d bytes', self._received)
+            else:
+                self._restart(response)
+            self._copy(response.raw)
+        finally:
+            response.close()
+
+    def _resumes(self, response):
+        """
+        :return: True if the response is the range requested, starting at the number of bytes already received
+        """
+        match = _CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+        return self._received > 0 and match is not None and int(match.group(1)) == self._received
+
+    def _restart(self, response):
+        if self._received:
+            logger.info('The server does not resume the download, starting it over')
+        self._dest_file.seek(self._start_position)
+        self._dest_file.truncate()
+        self._received = 0
+        content_length = response.headers.get('Content-Length')
+        self._size = int(content_length) if content_length and content_length.isdigit() else None
+        self._validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+        self._expected_md5 = response.headers.get('Content-MD5')
+        self._md5 = hashlib.md5() if self._expected_md5 else None
+        encoding = response.headers.get('Content-Encoding', '').strip().lower()
+        self._decoder = zlib.decompressobj(_AUTO_WBITS) if encoding in ('gzip', 'deflate') else None
+
+    def _copy(self, raw):
+        while True:
+            if self._is_cancelled and self._is_cancelled():
+                raise DownloadCancelledException()
+            # the encoded bytes, so that a resumed download continues the same stream
+            chunk = raw.read(self._chunk_size, decode_content=False)
+            if not chunk:
+                break
+            self._received += len(chunk)
+            if self._md5:
+                self._md5.update(chunk)
+            self._dest_file.write(self._decoder.decompress(chunk) if self._decoder else chunk)
+            if self._progress_listener:
+                self._progress_listener(self._received, self._size)
+
+        if self._size is not None and self._received < self._size:
+            raise HTTPException('Connection closed after %d of %d bytes' % (self._received, self._size))
+        if self._decoder:
+            self._dest_file.write(self._decoder.flush())
+
+    def _check(self):
+        if self._size is not None and self._received != self._size:
+            raise DownloadIntegrityException('Received %d bytes instead of %d' % (self._received, self._size))
+        if self._md5 and base64.b64encode(self._md5.digest()) != self._expected_md5.strip():
+            raise DownloadIntegrityException('The MD5 of the content does not match its Content-MD5 header')
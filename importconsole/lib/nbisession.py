@@ -2,9 +2,12 @@ import logging
 import os
 import socket
 import io
+import time
 from requests import Session, ConnectionError, Timeout
 from posixpath import join as urljoin
 from ssl import SSLError
+from nbiupload import MultipartFileBody, UploadCancelledException
+from nbidownload import ResumableDownload, DownloadCancelledException, DownloadIntegrityException, DEFAULT_CHUNK_SIZE
 
 try:
     # Python 3
@@ -41,13 +44,14 @@ class NbiSession:
     _COOKIE_FILE = '.enm_login'
     _COOKIE_PATH = os.path.join(os.path.expanduser("~"), _COOKIE_FILE)
 
-    def __init__(self, service_uri, host=None, username=None, password=None):
+    def __init__(self, service_uri, host=None, username=None, password=None, stats=None):
         """
         Class constructor
         :param host: base protocol+host of ENM. Eg.: https://enm.athtem.eei.ericsson.se
         :param username: Username to be used to authenticate on ENM
         :param password: User's password
         :param service_uri: The NBI service URI. Eg.: /import
+        :param stats: optional NbiStats recording the requests sent
         """
         self._session = Session()
         self._username = username
@@ -57,6 +61,36 @@ class NbiSession:
         self._nbi_url = urljoin(self._host, service_uri)
         self._session_open = False
         self._use_sso = (not username)
+        self._stats = stats
+        self._request_encodings = None  # content codings accepted by the server for request bodies, if advertised
+        self._upload_compression = None
+        self._upload_max_bytes_per_second = None
+        self._download_chunk_size = DEFAULT_CHUNK_SIZE
+
+    def stats(self):
+        return self._stats
+
+    def set_upload_options(self, compression=None, max_bytes_per_second=None):
+        """
+        :param compression:             True or False to always or never gzip-compress the uploaded files, None to
+                                        compress them when the server accepts gzip-compressed requests
+        :param max_bytes_per_second:    optional limit of the upload throughput
+        """
+        self._upload_compression = compression
+        self._upload_max_bytes_per_second = max_bytes_per_second
+
+    def set_download_options(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        :param chunk_size: number of bytes of the downloaded files read from the connection at a time
+        """
+        self._download_chunk_size = chunk_size
+
+    def accepts_request_encoding(self, encoding):
+        """
+        :return: True if the server advertised, with the Accept-Encoding header of its responses (RFC 7694), that it
+                 accepts request bodies with the given content coding
+        """
+        return self._request_encodings is not None and encoding in self._request_encodings
 
     def username(self):
         return self._username
@@ -119,6 +153,62 @@ class NbiSession:
     def fetch_request(self, *args, **kwargs):
         return self.send_request(*args, **kwargs).json()
 
+    def upload(self, path, file_path, field_name='file', fields=None, progress_listener=None, is_cancelled=None):
+        """
+        Posts a file as multipart/form-data, streamed from the disk so that the memory used does not depend on the
+        size of the file, and gzip-compressed on the fly as set by set_upload_options().
+        A compressed upload rejected with 415 (Unsupported Media Type) is sent again uncompressed.
+
+        :param path: resource URI to send the file to
+        :param file_path: path of the file
+        :param field_name: name of the form field holding the file
+        :param fields: optional dictionary of other form fields
+        :param progress_listener: optional callable receiving the number of bytes of the file sent and its size
+        :param is_cancelled: optional callable returning True to abort the upload, see MultipartFileBody
+        :return: the server response as json object
+        """
+        compress = self._upload_compression
+        if compress is None:
+            compress = self.accepts_request_encoding('gzip')
+        try:
+            return self._upload(path, file_path, field_name, fields, progress_listener, is_cancelled, compress)
+        except NbiRequestException as e:
+            if not compress or e.status_code != 415:
+                raise
+            # only this upload is sent uncompressed, the upload options are left as set
+            logger.info('Compressed upload of [%s] not accepted, sending it uncompressed', file_path)
+            self._request_encodings = set()
+            return self._upload(path, file_path, field_name, fields, progress_listener, is_cancelled, False)
+
+    def _upload(self, path, file_path, field_name, fields, progress_listener, is_cancelled, compress):
+        body = MultipartFileBody(file_path, field_name, fields, compress, progress_listener, is_cancelled,
+                                 self._upload_max_bytes_per_second)
+        headers = {'Content-type': body.content_type()}
+        if compress:
+            headers['Content-Encoding'] = body.content_encoding()
+        return self.fetch_request(self.post_method, path=path, request_body=body, headers=headers)
+
+    def download(self, path, dest_file, headers=None, progress_listener=None, is_cancelled=None):
+        """
+        Gets a resource into a file, in chunks as set by set_download_options(), resuming the download if the
+        connection is interrupted. See ResumableDownload.
+
+        :param path: resource URI
+        :param dest_file: file object the content is written to
+        :param headers: optional headers to be sent
+        :param progress_listener: optional callable receiving the number of bytes received and the size of the
+                                  content, None if unknown
+        :param is_cancelled: optional callable returning True to abort the download
+        :return: number of bytes received
+        """
+        def send_request(range_headers):
+            all_headers = dict(headers or {})
+            all_headers.update(range_headers)
+            return self.send_request(self.get_method, path=path, headers=all_headers, stream=True)
+
+        return ResumableDownload(send_request, dest_file, self._download_chunk_size, progress_listener, is_cancelled,
+                                 connection_errors=(NbiConnectionException,)).run()
+
     def send_request(self, method, path='', request_body=None, files=None, parameters={}, headers={}, stream=False):
         """
         Sends the provided http request
@@ -132,12 +222,16 @@ class NbiSession:
         if not self._session_open:
             raise Exception('Invalid state, Session must be opened before sending requests.')
 
+        stats = self._stats
+        url = self.to_full_url(path)
+        if stats is not None:
+            start_time = time.time()
         try:
             all_headers = self._HEADER_DEFAULT.copy()
             if files:
                 del all_headers['Content-type']
             all_headers.update(headers)
-            response = method(self.to_full_url(path),
+            response = method(url,
                                           data=request_body,
                                           files=files,
                                           params=parameters,
@@ -148,9 +242,19 @@ class NbiSession:
                                           stream=stream)
         except (ConnectionError, Timeout, SSLError) as e:
             logger.exception('Connection error: %s', e)
+            if stats is not None:
+                stats.record(_http_method(method), url, time.time() - start_time, error=e)
             raise NbiConnectionException(e)
 
-        if response.status_code not in (200, 201, 202):
+        if stats is not None:
+            self._record(stats, method, url, response, time.time() - start_time, stream)
+
+        accept_encoding = response.headers.get('Accept-Encoding')
+        if accept_encoding is not None:
+            self._request_encodings = set(coding.split(';')[0].strip().lower() for coding in accept_encoding.split(','))
+
+        # 206 (Partial Content) answers the range requests of the resumed downloads
+        if response.status_code not in (200, 201, 202, 206):
             logger.debug("[ImportScriptingSolution] Response status code was: %d", response.status_code)
             text = response.text
             try:
@@ -171,12 +275,31 @@ class NbiSession:
                 raise NbiServiceUnavailableException(response.status_code, response_text=text, json=data)
             elif response.status_code == 302 and self._use_sso:
                 self._load_sso_cookie()
+                if stats is not None:
+                    stats.record_retry(_http_method(method), url)
                 raise AuthenticationTokenExpiredException(response.status_code, response_text=text, json=data)
             else:
                 raise NbiRequestException(response.status_code, response_text=text, json=data)
 
         return response
 
+    @staticmethod
+    def _record(stats, method, url, response, seconds, stream):
+        request_body = response.request.body if response.request is not None else None
+        if isinstance(request_body, (str, bytes, bytearray)):
+            bytes_out = len(request_body)
+        else:
+            # streamed bodies count the bytes they produced
+            bytes_out = getattr(request_body, 'bytes_sent', 0)
+        content_length = response.headers.get('Content-Length')
+        if content_length and content_length.isdigit():
+            bytes_in = int(content_length)
+        else:
+            # the content of a streamed response is not read here, not to load it all in memory
+            bytes_in = 0 if stream else len(response.content or '')
+        error = response.status_code if response.status_code not in (200, 201, 202, 204, 206) else None
+        stats.record(_http_method(method), url, seconds, bytes_out, bytes_in, error)
+
     # def _send_nbi_request(self, management_request, test):
     #     attributes = management_request.get_attributes().copy()
     #     attributes['executionMode'] = 'EXECUTE' if not test else 'TEST'
@@ -285,6 +408,11 @@ class NbiSession:
             return urljoin(self._nbi_url, path)
 
 
+def _http_method(method):
+    # method is one of the NbiSession *_method functions
+    return method.__name__.split('_')[0].upper()
+
+
 class NbiRequestException(Exception):
     def __init__(self, status_code, response_text='', json=None, *args, **kwargs):
         super(NbiRequestException, self).__init__(*args, **kwargs)
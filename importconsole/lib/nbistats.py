@@ -0,0 +1,173 @@
+import json
+import logging
+import re
+import time
+
+from bisect import bisect_left
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+# upper bounds of the latency histogram buckets, in milliseconds, the last bucket holding the slower requests
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# endpoint templates, the first matching the url path is used
+_ENDPOINT_TEMPLATES = (
+    ('attributes', re.compile(r'/operations/[^/]+/attributes/?$')),
+    ('operations', re.compile(r'/jobs/[^/]+/operations/?$')),
+    ('invocations', re.compile(r'/jobs/[^/]+/invocations/?$')),
+    ('files', re.compile(r'/jobs/[^/]+/files/?$')),
+    ('job by id', re.compile(r'/import-jobs/jobs/[^/]+/?$')),
+    ('jobs', re.compile(r'/import-jobs/jobs/?$')),
+    ('undo job by id', re.compile(r'/configuration/jobs/[^/]+/?$')),
+    ('undo jobs', re.compile(r'/configuration/jobs/?$')),
+    ('undo file', re.compile(r'/configuration/[^/]+$')),
+)
+
+
+class NbiStats(object):
+    """
+    Statistics of the requests sent by a NbiSession, by endpoint template (e.g. 'GET job by id'): number of requests,
+    errors and retries, bytes sent and received, and latency histogram.
+
+    Sample usage:
+        stats = NbiStats()
+        session = NbiSession(service_uri, host, username, password, stats=stats)
+        ...
+        stats.dump('stats.json')
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._endpoints = {}
+        self._since = time.time()
+
+    def record(self, method, url, seconds, bytes_out=0, bytes_in=0, error=None):
+        """
+        :param method:      http method
+        :param url:         request url or path
+        :param seconds:     request latency
+        :param bytes_out:   size of the request body
+        :param bytes_in:    size of the response body
+        :param error:       the http status code or exception of a failed request, None if it succeeded
+        """
+        key = endpoint_template(method, url)
+        with self._lock:
+            self._endpoint(key).add(seconds, bytes_out, bytes_in, error)
+
+    def record_retry(self, method, url):
+        """
+        Counts a request which has to be sent again, e.g. after reloading the authentication cookie
+        """
+        key = endpoint_template(method, url)
+        with self._lock:
+            self._endpoint(key).retries += 1
+
+    def endpoints(self):
+        """
+        :return: list of dictionaries with the statistics of each endpoint, the longest total time first
+        """
+        with self._lock:
+            endpoints = [stats.as_dict(key) for key, stats in self._endpoints.items()]
+        endpoints.sort(key=lambda endpoint: endpoint['total_seconds'], reverse=True)
+        return endpoints
+
+    def as_dict(self):
+        return {'since': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self._since)),
+                'seconds': time.time() - self._since,
+                'latency_buckets_ms': list(LATENCY_BUCKETS_MS),
+                'endpoints': self.endpoints()}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+            self._since = time.time()
+
+    def dump(self, file_path, extra=None):
+        """
+        Writes the statistics to a JSON file.
+
+        :param file_path:   path of the file
+        :param extra:       optional dictionary of other statistics to be written along, e.g. the CLI ones
+        """
+        data = self.as_dict()
+        if extra:
+            data.update(extra)
+        with open(file_path, 'w') as stats_file:
+            json.dump(data, stats_file, indent=2, sort_keys=True)
+        logger.info('Request statistics written to [%s]', file_path)
+
+    def _endpoint(self, key):
+        stats = self._endpoints.get(key)
+        if stats is None:
+            stats = self._endpoints[key] = _EndpointStats()
+        return stats
+
+
+class _EndpointStats(object):
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.last_error = None
+
+    def add(self, seconds, bytes_out, bytes_in, error):
+        self.requests += 1
+        self.bytes_out += bytes_out
+        self.bytes_in += bytes_in
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.histogram[bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)] += 1
+        if error is not None:
+            self.errors += 1
+            self.last_error = str(error)
+
+    def percentile_ms(self, percent):
+        """
+        :return: upper bound of the histogram bucket holding the percentile, the maximum latency for the last bucket
+        """
+        rank = percent / 100.0 * self.requests
+        count = 0
+        for index, bucket_count in enumerate(self.histogram):
+            count += bucket_count
+            if count >= rank and bucket_count:
+                if index < len(LATENCY_BUCKETS_MS):
+                    return min(LATENCY_BUCKETS_MS[index], self.max_seconds * 1000)
+                break
+        return self.max_seconds * 1000
+
+    def as_dict(self, key):
+        return {'endpoint': key,
+                'requests': self.requests,
+                'errors': self.errors,
+                'retries': self.retries,
+                'bytes_out': self.bytes_out,
+                'bytes_in': self.bytes_in,
+                'total_seconds': self.total_seconds,
+                'average_ms': self.total_seconds * 1000 / self.requests if self.requests else 0.0,
+                'p50_ms': self.percentile_ms(50),
+                'p95_ms': self.percentile_ms(95),
+                'max_ms': self.max_seconds * 1000,
+                'histogram': list(self.histogram),
+                'last_error': self.last_error}
+
+
+def endpoint_template(method, url):
+    """
+    :return: the method and the template of the url path, e.g. 'GET operations'. Paths not matching any known template
+             are returned with the segments holding ids replaced by '*'
+    """
+    path = re.sub(r'^[a-z]+://[^/]+', '', url).split('?', 1)[0]
+    for name, pattern in _ENDPOINT_TEMPLATES:
+        if pattern.search(path):
+            return '%s %s' % (method, name)
+    # the same templates as the retry statistics of the embedded ENM scripting client, imported here so that the
+    # start-up does not pay for it
+    from enmscriptingembedded.private.session import _ID_PATH_SEGMENT
+    return '%s %s' % (method, _ID_PATH_SEGMENT.sub('/*', path))
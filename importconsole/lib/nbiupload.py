@@ -0,0 +1,138 @@
+import binascii
+import logging
+import os
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 64 * 1024
+
+_COMPRESSION_LEVEL = 6
+
+# zlib window bits producing the gzip format
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+class UploadCancelledException(Exception):
+    def __str__(self):
+        return 'The upload was cancelled'
+
+
+class MultipartFileBody(object):
+    """
+    multipart/form-data request body streaming a file from the disk chunk by chunk, so that the memory used does not
+    depend on the size of the file. The body can be gzip-compressed on the fly, in which case its length is not known
+    in advance and it is sent with the chunked transfer encoding.
+
+    The body is read either by iterating over it (chunked transfer encoding) or with read() (known length), as done by
+    requests depending on the presence of the len attribute.
+
+    Sample usage:
+        body = MultipartFileBody('/tmp/import.xml', fields={'filename': 'import.xml'}, compress=True)
+        session.post(url, data=body, headers={'Content-Type': body.content_type(), 'Content-Encoding': 'gzip'})
+    """
+
+    def __init__(self, file_path, field_name='file', fields=None, compress=False, progress_listener=None,
+                 is_cancelled=None, max_bytes_per_second=None):
+        """
+        :param file_path:               path of the file to be sent
+        :param field_name:              name of the form field holding the file
+        :param fields:                  optional dictionary of other form fields, sent before the file
+        :param compress:                True to gzip-compress the body
+        :param progress_listener:       optional callable receiving the number of bytes of the file read so far and
+                                        the size of the file
+        :param is_cancelled:            optional callable returning True when the upload has to be aborted, raising
+                                        UploadCancelledException
+        :param max_bytes_per_second:    optional limit of the throughput of the body
+        """
+        self._file_path = file_path
+        self._file_size = os.path.getsize(file_path)
+        self._boundary = binascii.hexlify(os.urandom(16))
+        self._head = self._encode_head(field_name, fields or {}, os.path.basename(file_path))
+        self._tail = '\r\n--%s--\r\n' % self._boundary
+        self._compress = compress
+        self._progress_listener = progress_listener
+        self._is_cancelled = is_cancelled
+        self._max_bytes_per_second = max_bytes_per_second
+        self._chunks = None
+        self._buffer = ''
+        self._start_time = None
+        self.bytes_sent = 0
+        if not compress:
+            self.len = len(self._head) + self._file_size + len(self._tail)
+
+    def content_type(self):
+        return 'multipart/form-data; boundary=%s' % self._boundary
+
+    def content_encoding(self):
+        return 'gzip' if self._compress else None
+
+    def file_size(self):
+        return self._file_size
+
+    def __iter__(self):
+        return self._body_chunks()
+
+    def read(self, size=-1):
+        if self._chunks is None:
+            self._chunks = self._body_chunks()
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, ''
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def _body_chunks(self):
+        compressor = zlib.compressobj(_COMPRESSION_LEVEL, zlib.DEFLATED, _GZIP_WBITS) if self._compress else None
+        for chunk in self._raw_chunks():
+            if compressor:
+                chunk = compressor.compress(chunk)
+                if not chunk:
+                    continue
+            yield self._sent(chunk)
+        if compressor:
+            yield self._sent(compressor.flush())
+
+    def _raw_chunks(self):
+        self._start_time = time.time()
+        yield self._head
+        read = 0
+        with open(self._file_path, 'rb') as import_file:
+            while True:
+                if self._is_cancelled and self._is_cancelled():
+                    raise UploadCancelledException()
+                chunk = import_file.read(_CHUNK_SIZE)
+                if not chunk:
+                    break
+                read += len(chunk)
+                yield chunk
+                if self._progress_listener:
+                    self._progress_listener(read, self._file_size)
+        yield self._tail
+
+    def _sent(self, chunk):
+        self.bytes_sent += len(chunk)
+        if self._max_bytes_per_second:
+            ahead = self.bytes_sent / float(self._max_bytes_per_second) - (time.time() - self._start_time)
+            if ahead > 0:
+                time.sleep(ahead)
+        return chunk
+
+    def _encode_head(self, field_name, fields, file_name):
+        parts = []
+        for name, value in sorted(fields.items()):
+            parts.append('--%s\r\nContent-Disposition: form-data; name="%s"\r\n\r\n%s\r\n' %
+                         (self._boundary, name, _encode(value)))
+        parts.append('--%s\r\nContent-Disposition: form-data; name="%s"; filename="%s"\r\n\r\n' %
+                     (self._boundary, field_name, _encode(file_name).replace('"', '\\"')))
+        return ''.join(parts)
+
+
+def _encode(value):
+    return value.encode('utf-8') if isinstance(value, unicode) else str(value)
@@ -0,0 +1,235 @@
+from lib.clipool import CliSessionPool, CliSessionPoolClosedException
+from nose.tools import assert_raises
+from requests.exceptions import ConnectionError
+from threading import Event, Thread
+import time
+import logging
+
+logging.basicConfig()
+logging.getLogger().setLevel(level=logging.DEBUG)
+
+
+def test_session_reused():
+    pool, sessions = new_pool()
+    assert pool.execute('first') == 'first'
+    assert pool.execute('second') == 'second'
+    assert len(sessions) == 1
+    assert sessions[0].commands == ['first', 'second']
+    assert pool.stats()['size'] == 1
+    assert pool.stats()['borrowed'] == 2
+
+
+def test_start_opens_min_sessions():
+    pool, sessions = new_pool(min_sessions=2)
+    pool.start()
+    assert len(sessions) == 2
+    assert pool.stats()['idle'] == 2
+
+
+def test_concurrent_commands_on_separate_sessions():
+    pool, sessions = new_pool(max_sessions=2)
+    release = Event()
+    threads = [Thread(target=pool.execute, args=('wait', release)) for _ in xrange(2)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: pool.stats()['busy'] == 2)
+    assert len(sessions) == 2
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert pool.stats()['idle'] == 2
+
+
+def test_command_waits_for_a_session_when_all_busy():
+    pool, sessions = new_pool(max_sessions=1)
+    release = Event()
+    first = Thread(target=pool.execute, args=('wait', release))
+    first.start()
+    wait_for(lambda: pool.stats()['busy'] == 1)
+    second = Thread(target=pool.execute, args=('second',))
+    second.start()
+    wait_for(lambda: pool.stats()['waited'] == 1)
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert len(sessions) == 1
+    assert sessions[0].commands == ['wait', 'second']
+
+
+def test_session_kept_on_command_error():
+    pool, sessions = new_pool()
+    assert_raises(ValueError, pool.execute, 'fail', ValueError('invalid command'))
+    pool.execute('next')
+    assert len(sessions) == 1
+    assert pool.stats()['discarded'] == 0
+
+
+def test_session_discarded_on_connection_error():
+    pool, sessions = new_pool()
+    assert_raises(ConnectionError, pool.execute, 'fail', ConnectionError('connection reset'))
+    assert sessions[0].closed
+    pool.execute('next')
+    assert len(sessions) == 2
+    assert pool.stats()['discarded'] == 1
+    assert pool.stats()['size'] == 1
+
+
+def test_session_discarded_on_custom_session_error():
+    pool, sessions = new_pool(session_error_check=lambda error: isinstance(error, ValueError))
+    assert_raises(ValueError, pool.execute, 'fail', ValueError('session expired'))
+    assert sessions[0].closed
+    assert pool.stats()['size'] == 0
+
+
+def test_session_discarded_on_interrupt():
+    pool, sessions = new_pool()
+    assert_raises(KeyboardInterrupt, pool.execute, 'fail', KeyboardInterrupt())
+    assert sessions[0].closed
+    assert pool.stats()['size'] == 0
+    assert pool.stats()['busy'] == 0
+
+
+def test_size_restored_when_open_fails():
+    pool, sessions = new_pool(max_sessions=1, open_error=KeyboardInterrupt())
+    assert_raises(KeyboardInterrupt, pool.execute, 'first')
+    assert pool.stats()['size'] == 0
+    pool._open_session = lambda: sessions.append(FakeEnmSession()) or sessions[-1]
+    assert pool.execute('second') == 'second'
+
+
+def test_unhealthy_session_replaced():
+    pool, sessions = new_pool(health_check=lambda enm_session: enm_session is not sessions[0])
+    pool.execute('first')
+    pool.execute('second')
+    assert len(sessions) == 2
+    assert sessions[0].closed
+    assert sessions[1].commands == ['second']
+
+
+def test_session_idle_for_too_long_replaced():
+    pool, sessions = new_pool(max_session_idle=60)
+    pool.execute('first')
+    pool._idle[0].last_used -= 120
+    pool.execute('second')
+    assert len(sessions) == 2
+    assert sessions[0].closed
+
+
+def test_idle_sessions_closed_down_to_min_sessions():
+    pool, sessions = new_pool(max_sessions=2, min_sessions=1, idle_timeout=60)
+    release = Event()
+    thread = Thread(target=pool.execute, args=('wait', release))
+    thread.start()
+    wait_for(lambda: pool.stats()['busy'] == 1)
+    pool.execute('second')
+    pool._idle[0].last_used -= 120
+    release.set()
+    thread.join(5)
+    assert pool.stats()['size'] == 1
+    assert pool.stats()['closed'] == 1
+
+
+def test_execute_many_releases_session_once_done():
+    pool, sessions = new_pool()
+    futures = pool.execute_many(['first', 'second'])
+    assert pool.stats()['busy'] == 1
+    futures[0].done(result='first')
+    assert pool.stats()['busy'] == 1
+    futures[1].done(error=ValueError('invalid command'))
+    assert pool.stats()['idle'] == 1
+    assert not sessions[0].closed
+
+
+def test_execute_many_discards_session_on_connection_error():
+    pool, sessions = new_pool()
+    futures = pool.execute_many(['first', 'second'])
+    futures[0].done(error=ConnectionError('connection reset'))
+    futures[1].done(result='second')
+    assert sessions[0].closed
+    assert pool.stats()['size'] == 0
+
+
+def test_closed_pool():
+    pool, sessions = new_pool()
+    pool.execute('first')
+    pool.close()
+    assert sessions[0].closed
+    assert_raises(CliSessionPoolClosedException, pool.execute, 'second')
+
+
+def new_pool(open_error=None, **kwargs):
+    sessions = []
+
+    def open_session():
+        if open_error:
+            raise open_error
+        sessions.append(FakeEnmSession())
+        return sessions[-1]
+
+    return CliSessionPool(open_session, lambda enm_session: enm_session.close(), **kwargs), sessions
+
+
+def wait_for(condition, timeout=5):
+    end = time.time() + timeout
+    while not condition():
+        assert time.time() < end, 'Condition not met after %d seconds' % timeout
+        time.sleep(0.01)
+
+
+class FakeEnmSession(object):
+
+    def __init__(self):
+        self.commands = []
+        self.closed = False
+
+    def command(self):
+        return FakeCommand(self)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCommand(object):
+    """
+    Returns the command itself, waiting for the event or raising the exception given as argument
+    """
+
+    def __init__(self, enm_session):
+        self._enm_session = enm_session
+
+    def execute(self, command_str, argument=None):
+        self._enm_session.commands.append(command_str)
+        if isinstance(argument, BaseException):
+            raise argument
+        if argument is not None:
+            argument.wait(5)
+        return command_str
+
+    def execute_many(self, commands, max_in_flight, timeout_seconds):
+        self._enm_session.commands.extend(commands)
+        return [FakeFuture() for _ in commands]
+
+
+class FakeFuture(object):
+
+    def __init__(self):
+        self._callbacks = []
+        self._result = None
+        self._error = None
+
+    def add_done_callback(self, callback):
+        self._callbacks.append(callback)
+
+    def done(self, result=None, error=None):
+        self._result = result
+        self._error = error
+        for callback in self._callbacks:
+            callback(self)
+
+    def cancelled(self):
+        return False
+
+    def result(self, timeout=None):
+        if self._error:
+            raise self._error
+        return self._result
@@ -0,0 +1,51 @@
+from lib.cmimport import ImportOperations
+from enmscriptingembedded.common.element import TableView
+import logging
+
+logging.basicConfig()
+logging.getLogger().setLevel(level=logging.DEBUG)
+
+
+def test_first_row_values():
+    result = FakeOutput([[('userLabel', 'node 1'), ('administrativeState', 'UNLOCKED')]])
+    assert ImportOperations._first_row_values(result) == [('userLabel', 'node 1'),
+                                                          ('administrativeState', 'UNLOCKED')]
+
+
+def test_first_row_values_skips_missing_cells():
+    # the column of 'operationalState' is only in the second row
+    result = FakeOutput([[('userLabel', 'node 1')],
+                         [('userLabel', 'node 2'), ('operationalState', 'ENABLED')]])
+    assert ImportOperations._first_row_values(result) == [('userLabel', 'node 1')]
+
+
+def test_first_row_values_without_table():
+    assert ImportOperations._first_row_values(FakeOutput([])) is None
+
+
+def test_current_values_loaded_without_missing_cells():
+    operations = ImportOperations(None, None, 0, [], {})
+    result = FakeOutput([[('userLabel', 'node 1'), ('reservedBy', '[a=1, b=2]')],
+                         [('userLabel', 'node 2'), ('sectorCarrierRef', '{a=1}')]])
+    operations._load_mo_values('MeContext=node1', 'update', result)
+    assert operations._attr_value_cache == {'MeContext=node1': {'userLabel': 'node 1', 'reservedBy': '[a=1, b=2]'}}
+
+
+class FakeOutput(object):
+    """
+    Output of a cmedit get command, with a table of the given rows of (attribute, value) cells
+    """
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    def is_command_result_available(self):
+        return True
+
+    def get_tables(self):
+        if not self._rows:
+            return []
+        return [TableView({'type': 'group', '_elements': [
+            {'type': 'group', '_elements': [{'type': 'text', '_label': [attribute], 'value': value}
+                                            for attribute, value in row]}
+            for row in self._rows]})]
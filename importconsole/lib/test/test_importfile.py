@@ -0,0 +1,240 @@
+from lib.importfile import scan, split, _balance, ImportFileScan, FORMAT_3GPP_XML, FORMAT_DYNAMIC
+from nose import with_setup
+from nose.tools import assert_raises
+import os
+import shutil
+import tempfile
+import logging
+
+logging.basicConfig()
+logging.getLogger().setLevel(level=logging.DEBUG)
+
+_XML_FILE = '''<?xml version="1.0" encoding="UTF-8"?>
+<bulkCmConfigDataFile xmlns="configData.xsd" xmlns:xn="genericNrm.xsd" xmlns:es="EricssonSpecificAttributes.xsd">
+  <fileHeader fileFormatVersion="32.615 V4.5" vendorName="Ericsson"/>
+  <configData dnPrefix="">
+    <xn:SubNetwork id="ROOT">
+      <xn:MeContext id="node1">
+        <xn:ManagedElement id="1">
+          <xn:VsDataContainer id="a1" modifier="create">
+            <xn:attributes>
+              <xn:vsDataType>vsDataFoo</xn:vsDataType>
+            </xn:attributes>
+            <xn:VsDataContainer id="a2">
+              <xn:attributes><xn:vsDataType>vsDataBar</xn:vsDataType></xn:attributes>
+            </xn:VsDataContainer>
+          </xn:VsDataContainer>
+          <xn:VsDataContainer id="a3" modifier="delete"/>
+        </xn:ManagedElement>
+      </xn:MeContext>
+      <xn:MeContext id="node2">
+        <xn:ManagedElement id="1">
+          <xn:VsDataContainer id="b1" modifier="update"/>
+        </xn:ManagedElement>
+      </xn:MeContext>
+      <xn:MeContext id="node3">
+        <xn:ManagedElement id="1">
+          <xn:VsDataContainer id="c1" modifier="update"/>
+          <xn:VsDataContainer id="c2" modifier="update"/>
+        </xn:ManagedElement>
+      </xn:MeContext>
+    </xn:SubNetwork>
+  </configData>
+  <fileFooter dateTime="2026-01-01T00:00:00Z"/>
+</bulkCmConfigDataFile>
+'''
+
+_DYNAMIC_CREATE_1 = '''create
+FDN : "SubNetwork=ROOT,MeContext=node1,ManagedElement=1,Foo=1"
+fooId : 1
+userLabel : "first"
+'''
+
+_DYNAMIC_SET_2 = '''set
+FDN : "MeContext=node2,ManagedElement=1"
+userLabel : "a long
+  value"
+'''
+
+_DYNAMIC_DELETE_1 = '''delete
+FDN : "SubNetwork=ROOT,MeContext=node1,ManagedElement=1,Foo=2"
+'''
+
+_DYNAMIC_FILE = '\n'.join([_DYNAMIC_CREATE_1, _DYNAMIC_SET_2, _DYNAMIC_DELETE_1])
+
+_work_dir = None
+
+
+def setup_func():
+    global _work_dir
+    _work_dir = tempfile.mkdtemp()
+
+
+def teardown_func():
+    shutil.rmtree(_work_dir)
+
+
+@with_setup(setup_func, teardown_func)
+def test_scan_xml():
+    file_scan = scan(write_file('import.xml', _XML_FILE))
+    assert file_scan.format == FORMAT_3GPP_XML
+    assert file_scan.is_valid()
+    # a2 inherits the modifier of a1
+    assert file_scan.operations == {'create': 2, 'delete': 1, 'update': 3}
+    assert file_scan.nodes == {'MeContext=node1': 3, 'MeContext=node2': 1, 'MeContext=node3': 2}
+    assert file_scan.node_order == ['MeContext=node1', 'MeContext=node2', 'MeContext=node3']
+
+
+@with_setup(setup_func, teardown_func)
+def test_scan_dynamic():
+    file_scan = scan(write_file('import.txt', _DYNAMIC_FILE))
+    assert file_scan.format == FORMAT_DYNAMIC
+    assert file_scan.is_valid()
+    assert file_scan.operations == {'create': 1, 'set': 1, 'delete': 1}
+    assert file_scan.nodes == {'MeContext=node1': 2, 'MeContext=node2': 1}
+
+
+@with_setup(setup_func, teardown_func)
+def test_split_xml():
+    file_path = write_file('import.xml', _XML_FILE)
+    parts = split(file_path, 2, _work_dir)
+    assert [(os.path.basename(path), nodes, operations) for path, nodes, operations in parts] == \
+        [('import.part01.xml', 1, 3), ('import.part02.xml', 2, 3)]
+    assert_each_operation_in_one_part(scan(file_path), parts)
+
+
+@with_setup(setup_func, teardown_func)
+def test_split_xml_copies_header_and_footer_to_each_part():
+    parts = split(write_file('import.xml', _XML_FILE), 3, _work_dir)
+    assert len(parts) == 3
+    for path, _, _ in parts:
+        content = read_file(path)
+        for element in ('<bulkCmConfigDataFile', '<fileHeader fileFormatVersion="32.615 V4.5"', '<configData',
+                        '<xn:SubNetwork id="ROOT"', '<fileFooter dateTime="2026-01-01T00:00:00Z"'):
+            assert content.count(element) == 1, '%s not once in %s' % (element, content)
+
+
+@with_setup(setup_func, teardown_func)
+def test_split_dynamic():
+    file_path = write_file('import.txt', _DYNAMIC_FILE)
+    parts = split(file_path, 4, _work_dir)
+    assert [(os.path.basename(path), nodes, operations) for path, nodes, operations in parts] == \
+        [('import.part01.txt', 1, 2), ('import.part02.txt', 1, 1)]
+    assert_each_operation_in_one_part(scan(file_path), parts)
+    # the operations keep their order and content
+    assert read_file(parts[0][0]) == _DYNAMIC_CREATE_1 + '\n' + _DYNAMIC_DELETE_1 + '\n'
+    assert read_file(parts[1][0]) == _DYNAMIC_SET_2 + '\n'
+
+
+@with_setup(setup_func, teardown_func)
+def test_split_refuses_file_with_errors():
+    file_path = write_file('import.txt', 'bogus\n')
+    assert_raises(ValueError, split, file_path, 2, _work_dir)
+    assert os.listdir(_work_dir) == ['import.txt']
+
+
+@with_setup(setup_func, teardown_func)
+def test_split_refuses_operations_outside_nodes():
+    file_path = write_file('import.txt', 'set\nFDN : "SubNetwork=ROOT"\nuserLabel : 1\n')
+    assert_raises(ValueError, split, file_path, 2, _work_dir)
+
+
+def test_balance():
+    file_scan = ImportFileScan('import.txt', FORMAT_DYNAMIC)
+    for node, operations in (('a', 2), ('b', 5), ('c', 3), ('d', 2)):
+        for _ in xrange(operations):
+            file_scan._add_operation('create', node)
+    assignment, part_nodes, part_operations = _balance(file_scan, 2)
+    assert assignment == {'b': 0, 'c': 1, 'a': 1, 'd': 0}
+    assert part_nodes == [2, 2]
+    assert part_operations == [7, 5]
+
+
+def test_balance_parts_limited_to_nodes():
+    file_scan = ImportFileScan('import.txt', FORMAT_DYNAMIC)
+    file_scan._add_operation('create', 'a')
+    assert _balance(file_scan, 8) == ({'a': 0}, [1], [1])
+
+
+@with_setup(setup_func, teardown_func)
+def test_xml_error_lines():
+    content = _XML_FILE.replace('id="b1" modifier="update"', 'id="b1" modifier="merge"')
+    file_scan = scan(write_file('import.xml', content))
+    assert file_scan.errors == [(line_of(content, 'modifier="merge"'),
+                                 'Unknown modifier [merge] of xn:VsDataContainer')]
+
+
+@with_setup(setup_func, teardown_func)
+def test_xml_syntax_error_line():
+    # the end of the MeContext of node2 is mismatched
+    content = _XML_FILE.replace('</xn:MeContext>\n      <xn:MeContext id="node3">',
+                                '</xn:Wrong>\n      <xn:MeContext id="node3">')
+    file_scan = scan(write_file('import.xml', content))
+    assert len(file_scan.errors) == 1
+    assert file_scan.errors[0][0] == line_of(content, '</xn:Wrong>')
+
+
+@with_setup(setup_func, teardown_func)
+def test_xml_unexpected_root_line():
+    file_scan = scan(write_file('import.xml', '<?xml version="1.0"?>\n\n<configData/>\n'))
+    assert file_scan.errors == [(3, 'Unexpected root element configData, expected bulkCmConfigDataFile')]
+
+
+@with_setup(setup_func, teardown_func)
+def test_dynamic_error_lines():
+    content = '\n'.join(['create',
+                         'FDN : "MeContext=node1,Foo=1"',
+                         'fooId : 1',
+                         '',
+                         'bogus',
+                         '',
+                         'set',
+                         'userLabel : 1',
+                         '',
+                         'delete',
+                         'FDN : "MeContext=node1,Foo=2"',
+                         'fooId : 2',
+                         ''])
+    file_scan = scan(write_file('import.txt', content))
+    assert [line for line, _ in file_scan.errors] == [5, 8, 12]
+    assert file_scan.errors[0][1].startswith('Unknown operation [bogus]')
+    assert file_scan.errors[1][1] == 'Missing FDN of the set operation'
+    assert file_scan.errors[2][1].startswith('Unexpected line in the delete operation')
+    # the operations with an FDN are still counted
+    assert file_scan.operations == {'create': 1, 'delete': 1}
+
+
+@with_setup(setup_func, teardown_func)
+def test_errors_truncated():
+    file_scan = scan(write_file('import.txt', 'bogus\n\nbogus\n\nbogus\n'), max_errors=2)
+    assert [line for line, _ in file_scan.errors] == [1, 3]
+    assert file_scan.errors_truncated
+
+
+def assert_each_operation_in_one_part(file_scan, parts):
+    found = {}
+    for path, nodes, operations in parts:
+        part_scan = scan(path)
+        assert part_scan.is_valid(), part_scan.errors
+        assert part_scan.node_count() == nodes
+        assert part_scan.operation_count() == operations
+        for node, node_operations in part_scan.nodes.items():
+            assert node not in found, '%s in more than one part' % node
+            found[node] = node_operations
+    assert found == file_scan.nodes
+
+
+def line_of(content, text):
+    return [text in line for line in content.splitlines()].index(True) + 1
+
+
+def write_file(name, content):
+    file_path = os.path.join(_work_dir, name)
+    with open(file_path, 'wb') as import_file:
+        import_file.write(content)
+    return file_path
+
+
+def read_file(file_path):
+    with open(file_path, 'rb') as import_file:
+        return import_file.read()
@@ -0,0 +1,117 @@
+from lib.nbidownload import ResumableDownload, DownloadIntegrityException
+from httplib import HTTPException
+from nose.tools import assert_raises
+from mock import patch
+import io
+import logging
+
+logging.basicConfig()
+logging.getLogger().setLevel(level=logging.DEBUG)
+
+_CONTENT = ''.join(chr(index % 256) for index in xrange(1000))
+
+
+def test_download():
+    server = FakeServer()
+    dest_file = io.BytesIO()
+    assert ResumableDownload(server.send_request, dest_file, chunk_size=64).run() == len(_CONTENT)
+    assert dest_file.getvalue() == _CONTENT
+    assert server.requests == [{}]
+
+
+@patch('lib.nbidownload.time.sleep')
+def test_download_resumed_with_range(sleep):
+    server = FakeServer(drop_after=[300])
+    dest_file = io.BytesIO()
+    ResumableDownload(server.send_request, dest_file, chunk_size=100).run()
+    assert dest_file.getvalue() == _CONTENT
+    assert server.requests == [{}, {'Range': 'bytes=300-', 'If-Range': '"etag"'}]
+
+
+@patch('lib.nbidownload.time.sleep')
+def test_download_restarted_when_range_not_supported(sleep):
+    server = FakeServer(drop_after=[300], ranges=False)
+    dest_file = io.BytesIO()
+    ResumableDownload(server.send_request, dest_file, chunk_size=100).run()
+    assert dest_file.getvalue() == _CONTENT
+    assert len(server.requests) == 2
+
+
+@patch('lib.nbidownload.time.sleep')
+def test_download_restarted_when_range_mismatched(sleep):
+    # the server answers the request of the bytes from 300 with the bytes from 200
+    server = FakeServer(drop_after=[300], range_offset=-100)
+    dest_file = io.BytesIO()
+    ResumableDownload(server.send_request, dest_file, chunk_size=100).run()
+    assert dest_file.getvalue() == _CONTENT
+    assert server.requests == [{}, {'Range': 'bytes=300-', 'If-Range': '"etag"'}, {}]
+
+
+@patch('lib.nbidownload.time.sleep')
+def test_download_fails_when_partial_content_not_requested(sleep):
+    server = FakeServer(drop_after=[300], range_offset=-100, always_partial=True)
+    dest_file = io.BytesIO()
+    assert_raises(DownloadIntegrityException, ResumableDownload(server.send_request, dest_file, chunk_size=100).run)
+
+
+@patch('lib.nbidownload.time.sleep')
+def test_download_fails_after_max_retries(sleep):
+    server = FakeServer(drop_after=[100, 200, 300])
+    download = ResumableDownload(server.send_request, io.BytesIO(), chunk_size=100, max_retries=2)
+    assert_raises(HTTPException, download.run)
+    assert len(server.requests) == 3
+
+
+def test_download_fails_on_size_mismatch():
+    server = FakeServer(content_length=len(_CONTENT) - 10)
+    assert_raises(DownloadIntegrityException, ResumableDownload(server.send_request, io.BytesIO()).run)
+
+
+class FakeServer(object):
+    """
+    Sends _CONTENT, the connection being closed after the number of bytes of drop_after for each request in turn
+    """
+
+    def __init__(self, drop_after=None, ranges=True, range_offset=0, always_partial=False, content_length=None):
+        self._drop_after = list(drop_after or [])
+        self._ranges = ranges
+        self._range_offset = range_offset
+        self._always_partial = always_partial
+        self._content_length = content_length
+        self.requests = []
+
+    def send_request(self, headers):
+        self.requests.append(dict(headers))
+        start = 0
+        response_headers = {'ETag': '"etag"'}
+        if self._ranges and ('Range' in headers or self._always_partial):
+            start = max(0, int(headers.get('Range', 'bytes=0-')[6:-1]) + self._range_offset)
+            response_headers['Content-Range'] = 'bytes %d-%d/%d' % (start, len(_CONTENT) - 1, len(_CONTENT))
+            status_code = 206
+        else:
+            status_code = 200
+        body = _CONTENT[start:]
+        response_headers['Content-Length'] = str(self._content_length or len(body))
+        if self._drop_after:
+            body = body[:self._drop_after.pop(0) - start]
+        return FakeResponse(status_code, response_headers, body)
+
+
+class FakeResponse(object):
+
+    def __init__(self, status_code, headers, body):
+        self.status_code = status_code
+        self.headers = headers
+        self.raw = FakeRaw(body)
+
+    def close(self):
+        pass
+
+
+class FakeRaw(object):
+
+    def __init__(self, body):
+        self._body = io.BytesIO(body)
+
+    def read(self, size, decode_content=True):
+        return self._body.read(size)
@@ -1,9 +1,11 @@
 import uibind
+import fileindex
 import urwid as u
 import tempfile
 import itertools
 
 from os import path
+from threading import Thread, Event
 from cmimport import *
 from datetime import datetime
 from config import *
@@ -26,6 +28,26 @@ _button_style = ('button', 'focus button')
 
 _EXIT_BUTTON = '[E]xit'
 
+_FIND_MAX_RESULTS = 200
+
+# key showing the request statistics view from the main menu, when the statistics are enabled
+_STATS_VIEW_KEY = 'ctrl t'
+
+# number of latest jobs searched for the running ones, when the dashboard is opened without job ids
+_DASHBOARD_RECENT_JOBS = 100
+
+# the dashboard polls the jobs every update interval while they change, up to this number of intervals apart otherwise
+_DASHBOARD_MAX_POLL_INTERVALS = 8
+
+# maximum number of jobs tracked by the dashboard
+_DASHBOARD_MAX_JOBS = 1000
+
+# value of the dashboard popup tracking the running jobs instead of a list of ids
+_RUNNING_JOBS = 'running'
+
+# minimum number of seconds between the refreshes of the operations list while the current values are fetched
+_CURRENT_VALUES_REFRESH_INTERVAL = 2
+
 
 class Hello(uibind.View):
 
@@ -88,6 +110,8 @@ class FileSelectionView(uibind.PopUpView):
         self._file_filter = file_filter
         self._start_path = start_path
         self._selection = '/'.join(selection)
+        self._find_query = ''
+        self._file_index = None
 
     def after_show(self):
         if self._file_filter:
@@ -101,7 +125,58 @@ class FileSelectionView(uibind.PopUpView):
     def on_search_root(self, obj, value):
         if value == 'enter':
             self._start_path = self.get_value_of(self.search_root)
+            self._file_index = None
             self.get_element_of(self.file_list).set_start_path(self._start_path)
+            if self._find_query:
+                self._find(self._find_query)
+
+    @uibind.textinput(caption='Find file   : ', order=20, style=_textinput_style)
+    def find_file(self):
+        return ''
+
+    @find_file.uibind.listener
+    def on_find_file(self, obj, value):
+        if value != 'enter':
+            self._find(value)
+
+    @uibind.text(order=21, style=_text_style)
+    def find_status(self):
+        return ' '
+
+    def _find(self, query):
+        """
+        Replaces the directory tree by the files under the root directory matching the query, or brings the tree back
+        if the query is empty. The query is matched against the file index, which is refreshed in background; the
+        search is repeated once the refresh is completed.
+        """
+        self._find_query = query.strip()
+        file_list = self.get_element_of(self.file_list)
+        if not self._find_query:
+            file_list.show_tree()
+            self.get_element_of(self.find_status).set_text(' ')
+            return
+
+        index = self._get_file_index()
+        matches = index.search(self._find_query, limit=_FIND_MAX_RESULTS)
+        file_list.show_matches(matches)
+        status = 'showing %d best matches of %d files indexed' % (len(matches), index.size())
+        if not index.is_indexed():
+            status += ' (indexing...)'
+        self.get_element_of(self.find_status).set_text(status)
+
+    def _get_file_index(self):
+        if self._file_index is None:
+            work_dir = get_config().work_dir if get_config() else None
+            self._file_index = fileindex.get_file_index(self._start_path, work_dir)
+            display = self.get_display()
+            if display:
+                index = self._file_index
+                self._file_index.refresh(on_done=lambda: display.run_in_ui(lambda: self._on_index_refreshed(index)))
+        return self._file_index
+
+    def _on_index_refreshed(self, index):
+        if index is self._file_index and self._find_query:
+            self._find(self._find_query)
 
     @uibind.divider(order=26)
     def div_options(self):
@@ -116,6 +191,8 @@ class FileSelectionView(uibind.PopUpView):
         if value == 'enter':
             filter_pattern = self.get_value_of(self.file_filter)
             self.get_element_of(self.file_list).filter_by(filter_pattern)
+            if self._find_query:
+                self._find(self._find_query)
 
     @uibind.radios(caption='Order by    : ', labels=['Name', 'Date'], order=28, style=_textinput_style, caption_style=_text_style)
     def sort_options(self, obj, value, label):
@@ -123,6 +200,8 @@ class FileSelectionView(uibind.PopUpView):
             self.get_element_of(self.file_list).order_by(uibind.file_sort_by_name_asc)
         elif value and label == 'Date':
             self.get_element_of(self.file_list).order_by(uibind.file_sort_by_last_modified_desc)
+        if value and self._find_query:
+            self._find(self._find_query)
 
     @uibind.divider(order=29)
     def div_filebrowser(self):
@@ -256,6 +335,7 @@ class NewImportJobView(BaseImportJobExecutionView):
         self._allow_file_selection = allow_file_selection
         self._delete_file_on_exit = delete_file_on_exit
         self._import_job = None
+        self._execution_options = None
 
     @uibind.text(order=10, style=_text_style)
     def intro(self):
@@ -338,25 +418,39 @@ class NewImportJobView(BaseImportJobExecutionView):
                 job_name = self.get_value_of(self.job_name) or None
                 self._import_job = self._cm_import.create_job(validation_policy_list=validation_policy, error_policy_list=execution_policy, name=job_name)
 
-            self._import_job.add_file(self._import_file)
-            self._delete_file_if_required()
+            # the file is uploaded in the background, the job is executed once it is done
+            self._execution_options = execution_flow, execution_policy, validation_policy
+            self.upload_popup.popup.show()
 
-            if path.exists(self._import_file) and self._has_file_policy():
-                file_policy = self.get_value_of(self.file_clean_up_policy)[0]
-                if file_policy.startswith('Remove '):
-                    self._file_cleaner.add_file(self._import_job.id(), self._import_file)
+        else:
+            self._delete_file_if_required()
+            self.get_display().back()
 
-            try:
-                self._import_job.execute(execution_flow, validation_policy_list=validation_policy, error_policy_list=execution_policy)
-            except Exception as e:
-                self.get_display().back()
-                raise RuntimeError('The import job [%s] was created but the execution failed due to: %s ' % (str(self._import_job.id()), str(e)))
+    @uibind.popup()
+    def upload_popup(self):
+        return UploadProgressPopup(self._import_job, self._import_file)
+
+    @upload_popup.uibind.listener
+    def on_upload_popup_close(self, obj, value):
+        if value is False:
+            self.upload_cancelled_popup.popup.show()
+        if not value:
+            return
+        execution_flow, execution_policy, validation_policy = self._execution_options
+        self._delete_file_if_required()
 
-            self.success_message_popup.popup.show()
+        if path.exists(self._import_file) and self._has_file_policy():
+            file_policy = self.get_value_of(self.file_clean_up_policy)[0]
+            if file_policy.startswith('Remove '):
+                self._file_cleaner.add_file(self._import_job.id(), self._import_file)
 
-        else:
-            self._delete_file_if_required()
+        try:
+            self._import_job.execute(execution_flow, validation_policy_list=validation_policy, error_policy_list=execution_policy)
+        except Exception as e:
             self.get_display().back()
+            raise RuntimeError('The import job [%s] was created but the execution failed due to: %s ' % (str(self._import_job.id()), str(e)))
+
+        self.success_message_popup.popup.show()
 
     @uibind.propagate_exception
     def _validate_file(self):
@@ -368,6 +462,11 @@ class NewImportJobView(BaseImportJobExecutionView):
             logger.debug('Deleting file [%s] as requested...', self._import_file)
             os.remove(self._import_file)
 
+    @uibind.popup()
+    def upload_cancelled_popup(self):
+        return MessagePopup('The upload was cancelled, import job %s was created without a file. Execute it again to '
+                            'upload the file.' % (self._import_job.id() if self._import_job else ''))
+
     @uibind.popup()
     def success_message_popup(self):
         return MessagePopup('Import job %s was started successfully' % (self._import_job.id() if self._import_job else ''))
@@ -452,10 +551,21 @@ class ImportJobExecuteView(BaseImportJobExecutionView):
 
 
 class CurrentValueProgressPopup(uibind.PopUpView):
+    """
+    Popup fetching the current values of the job operations attributes on a background thread. The values fetched
+    before the user cancels are kept.
+    """
 
-    def __init__(self, import_job):
+    def __init__(self, import_job, values_listener=None):
+        """
+        :param values_listener: callable called on the UI thread as the values are fetched, at most once every
+                                _CURRENT_VALUES_REFRESH_INTERVAL seconds
+        """
         super(CurrentValueProgressPopup, self).__init__('Current value update', style=_view_style, height=15)
         self._import_job = import_job
+        self._values_listener = values_listener
+        self._cancelled = Event()
+        self._closed = False
 
     @uibind.divider(top=2, order=1)
     def description_div(self):
@@ -473,16 +583,213 @@ class CurrentValueProgressPopup(uibind.PopUpView):
     def progress_bar(self):
         return 0
 
+    @uibind.text(align='center', order=25, style=_text_style)
+    def time_left(self):
+        return 'estimating time left...'
+
+    @uibind.buttons(labels=['[C]ancel'], align='center', order=30, style=_button_style)
+    def actions(self, obj, value):
+        self._cancelled.set()
+        self._close_once()
+
     def after_show(self):
-        pbar = self.get_element_of(self.progress_bar)
         job_operations = self._import_job.operations()
-        if job_operations:
-            def progress_listener(p):
-                pbar.set_completion(p)
-                self.get_display().redraw_ui()
-            job_operations.load_attribute_values(progress_listener)
+        if not job_operations:
+            self._close_once()
+            return
 
-        self.close()
+        thread = Thread(target=self._load_values, args=(job_operations, self.get_display()), name='Current-Value-Thread')
+        thread.daemon = True
+        thread.start()
+
+    def _load_values(self, job_operations, display):
+        last_refresh = [time.time()]
+
+        def progress_listener(percent, seconds_left):
+            display.run_in_ui(lambda: self._show_progress(percent, seconds_left))
+            if self._values_listener and time.time() - last_refresh[0] >= _CURRENT_VALUES_REFRESH_INTERVAL:
+                last_refresh[0] = time.time()
+                display.run_in_ui(self._show_values)
+
+        try:
+            job_operations.load_attribute_values(progress_listener, is_cancelled=self._cancelled.is_set)
+        except Exception as e:
+            logger.exception('Failed to fetch the current values: %s', e)
+            display.run_in_ui(lambda: self._fail(e))
+        else:
+            display.run_in_ui(self._close_once)
+
+    def _show_progress(self, percent, seconds_left):
+        if self._closed:
+            return
+        self.get_element_of(self.progress_bar).set_completion(percent)
+        self.get_element_of(self.time_left).set_text('about %d:%02d left' % divmod(int(ceil(seconds_left)), 60))
+
+    def _show_values(self):
+        if not self._closed:
+            self._values_listener()
+
+    def _fail(self, error):
+        self._close_once()
+        raise error
+
+    def _close_once(self):
+        if not self._closed:
+            self._closed = True
+            self.close()
+
+
+class FileTransferProgressPopup(uibind.PopUpView):
+    """
+    Popup transferring a file on a background thread, showing its progress. It is closed with the value True once the
+    file is transferred, False if the transfer was cancelled and no value if it failed.
+    """
+
+    # exceptions raised by the transfer when it is cancelled
+    _CANCELLED_EXCEPTIONS = (UploadCancelledException, DownloadCancelledException)
+
+    def __init__(self, title, file_path, description, transfer, failed_listener=None):
+        """
+        :param title:           title of the popup
+        :param file_path:       path of the file transferred
+        :param description:     text shown above the progress bar
+        :param transfer:        callable transferring the file, receiving a progress listener, called with the number
+                                of bytes transferred and the size of the file (None if unknown), and a callable
+                                returning True when the transfer has to be aborted
+        :param failed_listener: optional callable called on the background thread when the transfer failed or was
+                                cancelled
+        """
+        super(FileTransferProgressPopup, self).__init__(title, style=_view_style, height=15)
+        self._file_path = file_path
+        self._description = description
+        self._transfer = transfer
+        self._failed_listener = failed_listener
+        self._cancelled = Event()
+        self._closed = False
+        self._percent = -1
+
+    @uibind.divider(top=2, order=1)
+    def description_div(self):
+        pass
+
+    @uibind.text(align='center', order=5, style=_text_style)
+    def description(self):
+        return self._description
+
+    @uibind.divider(top=2, order=10)
+    def progress_div(self):
+        pass
+
+    @uibind.progressbar(align='center', style_normal='pg normal', style_complete='pg complete', width=('relative', 90), size=None, order=20)
+    def progress_bar(self):
+        return 0
+
+    @uibind.text(align='center', order=25, style=_text_style)
+    def transferred(self):
+        return 'estimating time left...'
+
+    @uibind.buttons(labels=['[C]ancel'], align='center', order=30, style=_button_style)
+    def actions(self, obj, value):
+        self._cancelled.set()
+        if not self._closed:
+            self.set_value(False)
+        self._close_once()
+
+    def after_show(self):
+        thread = Thread(target=self._run, args=(self.get_display(),), name='File-Transfer-Thread')
+        thread.daemon = True
+        thread.start()
+
+    def _run(self, display):
+        start = time.time()
+
+        def progress_listener(done, size):
+            percent = done * 100 / size if size else 0
+            if percent != self._percent or not size:
+                # the screen is updated once per percent, not for every chunk transferred
+                self._percent = percent
+                seconds_left = (time.time() - start) * (size - done) / done if size and done else None
+                display.run_in_ui(lambda: self._show_progress(percent, done, size, seconds_left))
+
+        try:
+            self._transfer(progress_listener, self._cancelled.is_set)
+        except self._CANCELLED_EXCEPTIONS:
+            logger.info('Transfer of [%s] cancelled', self._file_path)
+            self._on_failed()
+        except Exception as e:
+            logger.exception('Failed to transfer the file [%s]: %s', self._file_path, e)
+            self._on_failed()
+            display.run_in_ui(lambda: self._fail(e))
+        else:
+            display.run_in_ui(self._succeed)
+
+    def _on_failed(self):
+        if self._failed_listener:
+            self._failed_listener()
+
+    def _show_progress(self, percent, done, size, seconds_left):
+        if self._closed:
+            return
+        if not size:
+            self.get_element_of(self.transferred).set_text('%.1f MB' % (done / 1048576.0))
+            return
+        self.get_element_of(self.progress_bar).set_completion(percent)
+        minutes, seconds = divmod(int(ceil(seconds_left or 0)), 60)
+        self.get_element_of(self.transferred).set_text('%.1f of %.1f MB, about %d:%02d left' % (
+            done / 1048576.0, size / 1048576.0, minutes, seconds))
+
+    def _succeed(self):
+        if not self._closed:
+            self.set_value(True)
+            self._close_once()
+
+    def _fail(self, error):
+        self._close_once()
+        raise error
+
+    def _close_once(self):
+        if not self._closed:
+            self._closed = True
+            self.close()
+
+
+class UploadProgressPopup(FileTransferProgressPopup):
+    """
+    Popup uploading an import file to a job
+    """
+
+    def __init__(self, import_job, file_path):
+        super(UploadProgressPopup, self).__init__(
+            'Upload', file_path, 'Uploading %s...' % path.basename(file_path),
+            lambda progress_listener, is_cancelled: import_job.add_file(file_path, progress_listener,
+                                                                        is_cancelled=is_cancelled))
+
+
+class DownloadProgressPopup(FileTransferProgressPopup):
+    """
+    Popup downloading the file of an undo job. The partially downloaded file is removed if the download fails or is
+    cancelled.
+    """
+
+    def __init__(self, undo_job, file_path):
+        super(DownloadProgressPopup, self).__init__(
+            'Download', file_path, 'Downloading the undo file of import job %s...' % undo_job.job_id(),
+            lambda progress_listener, is_cancelled: _download_undo_file(undo_job, file_path, progress_listener,
+                                                                        is_cancelled),
+            lambda: _remove_partial_download(file_path))
+
+
+def _download_undo_file(undo_job, file_path, progress_listener, is_cancelled):
+    with open(file_path, 'wb') as dest_file:
+        undo_job.save_file(dest_file, progress_listener, is_cancelled)
+
+
+def _remove_partial_download(file_path):
+    if path.exists(file_path):
+        try:
+            os.remove(file_path)
+        except OSError as e:
+            logger.warning('Could not remove the partially downloaded file [%s]: %s', file_path, e)
 
 
 class JobOperationsListItemBuilder(uibind.WidgetBuilder):
@@ -574,6 +881,7 @@ class ImportJobDetailsView(uibind.View):
         self._refresh_work = None
         self._operations_ds = ImportJobDetailsView.CmImportOperationsDataSource(self._import_job)
         self._refresh_on_show = False
+        self._upload_file = None
 
     def after_show(self):
         if self._refresh_on_show:
@@ -705,7 +1013,16 @@ class ImportJobDetailsView(uibind.View):
     @select_file_popup.uibind.listener
     def on_file_popup_close(self, obj, value):
         if value:
-            self._import_job.add_file(value)
+            self._upload_file = value
+            self.upload_popup.popup.show()
+
+    @uibind.popup()
+    def upload_popup(self):
+        return UploadProgressPopup(self._import_job, self._upload_file)
+
+    @upload_popup.uibind.listener
+    def on_upload_popup_close(self, obj, value):
+        if value:
             self.success_file_popup.popup.show()
 
     @uibind.popup()
@@ -719,10 +1036,13 @@ class ImportJobDetailsView(uibind.View):
 
     @uibind.popup()
     def current_value_progress_popup(self):
-        return CurrentValueProgressPopup(self._import_job)
+        return CurrentValueProgressPopup(self._import_job, values_listener=self._refresh_operations_list)
 
     @current_value_progress_popup.uibind.listener
     def on_current_value_progress_popup_close(self, obj, value):
+        self._refresh_operations_list()
+
+    def _refresh_operations_list(self):
         operations = self.get_element_of(self.operations_list)
         if operations:
             operations.refresh()
@@ -1078,7 +1398,7 @@ class BrowseImportView(uibind.View):
 
     def refresh(self):
         import_list = self.get_element_of(self.import_list)
-        self._cm_undo.get_jobs()
+        self._cm_undo.sync()
         if import_list:
             logger.debug('Refreshing job list...')
             import_list.refresh()
@@ -1098,6 +1418,174 @@ class BrowseImportView(uibind.View):
             self._refresh_work = self.get_display().request_work(self.refresh)
 
 
+class JobDashboardView(uibind.View):
+    """
+    View tracking the progress of a set of jobs, e.g. the jobs of a batch import running in parallel.
+
+    The jobs not finished yet are fetched with a single list request filtered by id. The jobs are polled every update
+    interval while they change, the polls getting further apart while nothing changes and stopping once all the jobs
+    are finished.
+    """
+
+    def __init__(self, cm_import, cm_undo, job_ids=None):
+        """
+        :param job_ids: ids of the jobs to be tracked, None to track the running jobs among the latest ones
+        """
+        super(JobDashboardView, self).__init__('Jobs dashboard', style=_view_style)
+        self._cm_import = cm_import
+        self._cm_undo = cm_undo
+        self._job_ids = job_ids
+        self._job_list = []
+        self._loaded = False
+        self._refresh_work = None
+        self._poll_intervals = 1
+        self._intervals_to_poll = 1
+
+    def after_show(self):
+        # fetching up to _DASHBOARD_MAX_JOBS jobs takes a while, it is done in the background
+        self._refresh_work = self.get_display().request_work(self.load_jobs)
+
+    def load_jobs(self):
+        """
+        Fetches all the jobs tracked, showing them once fetched
+        """
+        if self._job_ids is None:
+            jobs = [job for job in self._cm_import.get_jobs(limit=_DASHBOARD_RECENT_JOBS) if not _is_job_settled(job)]
+        else:
+            jobs = self._cm_import.get_jobs_by_id(self._job_ids)
+        jobs.sort(key=lambda job: job.id())
+        self.get_display().run_in_ui(lambda: self._show_jobs(jobs))
+
+    def _show_jobs(self, jobs):
+        self._job_list[:] = jobs
+        self._loaded = True
+        self._poll_intervals = 1
+        self._intervals_to_poll = 1
+        self.refresh()
+
+    @uibind.text(align='center', style=_heading_style, order=5)
+    def totals(self):
+        if not self._loaded:
+            return 'Loading jobs...'
+        if not self._job_list:
+            return 'No jobs to track'
+
+        statuses = OrderedDict()
+        for job in self._job_list:
+            status = 'failed' if job.failureReason() else (job.status() or 'unknown').lower()
+            statuses[status] = statuses.get(status, 0) + 1
+        return '%d jobs: %s' % (len(self._job_list), ', '.join('%d %s' % (count, status) for status, count in statuses.items()))
+
+    @uibind.divider(order=10)
+    def div_totals(self):
+        pass
+
+    def job_list_item_action_listener(self, obj, value):
+        import_job = self.get_value_of(self.job_list)
+        if value == 'Details' and import_job:
+            self.get_display().show_view(ImportJobDetailsView(import_job, self._cm_import, self._cm_undo))
+        elif value == 'Execute' and import_job:
+            self.get_display().show_view(ImportJobExecuteView(import_job))
+
+    @uibind.listbox(ImportListItemBuilder(action_listener=job_list_item_action_listener), size=None, order=15)
+    def job_list(self):
+        return uibind.NavigableDataSource(self._job_list)
+
+    @uibind.divider(char=u'_', bottom=1, order=20)
+    def div_bottom(self):
+        pass
+
+    @uibind.buttons(labels=['[R]efresh', '[B]ack', _EXIT_BUTTON], align='right', style=_button_style, order=30)
+    def action_options(self, obj, value):
+        if value == 'Exit':
+            raise u.ExitMainLoop
+        if value == 'Refresh':
+            # polled straight away, even when the automatic refresh is disabled
+            self._poll_intervals = 1
+            self._request_poll()
+        else:
+            self.get_display().back()
+
+    def poll_jobs(self):
+        """
+        Fetches the jobs not finished yet with a single request
+
+        :return: True if any job changed
+        """
+        index_by_id = dict((job.id(), index) for index, job in enumerate(self._job_list) if not _is_job_settled(job))
+        if not index_by_id:
+            return False
+
+        changed = False
+        for job in self._cm_import.get_jobs_by_id(sorted(index_by_id)):
+            index = index_by_id.get(job.id())
+            if index is None:
+                continue
+            if _job_state(job) != _job_state(self._job_list[index]):
+                changed = True
+            self._job_list[index] = job
+        return changed
+
+    def refresh(self):
+        totals = self.get_element_of(self.totals)
+        if totals:
+            totals.set_text(self.totals())
+        job_list = self.get_element_of(self.job_list)
+        if job_list:
+            job_list.refresh()
+        self.get_display().redraw_ui()
+
+    def update_interval(self):
+        logger.debug('Jobs dashboard got update interval request...')
+        if not get_config().auto_refresh_enabled:
+            return
+
+        if self._refresh_work:
+            work = self.get_display().get_work(self._refresh_work)
+            if work is None or work.is_ended():
+                self._refresh_work = None
+            return
+
+        if not self._loaded or all(_is_job_settled(job) for job in self._job_list):
+            return
+        self._intervals_to_poll -= 1
+        if self._intervals_to_poll > 0:
+            return
+        self._request_poll()
+
+    def _request_poll(self):
+        """
+        Polls the jobs not finished yet in the background, unless a poll or the load of the jobs is in progress
+        """
+        display = self.get_display()
+        if self._refresh_work:
+            work = display.get_work(self._refresh_work)
+            if work is not None and not work.is_ended():
+                return
+
+        logger.debug('... generating poll work')
+
+        def poll():
+            changed = self.poll_jobs()
+            # the polls get further apart while the jobs do not change
+            self._poll_intervals = 1 if changed else min(self._poll_intervals * 2, _DASHBOARD_MAX_POLL_INTERVALS)
+            self._intervals_to_poll = self._poll_intervals
+            display.run_in_ui(self.refresh)
+
+        self._refresh_work = display.request_work(poll)
+
+
+def _is_job_settled(import_job):
+    """
+    :return: True if the job is not expected to change any more
+    """
+    return bool(import_job.failureReason()) or import_job.is_finished() or import_job.status().lower() == 'invalid'
+
+
+def _job_state(import_job):
+    return import_job.status(), import_job.failureReason(), import_job.progress()
+
+
 class ImportSearchView(uibind.View):
     """
     View for searching import jobs
@@ -1389,15 +1877,20 @@ class SaveAsView(uibind.PopUpView):
     def action_option(self, obj, value):
         if value == 'Save':
             self._validate_file()
-
-            with open(path.join(self._directory, self._file_name), 'wb') as f_handler:
-                self._undo_job.save_file(f_handler)
-
-            self.success_message_popup.popup.show()
+            self.download_popup.popup.show()
 
         else:
             self.get_display().back()
 
+    @uibind.popup()
+    def download_popup(self):
+        return DownloadProgressPopup(self._undo_job, path.join(self._directory, self._file_name))
+
+    @download_popup.uibind.listener
+    def on_download_popup_close(self, obj, value):
+        if value:
+            self.success_message_popup.popup.show()
+
     def after_build(self):
         self.register_shortcut('enter', 'keypress', self.get_element_of(self.action_option)[0], (None, 'enter'))
 
@@ -1473,6 +1966,66 @@ class UndoListItemBuilder(uibind.WidgetBuilder):
         return top
 
 
+class JobDashboardPopup(uibind.PopUpView):
+    """
+    Popup asking for the jobs to be tracked by the dashboard: ids and ranges of ids, e.g. 12, 20-35. It is closed with
+    the list of ids, or with _RUNNING_JOBS when no id is given.
+    """
+
+    def __init__(self):
+        super(JobDashboardPopup, self).__init__('Jobs dashboard', style=_view_style, height=12)
+        self._job_ids = ''
+
+    @uibind.textinput('Job ids: ', order=5, style=_textinput_style, action_on_enter=True)
+    def job_ids(self):
+        pass
+
+    @uibind.text(order=8, style=_text_style)
+    def job_ids_hint(self):
+        return 'e.g. 12, 20-35. Leave empty to track the running jobs'
+
+    @uibind.text(order=10, style=_error_text_style, size=None)
+    def job_ids_error(self):
+        return ''
+
+    @job_ids.uibind.listener
+    def on_job_ids(self, obj, value):
+        if value == 'enter':
+            self.actions(None, 'Ok')
+        else:
+            self._job_ids = value
+
+    @uibind.buttons(labels=['[O]k', '[C]ancel'], align='center', order=20, style=_button_style)
+    def actions(self, obj, value):
+        if value == 'Ok':
+            try:
+                job_ids = _parse_job_ids(self._job_ids)
+            except ValueError as e:
+                self.get_element_of(self.job_ids_error).set_text(str(e))
+                return
+            self.set_value(job_ids or _RUNNING_JOBS)
+
+        self.close()
+
+
+def _parse_job_ids(text):
+    """
+    :return: sorted list of the job ids of a text like '12, 20-35'
+    :raise ValueError: if the text is not a list of ids and ranges of ids
+    """
+    job_ids = set()
+    for item in text.replace(',', ' ').split():
+        first, _, last = item.partition('-')
+        if not first.isdigit() or (last and not last.isdigit()) or (last and int(last) < int(first)):
+            raise ValueError('Invalid job ids [%s]. They must be numbers or ranges of numbers, e.g. 12, 20-35.' % item)
+        first, last = int(first), int(last or first)
+        # checked before the range is expanded, which could be huge
+        if len(job_ids) + last - first + 1 > _DASHBOARD_MAX_JOBS:
+            raise ValueError('Too many jobs, at most %d jobs can be tracked.' % _DASHBOARD_MAX_JOBS)
+        job_ids.update(xrange(first, last + 1))
+    return sorted(job_ids)
+
+
 class BrowseUndosView(uibind.View):
 
     def __init__(self, cm_import, cm_undo, import_job=None):
@@ -1488,6 +2041,7 @@ class BrowseUndosView(uibind.View):
         self._job_list = []
         self._undo_job = None
         self._new_undo_id = ''
+        self._download_file = None
 
     def before_build(self):
         self.reload_jobs()
@@ -1582,19 +2136,20 @@ class BrowseUndosView(uibind.View):
 
     def _import_undo_job(self, undo_job):
         f_handler, f_name = tempfile.mkstemp(prefix='undo_for_import_job_%s_' % undo_job.job_id(), suffix='.xml')
+        os.close(f_handler)
         logger.debug('created temporary file [%s] to hold import data', f_name)
-        try:
-            with os.fdopen(f_handler, 'wb') as import_file:
-                undo_job.save_file(import_file)
+        self._download_file = f_name
+        self.download_popup.popup.show()
 
-            self.get_display().show_view(NewImportJobView(self._cm_import, import_file=f_name, allow_file_selection=False, delete_file_on_exit=True))
-        except IOError as e:
-            logger.exception('Error saving file from undo job %s:%s', undo_job.id(), e)
-            if path.exists(f_name):
-                try:
-                    os.remove(f_name)
-                except:
-                    logger.exception('Could not remove temporary file %s', f_name)
+    @uibind.popup()
+    def download_popup(self):
+        return DownloadProgressPopup(self._undo_job, self._download_file)
+
+    @download_popup.uibind.listener
+    def on_download_popup_close(self, obj, value):
+        if value:
+            # the downloaded file is uploaded as it is, without being copied
+            self.get_display().show_view(NewImportJobView(self._cm_import, import_file=self._download_file, allow_file_selection=False, delete_file_on_exit=True))
 
 
 class MessagePopup(uibind.PopUpView):
@@ -1664,13 +2219,87 @@ class GetJobIdPopup(uibind.PopUpView):
         self.close()
 
 
+class NbiStatsView(uibind.View):
+    """
+    Hidden view showing the statistics of the requests sent to ENM, by endpoint
+    """
+
+    _HEADER = ('endpoint', 'requests', 'errors', 'retries', 'KB out', 'KB in', 'avg ms', 'p50 ms', 'p95 ms', 'max ms')
+
+    def __init__(self, nbi_stats, extra_stats=None):
+        super(NbiStatsView, self).__init__('Request statistics', style=_view_style)
+        self._nbi_stats = nbi_stats
+        self._extra_stats = extra_stats
+
+    @uibind.text(align='center', order=5, style=_heading_style)
+    def heading(self):
+        return 'NBI requests since %s' % self._nbi_stats.as_dict()['since']
+
+    @uibind.texttable(order=10, style=_text_style, size=None)
+    def endpoints(self):
+        view = self
+
+        class NbiStatsDataSource(uibind.NavigableDataSource):
+
+            def __init__(self):
+                super(NbiStatsDataSource, self).__init__(None)
+
+            def fetch(self, start, size):
+                rows = view._rows()
+                return rows[start:start + size]
+
+        return NbiStatsDataSource()
+
+    @uibind.text(order=15, style=_text_style)
+    def extra(self):
+        if self._extra_stats:
+            return self._extra_stats()
+
+    @uibind.divider(char=u'_', bottom=1, order=20)
+    def div_bottom(self):
+        pass
+
+    @uibind.buttons(labels=['[R]efresh', '[B]ack'], align='right', style=_button_style, order=30)
+    def actions(self, obj, value):
+        if value == 'Refresh':
+            self.refresh()
+        else:
+            self.get_display().back()
+
+    def update_interval(self):
+        self.refresh()
+
+    def refresh(self):
+        table = self.get_element_of(self.endpoints)
+        if table:
+            table.refresh()
+            self.get_display().redraw_ui()
+
+    def _rows(self):
+        rows = [self._HEADER]
+        for endpoint in self._nbi_stats.endpoints():
+            rows.append((endpoint['endpoint'], str(endpoint['requests']), str(endpoint['errors']),
+                         str(endpoint['retries']), '%.1f' % (endpoint['bytes_out'] / 1024.0),
+                         '%.1f' % (endpoint['bytes_in'] / 1024.0), '%.0f' % endpoint['average_ms'],
+                         '%.0f' % endpoint['p50_ms'], '%.0f' % endpoint['p95_ms'], '%.0f' % endpoint['max_ms']))
+        return rows
+
+
 class MainMenuView(uibind.View):
 
-    def __init__(self, cm_import, cm_undo, file_cleaner):
+    def __init__(self, cm_import, cm_undo, file_cleaner, nbi_stats=None, extra_stats=None):
         super(MainMenuView, self).__init__('Main menu', height=30, width=60, valign='middle', style=_view_style)
         self._cm_undo = cm_undo
         self._cm_import = cm_import
         self._file_cleaner = file_cleaner
+        self._nbi_stats = nbi_stats
+        self._extra_stats = extra_stats
+
+    def handle_input(self, key):
+        if key == _STATS_VIEW_KEY and self._nbi_stats is not None:
+            self.get_display().show_view(NbiStatsView(self._nbi_stats, self._extra_stats))
+        else:
+            super(MainMenuView, self).handle_input(key)
 
     @uibind.text(align='center', style=_text_style, order=0)
     def description(self):
@@ -1722,6 +2351,24 @@ class MainMenuView(uibind.View):
     def div_search(self):
         pass
 
+    @uibind.popup()
+    def job_dashboard_popup(self):
+        return JobDashboardPopup()
+
+    @job_dashboard_popup.uibind.listener
+    def job_dashboard_popup_listener(self, obj, value):
+        if value:
+            job_ids = None if value == _RUNNING_JOBS else value
+            self.get_display().show_view(JobDashboardView(self._cm_import, self._cm_undo, job_ids))
+
+    @uibind.buttons(labels='  Jobs [D]ashboard ', align='center', style=_button_style, order=35)
+    def job_dashboard(self, obj, value):
+        self.job_dashboard_popup.popup.show()
+
+    @uibind.divider(order=36)
+    def div_dashboard(self):
+        pass
+
     @uibind.buttons(labels='Create [N]ew Import', align='center',  style=_button_style, order=40)
     def new_import_option(self, obj, value):
         self.get_display().show_view(NewImportJobView(self._cm_import, file_cleaner=self._file_cleaner))
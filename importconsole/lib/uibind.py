@@ -4,8 +4,13 @@ import os
 import fnmatch
 import sys
 import uibind_worker
+import uibind_fs
+import uibind_profile
 import time
 
+from collections import deque, OrderedDict
+from threading import Lock, current_thread
+
 import urwid as u
 import logging
 
@@ -16,6 +21,9 @@ output = ''
 catch_view_exceptions = True
 
 
+_REDRAW_INTERVAL_SECONDS = 0.05
+
+
 def disable_catch_view_exceptions():
     global catch_view_exceptions
     catch_view_exceptions = False
@@ -26,10 +34,11 @@ class Display(object):
     View management class that coordinates the displaying of views
     and dispatching some keyboard events
     """
-    def __init__(self, palette=[], style=None):
+    def __init__(self, palette=[], style=None, redraw_interval=_REDRAW_INTERVAL_SECONDS):
         """
         :param palette: color palette to be used
         :param style: default style to be applied on the views
+        :param redraw_interval: minimum number of seconds between two screen redraws not caused by the user input
         """
         self._style = style
         self._palette = palette
@@ -44,6 +53,17 @@ class Display(object):
         self._worker = uibind_worker.Worker()
         self._update_interval = 30
         self._is_first_alarm = True
+        self._ui_calls = deque()
+        self._ui_pipe = None
+        self._ui_thread = None
+        self._wake_pending = False
+        self._redraw_interval = redraw_interval
+        self._redraw_alarm = None
+        self._draw_now = False
+        self._last_draw_time = 0
+        self._dirty_widgets = set()
+        self._dirty_lock = Lock()
+        self._first_draw_listener = None
 
     def handle_input(self, key):
         """
@@ -53,7 +73,8 @@ class Display(object):
         :return: None
         """
         if len(self._view_stack) > 0:
-            self._view_stack[-1].handle_input(key)
+            with uibind_profile.span('key', str(key)):
+                self._view_stack[-1].handle_input(key)
 
     def handle_exception(self, e):
         """
@@ -76,6 +97,15 @@ class Display(object):
     def set_update_interval(self, interval_seconds):
         self._update_interval = interval_seconds
 
+    def set_redraw_interval(self, interval_seconds):
+        self._redraw_interval = interval_seconds
+
+    def set_first_draw_listener(self, listener):
+        """
+        :param listener: callable with no arguments, called by the UI thread once the first screen has been drawn
+        """
+        self._first_draw_listener = listener
+
     def start(self, view):
         """
         Starts the UI display.
@@ -110,9 +140,13 @@ class Display(object):
             ui_widget = u.AttrMap(ui_widget, self._style)
         self._app_area = u.WidgetPlaceholder(ui_widget)
 
-        loop = u.MainLoop(self._app_area, palette=self._palette, pop_ups=True, unhandled_input=self.handle_input)
+        loop = _CoalescingMainLoop(self, self._app_area, palette=self._palette, pop_ups=True, unhandled_input=self.handle_input)
         loop.screen.set_terminal_properties(colors=256)
         self._loop = loop
+        self._ui_thread = current_thread()
+        self._ui_pipe = loop.watch_pipe(self._on_ui_calls)
+        if self._ui_calls:
+            self._wake_ui()
         self._set_next_alarm()
         self._started = True
         view._after_show()
@@ -124,6 +158,10 @@ class Display(object):
         :param view: the view to be displayed
         :return: None
         """
+        with uibind_profile.span('show_view', type(view).__name__):
+            self._show_view(view)
+
+    def _show_view(self, view):
         try:
             self._transitioning = True
             view.set_display(self)
@@ -172,7 +210,8 @@ class Display(object):
             try:
                 self._transitioning = True
                 view = self._view_stack[-1]
-                ui = view.build_ui()
+                with uibind_profile.span('rebuild_ui', type(view).__name__):
+                    ui = view.build_ui()
                 if not self._transition_error:
                     self._app_area.original_widget = ui
             finally:
@@ -180,13 +219,53 @@ class Display(object):
                 if self._transition_error:
                     self.handle_exception(self._transition_error)
 
-    def redraw_ui(self):
+    def redraw_ui(self, widget=None):
+        """
+        Requests the screen to be re-drawn.
+        Should be used only when a UI element was changed by an external Thread. It can be safely called from any
+        thread: the screen is always drawn by the UI thread and requests are merged, so the screen is drawn at most once
+        per redraw interval no matter how many requests are made.
+
+        Only the widgets which were changed are rendered again. Widgets changed through their own methods (set_text,
+        set_completion...) take care of that themselves, any other widget needs to be passed in.
+
+        :param widget: widget changed without its knowledge, which needs to be rendered again
+        :return: None
+        """
+        if widget is not None:
+            with self._dirty_lock:
+                self._dirty_widgets.add(widget)
+        if current_thread() is not self._ui_thread:
+            self._wake_ui()
+
+    def run_in_ui(self, call):
         """
-        Forces the screen to be re-drawn.
-        Should be used only when a UI element was changed by an external Thread.
+        Schedules a callable to be executed by the UI thread (the thread running the main loop).
+        It can be safely called from any thread, the screen is re-drawn after the scheduled calls are executed.
+
+        :param call: callable with no arguments
         :return: None
         """
-        self._loop.draw_screen()
+        self._ui_calls.append(call)
+        self._wake_ui()
+
+    def _wake_ui(self):
+        if self._ui_pipe is not None and not self._wake_pending:
+            self._wake_pending = True
+            os.write(self._ui_pipe, 'x')
+
+    def _on_ui_calls(self, data):
+        self._wake_pending = False
+        while self._ui_calls:
+            call = self._ui_calls.popleft()
+            try:
+                call()
+            except u.ExitMainLoop:
+                raise
+            except Exception as e:
+                logger.exception('Exception executing UI call. %s', e)
+                self.handle_exception(e)
+        return True
 
     def request_work(self, call):
         """
@@ -196,7 +275,11 @@ class Display(object):
         :param call: callable to be executed
         :return: a work id that can be used to interrogate the worker about the status of the submitted work.
         """
-        return self._worker.request(call)
+        name = None
+        if uibind_profile.current() is not None:
+            # the work is requested by the view shown, the callable alone is often an anonymous lambda
+            name = uibind_profile.work_name(call, self._view_stack[-1] if self._view_stack else None)
+        return self._worker.request(call, name)
 
     def get_work(self, work_id):
         """
@@ -206,6 +289,35 @@ class Display(object):
         """
         return self._worker.get_work_for(work_id)
 
+    def _on_input(self):
+        # the user expects to see the effect of a key stroke straight away
+        self._draw_now = True
+
+    def _on_idle(self):
+        with self._dirty_lock:
+            dirty_widgets, self._dirty_widgets = self._dirty_widgets, set()
+        for widget in dirty_widgets:
+            widget._invalidate()
+
+        now = time.time()
+        wait = self._last_draw_time + self._redraw_interval - now
+        if self._draw_now or wait <= 0:
+            self._draw_now = False
+            if self._redraw_alarm:
+                self._loop.remove_alarm(self._redraw_alarm)
+                self._redraw_alarm = None
+            self._last_draw_time = now
+            self._loop.draw_screen()
+            if self._first_draw_listener is not None:
+                listener, self._first_draw_listener = self._first_draw_listener, None
+                listener()
+        elif self._redraw_alarm is None:
+            self._redraw_alarm = self._loop.set_alarm_in(wait, self._on_redraw_alarm)
+
+    def _on_redraw_alarm(self, loop, data):
+        # the main loop gets idle right after the alarm, which draws the screen
+        self._redraw_alarm = None
+
     def _on_alarm_fired(self, loop, data):
         try:
             if len(self._view_stack) > 0:
@@ -229,6 +341,24 @@ class Display(object):
             self._alarm_handle = self._loop.set_alarm_in(self._update_interval, self._on_alarm_fired) if self._update_interval > 0 else None
 
 
+class _CoalescingMainLoop(u.MainLoop):
+    """
+    MainLoop leaving to the Display the decision of when the screen is drawn, see Display.redraw_ui
+    """
+
+    def __init__(self, display, *args, **kwargs):
+        self._display = display
+        super(_CoalescingMainLoop, self).__init__(*args, **kwargs)
+
+    def process_input(self, keys):
+        self._display._on_input()
+        return super(_CoalescingMainLoop, self).process_input(keys)
+
+    def entering_idle(self):
+        if self.screen.started:
+            self._display._on_idle()
+
+
 class ViewMeta(type):
     """
     Class meta used by all views in order to add error handling support.
@@ -260,6 +390,10 @@ class ViewMeta(type):
     def wrap_with_delegate(func):
         def _delegate_wrap(self, *args, **kwargs):
             try:
+                profiler = uibind_profile.current()
+                if profiler is not None:
+                    with profiler.span('view', '%s.%s' % (type(self).__name__, func.__name__)):
+                        return func(self, *args, **kwargs)
                 return func(self, *args, **kwargs)
             except u.ExitMainLoop:
                 raise
@@ -1603,7 +1737,7 @@ class BufferedListWalker(u.ListWalker, list):
         if new_offset < self._offset_start:
             # going back
             items_to_load = min(new_offset + self._buffer_size, self._offset_start)
-            new_items = self._ds.fetch(new_offset, items_to_load)
+            new_items = self._fetch(new_offset, items_to_load)
             if new_items and len(new_items) > 0:
                 items_loaded = len(new_items)
                 if items_loaded == self._buffer_size:
@@ -1617,12 +1751,12 @@ class BufferedListWalker(u.ListWalker, list):
         else:
             # going forward
             if new_offset > self._offset_start + len(self):
-                new_items = self._ds.fetch(new_offset, self._buffer_size)
+                new_items = self._fetch(new_offset, self._buffer_size)
                 self._replace_all_items(new_items)
             else:
                 fetch_start = self._offset_start + len(self)
                 items_to_load = new_offset + self._buffer_size - fetch_start
-                new_items = self._ds.fetch(fetch_start, items_to_load)
+                new_items = self._fetch(fetch_start, items_to_load)
                 if new_items and len(new_items) > 0:
                     for item in new_items:
                         self.append(self._build_item(item))
@@ -1639,6 +1773,10 @@ class BufferedListWalker(u.ListWalker, list):
             self._first_known_empty_index = min(self._first_known_empty_index, pos)
             return None, None
 
+    def _fetch(self, start, size):
+        with uibind_profile.span('fetch', type(self._ds).__name__):
+            return self._ds.fetch(start, size)
+
     def _replace_all_items(self, new_items):
         del self[:]
         for item in new_items:
@@ -1675,21 +1813,31 @@ class FileBrowserBuilder(WidgetBuilder):
         if data is None:
             return None
 
-        file_browser = FileBrowser(data, style=self._item_style, order_by=self._item_order_by, show_files=self._show_files)
+        display = instance.get_display()
+        dispatcher = display.run_in_ui if display else None
+        file_browser = FileBrowser(data, style=self._item_style, order_by=self._item_order_by, show_files=self._show_files, dispatcher=dispatcher)
 
         self.register_value_map(instance, binder.get_element_binding(binder.source), file_browser)
         return self.apply_style(u.LineBox(file_browser), self._style)
 
 
 class FileBrowser(u.TreeListBox):
+    """
+    Tree-list of a file-system directory.
 
-    def __init__(self, start_path, order_by=None, style=None, filter_pattern=None, show_files=True):
+    If a dispatcher is provided, directories are listed in background and their content is shown progressively as it
+    is read. The dispatcher is a callable used to hand the scan results back to the UI thread (see Display.run_in_ui).
+    Without a dispatcher the directories are listed synchronously.
+    """
+
+    def __init__(self, start_path, order_by=None, style=None, filter_pattern=None, show_files=True, dispatcher=None):
         self._show_files = show_files
         self._style = style
         self._start_path = start_path
         self._last_size = None
         self._order_by = order_by
         self._filter_pattern = filter_pattern
+        self._dispatcher = dispatcher
 
         if not os.path.exists(start_path):
             raise ValueError('Invalid path: ' + str(start_path))
@@ -1697,7 +1845,7 @@ class FileBrowser(u.TreeListBox):
         if os.path.isfile(start_path):
             start_path = os.path.dirname(start_path)
 
-        self._walker = u.TreeWalker(DirectoryNode(start_path, order_by=order_by, style=style, filter_pattern=filter_pattern, show_files=self._show_files))
+        self._walker = u.TreeWalker(self._new_root(start_path))
         super(FileBrowser, self).__init__(self._walker)
 
     def get_value(self):
@@ -1714,17 +1862,53 @@ class FileBrowser(u.TreeListBox):
 
     def set_start_path(self, path):
         self._start_path = path
-        self._walker.set_focus(DirectoryNode(self._start_path, order_by=self._order_by, filter_pattern=self._filter_pattern, show_files=self._show_files, style=self._style))
+        self._set_root(self._new_root(self._start_path))
 
     def order_by(self, order_func):
         current_path = self.get_value()
         self._order_by = order_func
-        self._walker.set_focus(DirectoryNode(self._start_path, order_by=order_func, filter_pattern=self._filter_pattern, show_files=self._show_files, expanded_path=current_path, style=self._style))
+        self._set_root(self._new_root(self._start_path, expanded_path=current_path))
 
     def filter_by(self, filter_pattern):
         current_path = self.get_value()
         self._filter_pattern = filter_pattern
-        self._walker.set_focus(DirectoryNode(self._start_path, order_by=self._order_by, filter_pattern=self._filter_pattern, show_files=self._show_files, expanded_path=current_path, style=self._style))
+        self._set_root(self._new_root(self._start_path, expanded_path=current_path))
+
+    def show_matches(self, paths):
+        """
+        Replaces the directory tree by a flat list of the given files, e.g. the results of a file search. The files are
+        shown relative to the start path. Use show_tree to bring back the directory tree.
+
+        :param paths: list of file paths
+        """
+        self._set_root(MatchListNode(self._start_path, paths, style=self._style))
+
+    def show_tree(self):
+        """
+        Shows the directory tree of the start path again, after show_matches.
+        """
+        if isinstance(self._walker.focus.get_root(), MatchListNode):
+            self._set_root(self._new_root(self._start_path))
+
+    def _new_root(self, path, expanded_path=None):
+        return DirectoryNode(path, order_by=self._order_by, filter_pattern=self._filter_pattern, show_files=self._show_files,
+                             expanded_path=expanded_path, style=self._style, dispatcher=self._dispatcher, on_change=self._on_node_change)
+
+    def _set_root(self, root):
+        old_root = self._walker.focus.get_root() if self._walker.focus else None
+        if isinstance(old_root, DirectoryNode):
+            old_root.cancel_scan()
+        self._walker.set_focus(root)
+
+    def _on_node_change(self, node):
+        focus = self._walker.focus
+        if focus is not None and focus is not node and focus.get_parent() is node:
+            key = focus.get_key()
+            if key not in node.get_child_keys():
+                self._walker.focus = node.get_first_child() if node.has_children() else node
+            elif node.get_child_node(key) is not focus:
+                self._walker.focus = node.get_child_node(key)
+        self._walker._modified()
 
 
 class FileTreeWidget(u.TreeWidget):
@@ -1738,7 +1922,7 @@ class FileTreeWidget(u.TreeWidget):
 
     def load_inner_widget(self):
         text = u.Text(self.get_display_text())
-        modified = u.Text(time.strftime('%b %d %H:%M:%S ', time.localtime(os.path.getmtime(self.get_node().get_value()))))
+        modified = u.Text(time.strftime('%b %d %H:%M:%S ', time.localtime(self.get_node().get_mtime())))
 
         file_w = u.Columns((text, ('pack', modified)))
         return u.AttrMap(file_w, *self._style) if self._style else file_w
@@ -1759,6 +1943,18 @@ class ErrorWidget(u.TreeWidget):
         return 'error', "(error/permission denied)"
 
 
+class NoMatchWidget(u.TreeWidget):
+
+    def get_display_text(self):
+        return '(no matching files)'
+
+
+class LoadingWidget(u.TreeWidget):
+
+    def get_display_text(self):
+        return '(loading...)'
+
+
 class DirectoryWidget(u.TreeWidget):
 
     def __init__(self, node, expanded=False, style=None):
@@ -1784,11 +1980,21 @@ class DirectoryWidget(u.TreeWidget):
 
 class FileNode(u.TreeNode):
 
-    def __init__(self, path, parent=None, style=None):
+    def __init__(self, path, parent=None, style=None, mtime=None, key=None):
         self._style = style
-        key = os.path.basename(path)
+        self._mtime = mtime
+        if key is None:
+            key = os.path.basename(path)
         super(FileNode, self).__init__(path, key=key, parent=parent)
 
+    def get_mtime(self):
+        if self._mtime is None:
+            try:
+                self._mtime = os.path.getmtime(self.get_value())
+            except OSError:
+                self._mtime = 0
+        return self._mtime
+
     def load_widget(self):
         return FileTreeWidget(self, style=self._style)
 
@@ -1805,14 +2011,60 @@ class ErrorNode(u.TreeNode):
         return ErrorWidget(self)
 
 
+class NoMatchNode(u.TreeNode):
+
+    def load_widget(self):
+        return NoMatchWidget(self)
+
+
+class LoadingNode(u.TreeNode):
+
+    def load_widget(self):
+        return LoadingWidget(self)
+
+
+class MatchListNode(u.ParentNode):
+    """
+    Root node listing a given set of files, keyed by their path relative to the node path.
+    """
+
+    def __init__(self, path, matches, style=None):
+        self._style = style
+        prefix = os.path.join(path, '')
+        self._matches = OrderedDict((p[len(prefix):] if p.startswith(prefix) else p, p) for p in matches)
+        super(MatchListNode, self).__init__(path, key=None)
+
+    def load_child_keys(self):
+        if not self._matches:
+            return [None]
+        return self._matches.keys()
+
+    def load_child_node(self, key):
+        if key is None:
+            return NoMatchNode(self.get_value(), parent=self, key=None, depth=1)
+        return FileNode(self._matches[key], parent=self, style=self._style, key=key)
+
+    def load_widget(self):
+        return DirectoryWidget(self, expanded=True, style=self._style)
+
+
 class DirectoryNode(u.ParentNode):
 
-    def __init__(self, path, parent=None, order_by=None, expanded_path=None, style=None, filter_pattern=None, show_files=True):
+    def __init__(self, path, parent=None, order_by=None, expanded_path=None, style=None, filter_pattern=None, show_files=True,
+                 dispatcher=None, on_change=None):
         self._show_files = show_files
         self._filter_pattern = filter_pattern
         self._style = style
         self._expanded_path = expanded_path
         self._order_by = order_by
+        self._dispatcher = dispatcher
+        self._on_change = on_change
+        self._scan = None
+        self._scan_complete = False
+        self._scan_error = None
+        self._sorted_entries = []
+        self._entry_by_name = {}
+        self._listed_entries = []
         self.dir_count = 0
         if path == _dir_sep:
             key = None
@@ -1821,57 +2073,40 @@ class DirectoryNode(u.ParentNode):
         super(DirectoryNode, self).__init__(path, key=key, parent=parent)
 
     def load_child_keys(self):
-        dirs = []
-        files = []
-        try:
-            path = self.get_value()
-            paths = [{'name': item, 'path': os.path.join(path, item)} for item in os.listdir(path)]
-
-            if self._filter_pattern:
-                matched = []
-                patterns = self._filter_pattern.split(';')
-                for item in paths:
-                    for pattern in patterns:
-                        if fnmatch.fnmatch(item['name'], pattern):
-                            matched.append(item)
-                            break
-                paths = matched
-
-            if self._order_by:
-                paths.sort(key=self._order_by)
-
-            # separate dirs and files
-            for item in paths:
-                if os.path.isdir(item['path']):
-                    dirs.append(item['name'])
-                elif self._show_files:
-                    files.append(item['name'])
-        except OSError:
-            depth = self.get_depth() + 1
-            self._children[None] = ErrorNode(self, parent=self, key=None, depth=depth)
-            return [None]
-
-        self.dir_count = len(dirs)
-
-        keys = dirs + files
-        if len(keys) == 0:
-            depth = self.get_depth() + 1
-            self._children[None] = EmptyNode(self, parent=self, key=None, depth=depth)
-            keys = [None]
-        return keys
+        cached_entries = uibind_fs.get_listing_cache().get(self.get_value())
+        if cached_entries is not None:
+            # sorting or filtering an unchanged directory does not need to touch the file system again
+            if not self._scan_complete:
+                self._add_entries(cached_entries)
+                self._scan_complete = True
+        elif self._dispatcher is None:
+            mtime = uibind_fs.directory_mtime(self.get_value())
+            try:
+                for batch in uibind_fs.iter_directory(self.get_value()):
+                    self._listed_entries.extend(batch)
+                    self._add_entries(batch)
+            except OSError as e:
+                self._scan_error = e
+            else:
+                uibind_fs.get_listing_cache().put(self.get_value(), mtime, self._listed_entries)
+            self._scan_complete = True
+        elif self._scan is None:
+            self._scan = uibind_fs.get_scanner().scan(self.get_value(),
+                                                      on_batch=self._dispatched(self._on_scan_batch),
+                                                      on_done=self._dispatched(self._on_scan_done),
+                                                      on_error=self._dispatched(self._on_scan_error))
+        return self._build_child_keys()
 
     def load_child_node(self, key):
-
-        index = self.get_child_index(key)
         if key is None:
             return EmptyNode(None)
+
+        entry = self._entry_by_name[key]
+        if entry['is_dir']:
+            return DirectoryNode(entry['path'], parent=self, order_by=self._order_by, expanded_path=self._expanded_path, style=self._style,
+                                 show_files=self._show_files, dispatcher=self._dispatcher, on_change=self._on_change)
         else:
-            path = os.path.join(self.get_value(), key)
-            if index < self.dir_count:
-                return DirectoryNode(path, parent=self, order_by=self._order_by, expanded_path=self._expanded_path, style=self._style, show_files=self._show_files)
-            else:
-                path = os.path.join(self.get_value(), key)
-                return FileNode(path, parent=self, style=self._style)
+            return FileNode(entry['path'], parent=self, style=self._style, mtime=entry['mtime'])
 
     def load_widget(self):
         return DirectoryWidget(self, expanded=self.is_expanded(), style=self._style)
@@ -1884,6 +2119,91 @@ class DirectoryNode(u.ParentNode):
 
         return False
 
+    def is_loading(self):
+        return self._scan is not None and not self._scan_complete
+
+    def cancel_scan(self):
+        """
+        Cancels any directory listing still running for this node and its sub-directories.
+        """
+        if self._scan:
+            self._scan.cancel()
+        for child in self._children.values():
+            if isinstance(child, DirectoryNode):
+                child.cancel_scan()
+
+    def _dispatched(self, call):
+        dispatcher = self._dispatcher
+        return lambda *args: dispatcher(lambda: call(*args))
+
+    def _on_scan_batch(self, batch):
+        if self._scan.is_cancelled():
+            return
+        self._listed_entries.extend(batch)
+        self._add_entries(batch)
+        self._refresh_child_keys()
+
+    def _on_scan_done(self):
+        if self._scan.is_cancelled():
+            return
+        uibind_fs.get_listing_cache().put(self.get_value(), self._scan.mtime(), self._listed_entries)
+        self._scan_complete = True
+        self._refresh_child_keys()
+
+    def _on_scan_error(self, error):
+        if self._scan.is_cancelled():
+            return
+        self._scan_error = error
+        self._scan_complete = True
+        self._refresh_child_keys()
+
+    def _refresh_child_keys(self):
+        self._child_keys = self._build_child_keys()
+        if callable(self._on_change):
+            self._on_change(self)
+
+    def _add_entries(self, entries):
+        if self._filter_pattern:
+            patterns = self._filter_pattern.split(';')
+            entries = [entry for entry in entries if any(fnmatch.fnmatch(entry['name'], pattern) for pattern in patterns)]
+
+        sequence = len(self._sorted_entries)
+        decorated = []
+        for entry in entries:
+            self._entry_by_name[entry['name']] = entry
+            decorated.append((self._order_by(entry) if self._order_by else 0, sequence, entry))
+            sequence += 1
+
+        if self._order_by:
+            decorated.sort()
+            self._sorted_entries.extend(decorated)
+            # the list is now made of two sorted runs, which the sort merges in linear time
+            self._sorted_entries.sort()
+        else:
+            self._sorted_entries.extend(decorated)
+
+    def _build_child_keys(self):
+        depth = self.get_depth() + 1
+        if self._scan_error is not None:
+            self._children[None] = ErrorNode(self, parent=self, key=None, depth=depth)
+            return [None]
+
+        dirs = [entry['name'] for _, _, entry in self._sorted_entries if entry['is_dir']]
+        files = [entry['name'] for _, _, entry in self._sorted_entries if not entry['is_dir']] if self._show_files else []
+        self.dir_count = len(dirs)
+
+        keys = dirs + files
+        if not self._scan_complete:
+            if not isinstance(self._children.get(None), LoadingNode):
+                self._children[None] = LoadingNode(self, parent=self, key=None, depth=depth)
+            keys.append(None)
+        elif len(keys) == 0:
+            self._children[None] = EmptyNode(self, parent=self, key=None, depth=depth)
+            keys = [None]
+        else:
+            self._children.pop(None, None)
+        return keys
+
 
 def _to_string_list(value):
     if isinstance(value, basestring):
@@ -1905,4 +2225,4 @@ _convert_int = lambda value_text: int(value_text) if value_text.isdigit() else v
 _alphanum_key = lambda key: [_convert_int(c) for c in re.split('([0-9]+)', key)]
 
 file_sort_by_name_asc = lambda item: _alphanum_key(item['name'].lower())
-file_sort_by_last_modified_desc = lambda item: os.path.getmtime(item['path']) * -1
+file_sort_by_last_modified_desc = lambda item: (item['mtime'] if 'mtime' in item else os.path.getmtime(item['path'])) * -1
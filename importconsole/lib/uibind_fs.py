@@ -0,0 +1,283 @@
+import os
+import stat
+import time
+import logging
+
+from threading import Thread, Lock
+from Queue import Queue, Empty
+from collections import OrderedDict
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+logger = logging.getLogger(__name__)
+
+_BATCH_SIZE = 500
+_BATCH_INTERVAL_SECONDS = 0.1
+_CACHE_MAX_ENTRIES = 250000
+
+
+def file_entry(name, path, is_dir=False, mtime=0):
+    """
+    Builds the dictionary used to represent a directory entry. The same structure is handed to the file browser
+    sort functions, so the keys 'name' and 'path' must always be present.
+    """
+    return {'name': name, 'path': path, 'is_dir': is_dir, 'mtime': mtime}
+
+
+def iter_directory(path, batch_size=_BATCH_SIZE, batch_interval=_BATCH_INTERVAL_SECONDS):
+    """
+    Lists the given directory yielding its entries in batches.
+
+    Each entry is stat-ed only once, the result (is_dir and mtime) is kept in the entry so callers do not need to
+    hit the file system again to sort or display it.
+
+    A batch is yielded once it reaches batch_size entries or once batch_interval seconds have elapsed since the
+    previous batch, whatever comes first.
+
+    :raise OSError: if the directory can not be listed
+    """
+    batch = []
+    last_batch_time = time.time()
+    for name, entry_path, st in _stat_entries(path):
+        is_dir = st is not None and stat.S_ISDIR(st.st_mode)
+        batch.append(file_entry(name, entry_path, is_dir, st.st_mtime if st is not None else 0))
+        if len(batch) >= batch_size or time.time() - last_batch_time >= batch_interval:
+            yield batch
+            batch = []
+            last_batch_time = time.time()
+    if batch:
+        yield batch
+
+
+def _stat_entries(path):
+    if scandir is not None:
+        for dir_entry in scandir(path):
+            try:
+                st = dir_entry.stat()
+            except OSError:
+                st = None
+            yield dir_entry.name, dir_entry.path, st
+    else:
+        for name in os.listdir(path):
+            entry_path = os.path.join(path, name)
+            try:
+                st = os.stat(entry_path)
+            except OSError:
+                st = None
+            yield name, entry_path, st
+
+
+def directory_mtime(path):
+    """
+    :return: the modification time of the given directory or None if it can not be stat-ed
+    """
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class DirectoryListingCache(object):
+    """
+    Cache of directory listings keyed by path.
+
+    A listing is only returned while the modification time of the directory is the same as the one read before the
+    directory was listed, so any file created, removed or renamed in the directory invalidates its listing.
+    Modifications to the content of a file do not change the directory modification time, hence the mtime of cached
+    entries may be outdated until the directory itself changes.
+
+    The least recently used listings are evicted once the total number of cached entries goes above max_entries.
+    """
+
+    def __init__(self, max_entries=_CACHE_MAX_ENTRIES):
+        self._max_entries = max_entries
+        self._listings = OrderedDict()
+        self._total_entries = 0
+        self._lock = Lock()
+
+    def get(self, path):
+        """
+        :return: list of entries (see file_entry) of the directory or None if the directory is not cached or the
+                 cached listing is no longer valid.
+        """
+        with self._lock:
+            cached = self._listings.pop(path, None)
+            if cached is None:
+                return None
+            mtime, entries = cached
+            if mtime is None or directory_mtime(path) != mtime:
+                self._total_entries -= len(entries)
+                logger.debug('Cached listing of [%s] is outdated', path)
+                return None
+            self._listings[path] = cached
+            return entries
+
+    def put(self, path, mtime, entries):
+        """
+        Stores the listing of a directory.
+
+        :param path: directory listed
+        :param mtime: modification time of the directory read BEFORE it was listed
+        :param entries: list of entries (see file_entry)
+        """
+        if mtime is None or len(entries) > self._max_entries:
+            return
+        with self._lock:
+            previous = self._listings.pop(path, None)
+            if previous:
+                self._total_entries -= len(previous[1])
+            self._listings[path] = (mtime, entries)
+            self._total_entries += len(entries)
+            while self._total_entries > self._max_entries:
+                _, (_, evicted) = self._listings.popitem(last=False)
+                self._total_entries -= len(evicted)
+
+    def invalidate(self, path=None):
+        """
+        Removes the listing of the given directory from the cache, or all listings if path is None.
+        """
+        with self._lock:
+            if path is None:
+                self._listings.clear()
+                self._total_entries = 0
+            else:
+                previous = self._listings.pop(path, None)
+                if previous:
+                    self._total_entries -= len(previous[1])
+
+
+class ScanRequest(object):
+    """
+    Handle of a directory scan submitted to the DirectoryScanner
+    """
+
+    def __init__(self, path, on_batch, on_done, on_error=None):
+        self._path = path
+        self._on_batch = on_batch
+        self._on_done = on_done
+        self._on_error = on_error
+        self._cancelled = False
+        self._iterator = None
+        self._mtime = None
+
+    def path(self):
+        return self._path
+
+    def cancel(self):
+        self._cancelled = True
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def mtime(self):
+        """
+        :return: modification time of the directory read before it started to be listed
+        """
+        return self._mtime
+
+    def _next_batch(self):
+        if self._iterator is None:
+            self._mtime = directory_mtime(self._path)
+            self._iterator = iter_directory(self._path)
+        return next(self._iterator)
+
+
+class DirectoryScanner(object):
+    """
+    Lists directories on a background thread, streaming the entries back to the caller in batches.
+
+    The most recent request is always served first, so a directory the user has just expanded is not queued behind
+    a huge directory which is still being listed. Older requests are resumed once the newer ones are completed.
+
+    Callbacks are invoked from the scanner thread.
+    """
+
+    def __init__(self):
+        self._requests = Queue()
+        self._thread = Thread(target=self._do_work, name='Dir-Scanner-Thread')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def scan(self, path, on_batch, on_done, on_error=None):
+        """
+        Submits a directory to be listed.
+
+        :param path: directory to be listed
+        :param on_batch: callable receiving a list of entries (see file_entry) each time a batch is read
+        :param on_done: callable with no arguments called when the listing is complete
+        :param on_error: callable receiving the OSError raised if the directory can not be listed
+        :return: a ScanRequest which can be used to cancel the scan
+        """
+        request = ScanRequest(path, on_batch, on_done, on_error)
+        self._requests.put(request)
+        return request
+
+    def _do_work(self):
+        active = []
+        while True:
+            if not active:
+                active.append(self._requests.get())
+            try:
+                while True:
+                    active.append(self._requests.get_nowait())
+            except Empty:
+                pass
+
+            request = active[-1]
+            if request.is_cancelled():
+                active.pop()
+                continue
+
+            try:
+                batch = request._next_batch()
+            except StopIteration:
+                active.pop()
+                self._callback(request._on_done)
+            except OSError as e:
+                active.pop()
+                logger.debug('Failed to list directory [%s]: %s', request.path(), e)
+                self._callback(request._on_error, e)
+            except Exception as e:
+                active.pop()
+                logger.exception('Unexpected error listing directory [%s]: %s', request.path(), e)
+                self._callback(request._on_error, e)
+            else:
+                if not request.is_cancelled():
+                    self._callback(request._on_batch, batch)
+
+    @staticmethod
+    def _callback(call, *args):
+        if callable(call):
+            try:
+                call(*args)
+            except Exception as e:
+                logger.exception('Exception on directory scan callback. %s', e)
+
+
+_scanner = None
+_scanner_lock = Lock()
+_listing_cache = DirectoryListingCache()
+
+
+def get_scanner():
+    """
+    Returns the DirectoryScanner shared by all the file browsers, creating it on first use.
+    """
+    global _scanner
+    with _scanner_lock:
+        if _scanner is None:
+            _scanner = DirectoryScanner()
+        return _scanner
+
+
+def get_listing_cache():
+    """
+    Returns the DirectoryListingCache shared by all the file browsers.
+    """
+    return _listing_cache
@@ -0,0 +1,179 @@
+import cProfile
+import logging
+import pstats
+import time
+import traceback
+
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+_profiler = None
+
+
+def enable(dump_file=None, slow_seconds=0.2):
+    """
+    Enables the profiling of the UI: key handling, view transitions, view methods (builds and listeners), data-source
+    fetches and background work. Spans slower than slow_seconds are logged with their call stack.
+
+    The calling thread (expected to be the UI thread) and the background work are profiled with cProfile too.
+
+    :param dump_file: file the cProfile statistics are written to by dump(), loadable with pstats
+    :param slow_seconds: duration above which a span is logged
+    :return: the Profiler
+    """
+    global _profiler
+    _profiler = Profiler(dump_file, slow_seconds)
+    _profiler.start()
+    return _profiler
+
+
+def current():
+    """
+    :return: the enabled Profiler, None if profiling is not enabled
+    """
+    return _profiler
+
+
+def span(kind, name):
+    """
+    Context manager measuring a span, doing nothing when profiling is not enabled
+
+    Sample usage:
+        with uibind_profile.span('show_view', type(view).__name__):
+            ...
+    """
+    profiler = _profiler
+    if profiler is None:
+        return _NO_SPAN
+    return profiler.span(kind, name)
+
+
+def run_work(call, name=None):
+    """
+    Runs a background work, measured and profiled if profiling is enabled
+
+    :param call: the work
+    :param name: name of the span of the work, see work_name(). By default, the name of the callable
+    """
+    profiler = _profiler
+    if profiler is None:
+        return call()
+    return profiler.run_work(call, name)
+
+
+def work_name(call, requester=None):
+    """
+    :param call: the work
+    :param requester: the object requesting the work, e.g. the view shown
+    :return: name of the span of a work: the class and name of a bound method, else the class of the requester and
+             the name of the callable, with the line it is defined at for a lambda
+    """
+    name = _callable_name(call)
+    if getattr(call, 'im_self', None) is None and requester is not None:
+        name = '%s.%s' % (type(requester).__name__, name)
+    code = getattr(call, 'func_code', None)
+    if code is not None and code.co_name == '<lambda>':
+        name = '%s:%d' % (name, code.co_firstlineno)
+    return name
+
+
+class Profiler(object):
+
+    def __init__(self, dump_file=None, slow_seconds=0.2):
+        self._dump_file = dump_file
+        self._slow_seconds = slow_seconds
+        self._lock = Lock()
+        self._spans = {}
+        self._profile = cProfile.Profile()
+        self._work_stats = None
+
+    def start(self):
+        self._profile.enable()
+
+    def span(self, kind, name):
+        return _Span(self, kind, name)
+
+    def run_work(self, call, name=None):
+        profile = cProfile.Profile()
+        try:
+            with self.span('work', name or _callable_name(call)):
+                return profile.runcall(call)
+        finally:
+            with self._lock:
+                if self._work_stats is None:
+                    self._work_stats = pstats.Stats(profile)
+                else:
+                    self._work_stats.add(profile)
+
+    def spans(self):
+        """
+        :return: list of (kind, name, count, total seconds, max seconds), the longest total time first
+        """
+        with self._lock:
+            spans = [(kind, name, count, total, longest) for (kind, name), (count, total, longest) in self._spans.items()]
+        spans.sort(key=lambda item: item[3], reverse=True)
+        return spans
+
+    def dump(self):
+        """
+        Stops profiling, logs the spans and writes the cProfile statistics to the dump file, if any
+        """
+        self._profile.disable()
+        logger.info('Profiled spans (kind, name, count, total seconds, max seconds):')
+        for kind, name, count, total, longest in self.spans():
+            logger.info('  %-10s %-50s %6d %9.3f %9.3f', kind, name, count, total, longest)
+
+        if self._dump_file:
+            stats = pstats.Stats(self._profile)
+            with self._lock:
+                if self._work_stats is not None:
+                    stats.add(self._work_stats)
+            stats.dump_stats(self._dump_file)
+            logger.info('Profile written to [%s]', self._dump_file)
+
+    def _end(self, kind, name, seconds):
+        key = (kind, name)
+        with self._lock:
+            count, total, longest = self._spans.get(key, (0, 0.0, 0.0))
+            self._spans[key] = (count + 1, total + seconds, max(longest, seconds))
+        if seconds >= self._slow_seconds:
+            # the last frames are the ones of the span itself
+            stack = ''.join(traceback.format_stack()[:-2])
+            logger.warning('Slow %s [%s]: %.3f seconds\n%s', kind, name, seconds, stack)
+
+
+class _Span(object):
+
+    __slots__ = ('_profiler', '_kind', '_name', '_start')
+
+    def __init__(self, profiler, kind, name):
+        self._profiler = profiler
+        self._kind = kind
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.time()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._profiler._end(self._kind, self._name, time.time() - self._start)
+        return False
+
+
+class _NoSpan(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def _callable_name(call):
+    owner = getattr(call, 'im_self', None)
+    name = getattr(call, '__name__', type(call).__name__)
+    return '%s.%s' % (type(owner).__name__, name) if owner is not None else name
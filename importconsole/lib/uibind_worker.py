@@ -1,6 +1,7 @@
 from threading import Thread, Event
 import uuid
 import logging
+import uibind_profile
 
 logger = logging.getLogger(__name__)
 
@@ -20,13 +21,13 @@ class Worker(object):
             work = self._work
             if work:
                 try:
-                    work._call()
+                    uibind_profile.run_work(work._call, work._name)
                 except Exception as e:
                     logger.exception('Exception executing background task. %s', e)
                 work._ended = True
 
-    def request(self, call):
-        work = Work(uuid.uuid4(), call)
+    def request(self, call, name=None):
+        work = Work(uuid.uuid4(), call, name)
         self._work = work
         self._event.set()
         return work.get_id()
@@ -38,8 +39,9 @@ class Worker(object):
 
 class Work(object):
 
-    def __init__(self, id, call):
+    def __init__(self, id, call, name=None):
         self._call = call
+        self._name = name
         self._id = id
         self._ended = False
 
@@ -20,6 +20,9 @@
 #
 # Urwid web site: http://excess.org/urwid/
 
+import sys
+from types import ModuleType
+
 from urwid.version import VERSION, __version__
 from urwid.widget import (FLOW, BOX, FIXED, LEFT, RIGHT, CENTER, TOP, MIDDLE,
     BOTTOM, SPACE, ANY, CLIP, PACK, GIVEN, RELATIVE, RELATIVE_100, WEIGHT,
@@ -72,7 +75,38 @@ from urwid.util import (calc_text_pos, calc_width, is_wide_char,
     int_scale, is_mouse_event)
 from urwid.treetools import (TreeWidgetError, TreeWidget, TreeNode,
     ParentNode, TreeWalker, TreeListBox)
-from urwid.vterm import (TermModes, TermCharset, TermScroller, TermCanvas,
-    Terminal)
 
 from urwid import raw_display
+
+
+# urwid.vterm is imported on first use of one of its names, to keep the
+# start-up fast. The package module is replaced by a module loading them.
+_LAZY_NAMES = {
+    'TermModes': 'urwid.vterm',
+    'TermCharset': 'urwid.vterm',
+    'TermScroller': 'urwid.vterm',
+    'TermCanvas': 'urwid.vterm',
+    'Terminal': 'urwid.vterm',
+}
+
+
+class _LazyModule(ModuleType):
+    def __getattr__(self, name):
+        if name not in _LAZY_NAMES:
+            raise AttributeError("module %r has no attribute %r" % (
+                self.__name__, name))
+        module = __import__(_LAZY_NAMES[name], None, None, [name])
+        value = getattr(module, name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(_LAZY_NAMES))
+
+
+_lazy_module = _LazyModule(__name__)
+_lazy_module.__dict__.update(globals())
+# keeps the globals of the package functions alive, python 2 clears the
+# dictionary of a module when it is garbage collected
+_lazy_module._package_module = sys.modules[__name__]
+sys.modules[__name__] = _lazy_module
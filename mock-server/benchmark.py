@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+"""
+Benchmark of the CM Import and Undo NBI client against the replay server, runnable headless (e.g. in CI).
+
+The replay server runs in a child process, generating the given number of jobs and operations per job, so the peak
+RSS reported is the client's only. For each benchmark the latency percentiles of the calls, the number of NBI
+requests each call made and the peak RSS of the process so far are reported.
+
+Sample usage:
+    python mock-server/benchmark.py --jobs 2000 --operations 500 --latency 0.02 --jitter 0.01 --repeat 20
+    python mock-server/benchmark.py --json benchmark.json
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+
+_IMPORTCONSOLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'importconsole')
+sys.path.insert(0, os.path.abspath(_IMPORTCONSOLE_DIR))
+
+import replay
+from lib.nbisession import NbiSession
+from lib.cmimport import CmImport
+from lib.cmundo import CmImportUndo
+
+_NBI_BASE_URI = 'bulk-configuration/v1/import-jobs/'
+_USERNAME = 'admin'  # as expected by the login_ok stub
+_PASSWORD = '123'
+_OPERATIONS_PAGE_SIZE = 50
+
+
+class _CountingNbiSession(NbiSession):
+    """
+    NbiSession counting the requests sent
+    """
+
+    def __init__(self, *args, **kwargs):
+        NbiSession.__init__(self, *args, **kwargs)
+        self.requests = 0
+
+    def send_request(self, *args, **kwargs):
+        self.requests += 1
+        return NbiSession.send_request(self, *args, **kwargs)
+
+
+def benchmarks(cm_import, cm_undo, jobs, operations):
+    """
+    :return: list of (name, callable) to be timed, the callables run against the generated data
+    """
+    newest = replay.FIRST_JOB_CREATED + replay.JOB_INTERVAL * jobs
+    window_end = newest - replay.JOB_INTERVAL * (jobs // 4)
+    window_start = window_end - replay.JOB_INTERVAL * (jobs // 4)
+
+    job = cm_import.get_job(str(jobs))
+    job_operations = job.operations()
+    job_operations.fetch(0, _OPERATIONS_PAGE_SIZE)
+    last_offset = max(0, operations - _OPERATIONS_PAGE_SIZE)
+    # the jobs tracked by the dashboard, e.g. the ones of a batch import
+    tracked_job_ids = range(max(1, jobs - 29), jobs + 1)
+
+    return [('CmImport.get_jobs', lambda: cm_import.get_jobs(limit=50)),
+            ('CmImport.get_jobs_by_id', lambda: cm_import.get_jobs_by_id(tracked_job_ids)),
+            ('CmImport.find_jobs', lambda: cm_import.find_jobs(window_start, window_end)),
+            ('ImportJob.refresh', job.refresh),
+            ('ImportOperations.fetch',
+             lambda: job_operations.fetch(random.randint(0, last_offset), _OPERATIONS_PAGE_SIZE)),
+            ('CmImportUndo.get_jobs', cm_undo.get_jobs),
+            ('CmImportUndo.get_job_for_import', lambda: cm_undo.get_job_for_import(str(random.randint(1, jobs))))]
+
+
+def run(session, name, function, repeat):
+    """
+    :return: dictionary with the results of the benchmark
+    """
+    function()  # warm up
+    latencies = []
+    requests = session.requests
+    for _ in range(repeat):
+        start = time.time()
+        function()
+        latencies.append(time.time() - start)
+    latencies.sort()
+    return {'name': name,
+            'runs': repeat,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'requests_per_run': float(session.requests - requests) / repeat,
+            'peak_rss_mb': peak_rss_mb()}
+
+
+def percentile(sorted_values, percent):
+    """
+    :return: the nearest-rank percentile of the sorted values
+    """
+    if not sorted_values:
+        return 0.0
+    rank = int(round(percent / 100.0 * len(sorted_values) + 0.5)) - 1
+    return sorted_values[min(max(rank, 0), len(sorted_values) - 1)]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak_rss / 1024.0
+
+
+def _serve(url_queue, kwargs):
+    server = replay.start_server(**kwargs)
+    url_queue.put(server.url())
+    while True:
+        time.sleep(3600)
+
+
+def start_server_process(args):
+    url_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, name='replay-server',
+                                      args=(url_queue, {'jobs': args.jobs, 'operations': args.operations,
+                                                        'undo_jobs': args.undo_jobs, 'latency': args.latency,
+                                                        'jitter': args.jitter, 'accept_gzip': args.accept_gzip}))
+    process.daemon = True
+    process.start()
+    return process, url_queue.get(timeout=60)
+
+
+def print_results(results):
+    print('%-32s %6s %10s %10s %14s %12s' % ('benchmark', 'runs', 'p50 ms', 'p95 ms', 'requests/run', 'peak RSS MB'))
+    for result in results:
+        print('%-32s %6d %10.1f %10.1f %14.1f %12.1f' % (result['name'], result['runs'], result['p50_ms'],
+                                                           result['p95_ms'], result['requests_per_run'],
+                                                           result['peak_rss_mb']))
+
+
+def read_args(argv=None):
+    parser = argparse.ArgumentParser(prog='benchmark', description='Benchmarks the NBI client against the replay '
+                                                                   'server')
+    replay.add_server_args(parser)
+    parser.add_argument('--repeat', type=int, default=20, help='Number of timed runs of each benchmark')
+    parser.add_argument('--only', action='append', default=None, help='Name of a benchmark to run, can be repeated')
+    parser.add_argument('--json', default=None, help='File to write the results to, as JSON')
+    parser.set_defaults(jobs=1000, operations=500)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = read_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    random.seed(0)
+
+    process, url = start_server_process(args)
+    try:
+        session = _CountingNbiSession(_NBI_BASE_URI, host=url, username=_USERNAME, password=_PASSWORD)
+        session.open_session()
+        results = []
+        for name, function in benchmarks(CmImport(session, None), CmImportUndo(session), args.jobs, args.operations):
+            if not args.only or name in args.only:
+                results.append(run(session, name, function, args.repeat))
+    finally:
+        process.terminate()
+
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump({'parameters': vars(args), 'results': results}, json_file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
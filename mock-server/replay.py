@@ -0,0 +1,450 @@
+#!/usr/bin/env python
+"""
+Local stand-in for the mock server: replays the stubs of the mappings directory, without WireMock.
+
+The requests are matched against the stubs (method, url path or pattern, query parameters, headers and body
+patterns), the most specific stub winning. With --jobs, the import job, operation and undo job resources are
+generated from the stubs instead, with the given number of jobs and operations per job, so that the client can be
+exercised against realistic volumes.
+
+Sample usage:
+    python mock-server/replay.py --port 8080 --jobs 2000 --operations 500 --latency 0.05 --jitter 0.02
+"""
+import argparse
+import copy
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+try:
+    # Python 3
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlsplit, parse_qs
+except ImportError:
+    # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlsplit, parse_qs
+
+logger = logging.getLogger(__name__)
+
+_MOCK_SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+MAPPINGS_DIR = os.path.join(_MOCK_SERVER_DIR, 'mappings')
+FILES_DIR = os.path.join(_MOCK_SERVER_DIR, '__files')
+
+_ADMIN_REQUESTS_PATH = '/__admin/requests'
+
+# creation time of the generated job with id 0, each next job being created JOB_INTERVAL later
+FIRST_JOB_CREATED = datetime(2017, 1, 1)
+JOB_INTERVAL = timedelta(minutes=7)
+
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+_HAL_JSON_HEADERS = {'Content-Type': 'application/hal+json'}
+
+
+class Mapping(object):
+    """
+    A WireMock stub: the request it matches and the response it gives
+    """
+
+    def __init__(self, name, spec, files_dir=FILES_DIR):
+        self.name = name
+        request = spec['request']
+        self._method = request.get('method', 'ANY')
+        self._url_path = request.get('urlPath') or request.get('url')
+        pattern = request.get('urlPathPattern') or request.get('urlPattern')
+        self._url_pattern = re.compile(pattern + '$') if pattern else None
+        self._query = request.get('queryParameters', {})
+        self._headers = request.get('headers', {})
+        self._body_patterns = request.get('bodyPatterns', [])
+        self._response = spec['response']
+        self._files_dir = files_dir
+        # the stubs constraining the query, then the exact urls, then the body and headers are tried first
+        self.specificity = (len(self._query), 1 if self._url_path else 0, len(self._body_patterns), len(self._headers))
+
+    def matches(self, method, path, query, headers, body):
+        if self._method not in ('ANY', method):
+            return False
+        if self._url_path is not None and self._url_path != path:
+            return False
+        if self._url_pattern is not None and not self._url_pattern.match(path):
+            return False
+        for name, matcher in self._query.items():
+            if not _value_matches(matcher, query.get(name)):
+                return False
+        for name, matcher in self._headers.items():
+            if not _value_matches(matcher, headers.get(name)):
+                return False
+        for matcher in self._body_patterns:
+            if not _body_matches(matcher, body):
+                return False
+        return True
+
+    def json_body(self):
+        return self._response.get('jsonBody')
+
+    def response(self):
+        """
+        :return: status, headers and body of the response
+        """
+        body = b''
+        if 'jsonBody' in self._response:
+            body = json.dumps(self._response['jsonBody']).encode('utf-8')
+        elif 'body' in self._response:
+            body = self._response['body'].encode('utf-8')
+        elif 'bodyFileName' in self._response:
+            with open(os.path.join(self._files_dir, self._response['bodyFileName']), 'rb') as body_file:
+                body = body_file.read()
+        return self._response.get('status', 200), self._response.get('headers', {}), body
+
+
+def load_mappings(mappings_dir=MAPPINGS_DIR, files_dir=FILES_DIR):
+    """
+    :return: list of Mapping, the most specific first
+    """
+    mappings = []
+    for file_name in sorted(os.listdir(mappings_dir)):
+        if file_name.endswith('.json'):
+            with open(os.path.join(mappings_dir, file_name)) as mapping_file:
+                mappings.append(Mapping(file_name[:-len('.json')], json.load(mapping_file), files_dir))
+    mappings.sort(key=lambda mapping: mapping.specificity, reverse=True)
+    return mappings
+
+
+def _value_matches(matcher, value):
+    if matcher.get('absent'):
+        return value is None
+    if value is None:
+        return False
+    if 'equalTo' in matcher:
+        return value == matcher['equalTo']
+    if 'contains' in matcher:
+        return matcher['contains'] in value
+    if 'matches' in matcher:
+        return re.match(matcher['matches'] + '$', value) is not None
+    return True
+
+
+def _body_matches(matcher, body):
+    if 'contains' in matcher:
+        return matcher['contains'] in body
+    if 'matchesJsonPath' in matcher:
+        # only the '$.field' form is used by the stubs
+        try:
+            return matcher['matchesJsonPath'][2:] in json.loads(body)
+        except ValueError:
+            return False
+    return True
+
+
+class SyntheticData(object):
+    """
+    Generates the import jobs, their operations and the undo jobs from the stubs, scaled to the given volumes.
+
+    Jobs have ids 1 to jobs, the highest id being the most recent one, and are listed most recent first like the NBI
+    does. Undo jobs undo the first import jobs, one each.
+    """
+
+    _JOBS_PATH = '/bulk-configuration/v1/import-jobs/jobs'
+    _JOB_PATH = re.compile(r'/bulk-configuration/v1/import-jobs/jobs/([0-9]+)$')
+    _OPERATIONS_PATH = re.compile(r'/bulk-configuration/v1/import-jobs/jobs/([0-9]+)/operations$')
+    _UNDO_JOBS_PATH = '/configuration/jobs'
+    _DEFAULT_LIMIT = 50
+
+    def __init__(self, mappings, jobs, operations, undo_jobs=None):
+        templates = dict((mapping.name, mapping.json_body()) for mapping in mappings)
+        self._job_template = templates['listjobs_offset0']['jobs'][0]
+        self._operation_templates = templates['joboperations_offset0']['operations']
+        self._attribute_templates = templates['joboperation']['attributes']
+        self._undo_job_template = templates['listundojobs']['jobs'][0]
+        self._operations = operations
+        self._jobs = [self._job(job_id) for job_id in range(jobs, 0, -1)]
+        self._jobs_by_id = dict((job['id'], job) for job in self._jobs)
+        undo_jobs = jobs if undo_jobs is None else undo_jobs
+        self._undo_jobs = [self._undo_job(undo_id, job_id) for undo_id, job_id in enumerate(range(1, undo_jobs + 1))]
+
+    def respond(self, method, path, query):
+        """
+        :return: status, headers and body of the response, None if the request is not for a generated resource
+        """
+        if method != 'GET':
+            return None
+        if path == self._JOBS_PATH:
+            return self._list_jobs(query)
+        if path == self._UNDO_JOBS_PATH:
+            undo_jobs = self._undo_jobs
+            if 'createdAfter' in query:
+                undo_jobs = [job for job in undo_jobs if job['creationTime'] > query['createdAfter']]
+            return 200, _HAL_JSON_HEADERS, {'jobs': undo_jobs}
+        match = self._JOB_PATH.match(path)
+        if match:
+            job = self._jobs_by_id.get(int(match.group(1)))
+            return (200, _JSON_HEADERS, job) if job else (404, _JSON_HEADERS, None)
+        match = self._OPERATIONS_PATH.match(path)
+        if match:
+            return self._list_operations(int(match.group(1)), query)
+        return None
+
+    def _list_jobs(self, query):
+        jobs = self._jobs
+        if 'id' in query:
+            job_ids = query['id'] if isinstance(query['id'], list) else [query['id']]
+            jobs = [job for job in jobs if str(job['id']) in job_ids]
+        if 'userId' in query:
+            jobs = [job for job in jobs if job.get('userId') == query['userId']]
+        if 'createdBefore' in query:
+            jobs = [job for job in jobs if job['created'] < query['createdBefore']]
+        if 'createdAfter' in query:
+            jobs = [job for job in jobs if job['created'] > query['createdAfter']]
+        offset, limit = self._page(query)
+        page = jobs[offset:offset + limit]
+        if not page:
+            return 204, _JSON_HEADERS, None
+        return 200, _JSON_HEADERS, {'totalCount': len(jobs), 'jobs': page}
+
+    def _list_operations(self, job_id, query):
+        offset, limit = self._page(query)
+        indexes = range(offset, min(offset + limit, self._operations))
+        if job_id not in self._jobs_by_id or not indexes:
+            return 204, _JSON_HEADERS, None
+        href = '%s/%d/operations' % (self._JOBS_PATH, job_id)
+        return 200, _JSON_HEADERS, {'totalCount': self._operations,
+                                    'operations': [self._operation(job_id, index) for index in indexes],
+                                    '_links': {'self': {'href': href}}}
+
+    def _page(self, query):
+        return int(query.get('offset', 0)), int(query.get('limit', self._DEFAULT_LIMIT))
+
+    def _job(self, job_id):
+        job = copy.deepcopy(self._job_template)
+        created = FIRST_JOB_CREATED + JOB_INTERVAL * job_id
+        job['id'] = job_id
+        job['name'] = '%s_%d' % (self._job_template['name'], job_id)
+        job['created'] = _timestamp(created)
+        job['lastValidation'] = _timestamp(created + timedelta(seconds=20))
+        job['lastExecution'] = _timestamp(created + timedelta(seconds=40))
+        job['userId'] = 'user%d' % (job_id % 10)
+        job['_links'] = dict((rel, {'rel': link.get('rel'), 'href': re.sub(r'/jobs/[0-9]+', '/jobs/%d' % job_id,
+                                                                           link['href'])})
+                             for rel, link in self._job_template['_links'].items())
+        return job
+
+    def _operation(self, job_id, index):
+        template = self._operation_templates[index % len(self._operation_templates)]
+        operation_id = job_id * self._operations + index
+        href = '/bulk-configuration/v1/import-jobs/operations/%d' % operation_id
+        # the stub predates the 'id' and 'status' fields, and 'suppliedValue' in the attributes
+        return {'id': operation_id,
+                'type': template['type'],
+                'fdn': re.sub(r'=[0-9]+$', '=%d' % index, template['fdn']),
+                'status': template.get('status', template.get('state')),
+                'attributes': [{'name': attribute['name'], 'suppliedValue': attribute['value']}
+                               for attribute in self._attribute_templates],
+                '_links': {'self': {'href': href}, 'attributes': {'href': href + '/attributes'}}}
+
+    def _undo_job(self, undo_index, job_id):
+        undo_job = copy.deepcopy(self._undo_job_template)
+        undo_id = 100000 + undo_index
+        undo_job['id'] = undo_id
+        undo_job['jobId'] = str(job_id)
+        undo_job['creationTime'] = _timestamp(FIRST_JOB_CREATED + JOB_INTERVAL * job_id)[:-1]
+        undo_job['_links'] = {'self': {'href': '/configuration/jobs/%d?type=UNDO_IMPORT_TO_LIVE' % undo_id}}
+        return undo_job
+
+
+def _timestamp(date):
+    return date.strftime('%Y-%m-%dT%H:%M:%S.') + '%03dZ' % (date.microsecond // 1000)
+
+
+class ReplayServer(ThreadingMixIn, HTTPServer):
+    """
+    HTTP server replaying the stubs, each request being delayed by latency plus a random jitter (seconds).
+    The number of requests served by each stub is returned by GET /__admin/requests, and reset by DELETE.
+
+    Chunked and gzip-compressed request bodies are accepted. With accept_gzip, the responses advertise the latter
+    with an Accept-Encoding header, otherwise a gzip-compressed request is rejected with 415.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, mappings, synthetic=None, latency=0.0, jitter=0.0, accept_gzip=False):
+        HTTPServer.__init__(self, address, _ReplayHandler)
+        self.mappings = mappings
+        self.synthetic = synthetic
+        self.latency = latency
+        self.jitter = jitter
+        self.accept_gzip = accept_gzip
+        self._counts_lock = threading.Lock()
+        self._counts = {}
+
+    def url(self):
+        return 'http://%s:%d' % self.server_address[:2]
+
+    def count(self, name):
+        with self._counts_lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def counts(self):
+        with self._counts_lock:
+            return dict(self._counts)
+
+    def reset_counts(self):
+        with self._counts_lock:
+            self._counts = {}
+
+    def respond(self, method, path, query, headers, body):
+        """
+        :return: name of the stub, status, headers and body of the response
+        """
+        if self.synthetic is not None:
+            response = self.synthetic.respond(method, path, query)
+            if response is not None:
+                status, response_headers, json_body = response
+                return 'synthetic', status, response_headers, json.dumps(json_body).encode('utf-8') \
+                    if json_body is not None else b''
+        for mapping in self.mappings:
+            if mapping.matches(method, path, query, headers, body):
+                status, response_headers, response_body = mapping.response()
+                return mapping.name, status, response_headers, response_body
+        return None, 404, _JSON_HEADERS, b''
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    # the headers and the body are written separately, which delayed ACKs would hold back by 40 ms on keep-alive
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def _handle(self, method):
+        body = self._read_body()
+        url = urlsplit(self.path)
+
+        if self.headers.get('Content-Encoding', '').lower() == 'gzip':
+            if not self.server.accept_gzip:
+                self.server.count('unsupported_encoding')
+                self._send(415, {'Accept-Encoding': 'identity'}, b'')
+                return
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        body = body.decode('utf-8', 'replace')
+
+        if url.path == _ADMIN_REQUESTS_PATH:
+            if method == 'DELETE':
+                self.server.reset_counts()
+            self._send(200, _JSON_HEADERS, json.dumps(self.server.counts()).encode('utf-8'))
+            return
+
+        # repeated parameters, e.g. the ids of a jobs query, are kept as lists
+        query = dict((name, values[-1] if len(values) == 1 else values) for name, values in parse_qs(url.query).items())
+        headers = dict((name.title(), value) for name, value in self.headers.items())
+        name, status, response_headers, response_body = self.server.respond(method, url.path, query, headers, body)
+        self.server.count(name or 'unmatched')
+
+        delay = self.server.latency + random.uniform(0, self.server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        self._send(status, response_headers, response_body)
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() != 'chunked':
+            length = int(self.headers.get('Content-Length') or 0)
+            return self.rfile.read(length) if length else b''
+        chunks = []
+        while True:
+            size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+            if size == 0:
+                # the trailer, if any, ends with an empty line
+                while self.rfile.readline().strip():
+                    pass
+                return b''.join(chunks)
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+
+    def _send(self, status, headers, body):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if self.server.accept_gzip:
+            self.send_header('Accept-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+def start_server(port=0, jobs=None, operations=100, undo_jobs=None, latency=0.0, jitter=0.0,
+                 mappings_dir=MAPPINGS_DIR, files_dir=FILES_DIR, accept_gzip=False):
+    """
+    Starts a replay server on a daemon thread.
+
+    :param port:        port to listen on, 0 for any free port
+    :param jobs:        number of import jobs to generate, None to replay the stubs as they are
+    :param operations:  number of operations of each generated import job
+    :param undo_jobs:   number of undo jobs to generate, as many as the import jobs by default
+    :param latency:     seconds each request is delayed by
+    :param jitter:      maximum random seconds added to the latency
+    :param accept_gzip: True to accept gzip-compressed requests, advertising it in the responses
+    :return:            ReplayServer
+    """
+    mappings = load_mappings(mappings_dir, files_dir)
+    synthetic = SyntheticData(mappings, jobs, operations, undo_jobs) if jobs is not None else None
+    server = ReplayServer(('127.0.0.1', port), mappings, synthetic, latency, jitter, accept_gzip)
+    thread = threading.Thread(target=server.serve_forever, name='Replay-Server-Thread')
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def read_args(argv=None):
+    parser = argparse.ArgumentParser(prog='replay', description='Replays the mock server mappings')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on')
+    add_server_args(parser)
+    return parser.parse_args(argv)
+
+
+def add_server_args(parser):
+    parser.add_argument('--jobs', type=int, default=None, help='Number of import jobs to generate')
+    parser.add_argument('--operations', type=int, default=100, help='Number of operations of each generated job')
+    parser.add_argument('--undo-jobs', type=int, default=None, help='Number of undo jobs to generate')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds each request is delayed by')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Maximum random seconds added to the latency')
+    parser.add_argument('--accept-gzip', action='store_true', help='Accept gzip-compressed requests')
+
+
+def main(argv=None):
+    args = read_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    server = start_server(args.port, args.jobs, args.operations, args.undo_jobs, args.latency, args.jitter,
+                          accept_gzip=args.accept_gzip)
+    print('Replaying %s on %s' % (MAPPINGS_DIR, server.url()))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    sys.exit(main())